@@ -0,0 +1,43 @@
+# benchmarks/bench_backtrack.py
+# バックトラッキング評価器（trace なし）の1回あたりの実行時間を計測する
+#
+#   python -m benchmarks.bench_backtrack [--repeat 5]
+#
+# 本番経路がトレース用の字下げ・深さ・分岐を持たないことの効果を、変更前後の
+# ツリーで同じスクリプトを実行して比べるのに使う。
+import argparse
+import time
+
+from matchbox.evaluator import compile
+
+CASES = [
+    ("fullmatch", "a(b|c)*d", "a" + "bc" * 500 + "d"),
+    ("fullmatch", "(x|y)*(ab|cd)+z?", "xy" * 300 + "abcd" * 200),
+    ("match", "(a|b|c|d)+", "abcd" * 500),
+    ("fullmatch", ".*(foo|bar)", "q" * 2000 + "bar"),
+]
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtracking fast path benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'method':<10} {'pattern':<18} {'size':>6} {'time':>10}")
+    for method, pattern, text in CASES:
+        fn = getattr(compile(pattern), f"is_{method}")
+        elapsed = best_of(args.repeat, lambda: fn(text, engine="backtrack"))
+        print(f"{method:<10} {pattern:<18} {len(text):>6} {elapsed * 1e3:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
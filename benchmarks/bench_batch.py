@@ -0,0 +1,53 @@
+# benchmarks/bench_batch.py
+# search_many をワーカー数とチャンクの大きさを変えて計測し、並列化の伸びを見る
+#
+#   python -m benchmarks.bench_batch [--records 200000] [--max-workers N]
+#
+# 1ワーカーは直列処理（プロセスを起動しない）。プロセス起動と転送のコストがあるので、
+# 件数が少ないと並列化しても速くならない。
+import argparse
+import os
+import random
+import time
+
+from matchbox.evaluator import compile
+
+PATTERN = "(ERROR|WARN)(1|2)+ .*disk"
+
+
+def make_records(n, seed=0):
+    rng = random.Random(seed)
+    words = ["INFO", "ERROR1", "WARN21", "ok", "disk", "net", "retry", "ERROR3"]
+    return [" ".join(rng.choice(words) for _ in range(12)) for _ in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch matching scaling benchmark")
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    p = compile(PATTERN)
+    records = make_records(args.records)
+    workers = [1]
+    while workers[-1] * 2 <= args.max_workers:
+        workers.append(workers[-1] * 2)
+    if workers[-1] != args.max_workers:
+        workers.append(args.max_workers)
+
+    print(f"{args.records} records, pattern {PATTERN!r}, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'chunksize':>9} {'time':>9} {'speedup':>8}")
+    baseline = None
+    for n in workers:
+        chunksizes = [None] if n == 1 else [None, 1_000, 10_000]
+        for chunksize in chunksizes:
+            start = time.perf_counter()
+            p.search_many(records, workers=n, chunksize=chunksize, min_parallel=0)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            label = "auto" if chunksize is None else chunksize
+            print(f"{n:>7} {label:>9} {elapsed:>8.2f}s {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
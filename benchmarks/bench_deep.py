@@ -0,0 +1,87 @@
+# benchmarks/bench_deep.py
+# 長いパターン・深い入れ子・長い入力で、解析・コンパイルと各エンジンの時間を計測する
+#
+#   python -m benchmarks.bench_deep [--size 100000] [--input 1000000] [--repeat 3]
+#
+# 再帰でたどる評価器・パーサでは RecursionError になる大きさを既定値にしている。変更前後の
+# ツリーで同じスクリプトを実行すると、前は RecursionError、後は時間が出る。per step は
+# backtrack の時間を profile() で数えた (ノード, 位置) の評価回数で割った、1回あたりの時間。
+import argparse
+import time
+
+from matchbox.evaluator import Pattern
+from matchbox.parser import parse
+
+
+def cases(size, length):
+    """(名前, パターン, テキスト) の並び"""
+    pieces = size // 6
+    return [
+        ("groups", "(a)" * (size // 3), "a" * (size // 3)),
+        ("alternation", "a(b|c)" * pieces, "ab" * pieces),
+        ("nested", "(" * (size // 2) + "a" + ")" * (size // 2), "a"),
+        ("long input", "a(b|c)*d", "a" + "bc" * (length // 2) + "d"),
+        ("dot star", ".*(foo|bar)", "q" * length + "bar"),
+    ]
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def timed(repeat, fn):
+    """最短時間を "12.34ms" の形で返す（再帰の上限に当たったら "RecursionError"）"""
+    try:
+        return f"{best_of(repeat, fn) * 1e3:.2f}ms"
+    except RecursionError:
+        return "RecursionError"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deep pattern / long input benchmark")
+    parser.add_argument("--size", type=int, default=100_000, help="pattern length")
+    parser.add_argument("--input", type=int, default=1_000_000, help="input length")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'case':<12} {'pattern':>8} {'text':>8} {'parse':>14} {'compile':>14}"
+        f" {'backtrack':>14} {'memo':>14} {'per step':>10}"
+    )
+    for name, pattern, text in cases(args.size, args.input):
+        row = [timed(args.repeat, lambda: parse(pattern))]
+        try:
+            p = Pattern(pattern)
+        except RecursionError:
+            p = None
+        row.append(timed(args.repeat, lambda: Pattern(pattern)))
+        per_step = "-"
+        if p is None:
+            row += ["-", "-"]
+        else:
+            for engine in ("backtrack", "memo"):
+                row.append(
+                    timed(args.repeat, lambda: p.is_fullmatch(text, engine=engine))
+                )
+            try:
+                steps = p.profile(text, "fullmatch", "backtrack").steps
+                seconds = best_of(
+                    args.repeat, lambda: p.is_fullmatch(text, engine="backtrack")
+                )
+                per_step = f"{seconds / steps * 1e9:.0f}ns"
+            except RecursionError:
+                pass
+        print(
+            f"{name:<12} {len(pattern):>8} {len(text):>8}"
+            + "".join(f" {cell:>14}" for cell in row)
+            + f" {per_step:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
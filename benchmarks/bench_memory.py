@@ -0,0 +1,78 @@
+# benchmarks/bench_memory.py
+# 生成した長いパターンについて、AST と命令列が確保するメモリを tracemalloc で測る
+#
+#   python -m benchmarks.bench_memory [--sizes 1000 10000] [--seed 0]
+#
+# program は Program（命令コードの array と被演算子のタプル）。objects は比較用に、
+# 同じ命令列を命令ごとの属性付きオブジェクトのリストにした場合（以前の表現）。
+import argparse
+import random
+import tracemalloc
+
+from matchbox.nfa import OP_NAMES, compile_program
+from matchbox.optimizer import optimize
+from matchbox.parser import parse
+
+PIECES = ["a", "b", "(c|d)", "e*", ".", "(fg|h)+", "x?", "ijk"]
+
+
+class _ObjectInstruction:
+    """以前の表現: 命令ごとに __dict__ を持つオブジェクト"""
+
+    def __init__(self, op, x=None, y=None):
+        self.op = op
+        self.x = x
+        self.y = y
+
+
+def make_pattern(size, rng):
+    parts = []
+    length = 0
+    while length < size:
+        piece = rng.choice(PIECES)
+        parts.append(piece)
+        length += len(piece)
+    return "".join(parts)
+
+
+def traced(fn):
+    """fn() の結果と、それが確保したまま残ったバイト数・ピークのバイト数を返す"""
+    tracemalloc.start()
+    try:
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AST / program memory benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'size':>7} {'part':<8} {'retained':>10} {'peak':>10} {'per item':>9}")
+    for size in args.sizes:
+        pattern = make_pattern(size, rng)
+        ast, current, peak = traced(lambda: optimize(parse(pattern)))
+        print(f"{size:>7} {'ast':<8} {current:>10,} {peak:>10,}")
+        program, current, peak = traced(lambda: compile_program(ast))
+        n = len(program)
+        print(
+            f"{size:>7} {'program':<8} {current:>10,} {peak:>10,} {current / n:>8.1f}B"
+        )
+        _, current, peak = traced(
+            lambda: [
+                _ObjectInstruction(OP_NAMES[inst.op], inst.x, inst.y)
+                for inst in program
+            ]
+        )
+        print(
+            f"{size:>7} {'objects':<8} {current:>10,} {peak:>10,} {current / n:>8.1f}B"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/bench_offsets.py
+# バックトラッキング評価器の時間とピークメモリを入力サイズごとに計測する
+#
+#   python -m benchmarks.bench_offsets [--max-size 1000000]
+#
+# 評価器は共有テキストへの整数位置で動くため、ピークメモリは入力長に比例する
+# （1ステップごとに残りの文字列を切り出していた頃は入力長の2乗に比例した）。
+import argparse
+import time
+import tracemalloc
+
+from matchbox.evaluator import compile
+
+CASES = [
+    ("fullmatch", "(ab)*", lambda n: "ab" * (n // 2)),
+    ("fullmatch", ".*z", lambda n: "x" * n),
+    ("search", "abc", lambda n: "x" * n),
+]
+
+
+def measure(method, pattern, text):
+    # fullmatch / search は Match を作るために Pike VM でグループも求めるので、評価器だけを
+    # 測るよう真偽値だけを返す is_fullmatch / is_search を呼ぶ
+    p = compile(pattern)
+    tracemalloc.start()
+    start = time.perf_counter()
+    getattr(p, f"is_{method}")(text, engine="backtrack")
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backtracking evaluator time/memory benchmark"
+    )
+    parser.add_argument("--max-size", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    sizes = []
+    n = 1000
+    while n <= args.max_size:
+        sizes.append(n)
+        n *= 10
+    print(f"{'size':>9} {'method':<10} {'pattern':<8} {'time':>9} {'peak':>10}")
+    for size in sizes:
+        for method, pattern, make_text in CASES:
+            text = make_text(size)
+            elapsed, peak = measure(method, pattern, text)
+            print(
+                f"{size:>9} {method:<10} {pattern:<8} {elapsed:>8.3f}s"
+                f" {peak / 1e6:>8.2f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
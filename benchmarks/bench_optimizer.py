@@ -0,0 +1,65 @@
+# benchmarks/bench_optimizer.py
+# AST最適化の前後で、バックトラッキング評価器と Pike VM の実行時間を比べる
+#
+#   python -m benchmarks.bench_optimizer [--size 100000] [--repeat 3]
+#
+# 最適化前は parse() の結果をそのまま、最適化後は optimize() を通した木を使う。
+import argparse
+import time
+
+from matchbox.nfa import compile_program, pike_match
+from matchbox.optimizer import optimize
+from matchbox.parser import parse
+
+CASES = [
+    ("literal", "abcdefgh", lambda n: "abcdefgX" * (n // 8)),
+    ("charset", "(a|b|c|d|e)*z", lambda n: "abcde" * (n // 5)),
+    ("prefix", "(error|errno|erase)+!", lambda n: "errorerrnoerase" * (n // 15)),
+    ("mixed", "x(ab|ac|ad)*y", lambda n: "x" + "acad" * (n // 4) + "y"),
+]
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AST optimizer before/after benchmark")
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'case':<8} {'engine':<10} {'before':>9} {'after':>9} {'speedup':>8}")
+    for name, pattern, make_text in CASES:
+        text = make_text(args.size)
+        starts = set(range(len(text) + 1))
+        raw = parse(pattern)
+        opt = optimize(raw)
+        raw_program = compile_program(raw)
+        opt_program = compile_program(opt)
+        runs = {
+            "backtrack": (
+                lambda: raw.scan(text, starts),
+                lambda: opt.scan(text, starts),
+            ),
+            "nfa": (
+                lambda: pike_match(raw_program, text, "search"),
+                lambda: pike_match(opt_program, text, "search"),
+            ),
+        }
+        for engine, (run_before, run_after) in runs.items():
+            before = best_of(args.repeat, run_before)
+            after = best_of(args.repeat, run_after)
+            print(
+                f"{name:<8} {engine:<10} {before:>8.3f}s {after:>8.3f}s"
+                f" {before / after:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
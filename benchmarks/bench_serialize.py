@@ -0,0 +1,61 @@
+# benchmarks/bench_serialize.py
+# 多数のパターンを起動時に用意する時間を、コンパイルとディスクキャッシュからの読み込みで比べる
+#
+#   python -m benchmarks.bench_serialize [--count 2000] [--repeat 3]
+#
+# compile はパターンごとに解析・最適化・コンパイルする。disk は DiskCache に保存済みの
+# ファイルを読んで loads() する。dfa はDFA状態も含めて保存したものを読む。
+import argparse
+import tempfile
+import time
+
+from matchbox.evaluator import Pattern
+from matchbox.serialize import DiskCache
+
+
+def make_patterns(count):
+    return [f"(ERROR|WARN){i}(a|b|c)+ .*(disk|net)(full|down)?$" for i in range(count)]
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compile vs. on-disk cache load")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    patterns = make_patterns(args.count)
+    sample = "12:00 WARN7abc the disk full"
+    with tempfile.TemporaryDirectory() as plain, tempfile.TemporaryDirectory() as warm:
+        caches = {"disk": DiskCache(plain), "disk+dfa": DiskCache(warm, dfa=True)}
+        for p in patterns:
+            compiled = Pattern(p)
+            caches["disk"].put(compiled)
+            compiled.is_search(sample)
+            caches["disk+dfa"].put(compiled)
+
+        runs = {"compile": lambda: [Pattern(p) for p in patterns]}
+        for name, cache in caches.items():
+            runs[name] = lambda cache=cache: [cache.get(p) for p in patterns]
+
+        base = None
+        print(f"{'method':<10} {'total':>9} {'per pattern':>12} {'speedup':>8}")
+        for name, run in runs.items():
+            seconds = best_of(args.repeat, run)
+            base = base or seconds
+            print(
+                f"{name:<10} {seconds:>8.3f}s {seconds / args.count * 1e6:>10.1f}us"
+                f" {base / seconds:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+from matchbox.analyzer import analyze
+from matchbox.match import Match
+from matchbox.memo import MatchTimeout
+from matchbox.patternset import PatternSet
+from matchbox.evaluator import (
+    Pattern,
+    cache_info,
+    compile,
+    fullmatch,
+    match,
+    purge,
+    search,
+    set_cache_dir,
+    set_cache_size,
+    set_profile_hook,
+)
+
+__all__ = [
+    "Match",
+    "MatchTimeout",
+    "Pattern",
+    "PatternSet",
+    "analyze",
+    "cache_info",
+    "compile",
+    "fullmatch",
+    "match",
+    "purge",
+    "search",
+    "set_cache_dir",
+    "set_cache_size",
+    "set_profile_hook",
+]
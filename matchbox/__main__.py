@@ -1,22 +1,107 @@
 # matchbox/__main__.py
 import argparse
-from matchbox.evaluator import fullmatch, search
+import os
+import sys
+
+from matchbox.analyzer import analyze
+from matchbox.evaluator import ENGINES, compile, fullmatch, search
+from matchbox.grep import GrepOptions, grep_paths
+from matchbox.optimizer import dump
 
 
 def main():
     parser = argparse.ArgumentParser(description="Mini regex matcher (AST-based)")
     parser.add_argument("pattern", help="正規表現パターン")
-    parser.add_argument("text", help="テキスト文字列")
+    parser.add_argument("text", nargs="?", help="テキスト文字列（--analyze では不要）")
     parser.add_argument(
         "--trace", action="store_true", help="バックトラッキングの経路を表示"
     )
     parser.add_argument("--search", action="store_true", help="部分一致モード")
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        help="マッチングエンジン（既定: --trace 時は backtrack、それ以外は dfa）",
+    )
+    parser.add_argument("--dump-ast", action="store_true", help="最適化後のASTを表示")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="照合の計測結果（ステップ数・状態数・経過時間など）を JSON で表示",
+    )
+    parser.add_argument(
+        "--analyze",
+        action="store_true",
+        help="バックトラッキングでの最悪計算量を見積もる（線形でなければ終了コード1）",
+    )
+    grep = parser.add_argument_group(
+        "grep mode", "text の代わりにファイル（省略時は標準入力）を行ごとに照合する"
+    )
+    grep.add_argument(
+        "-f",
+        "--file",
+        nargs="*",
+        metavar="FILE",
+        help="照合するファイル（- は標準入力）",
+    )
+    grep.add_argument("-x", "--line-regexp", action="store_true", help="行全体の一致")
+    grep.add_argument("-c", "--count", action="store_true", help="一致した行数を表示")
+    grep.add_argument("-n", "--line-number", action="store_true", help="行番号を表示")
+    grep.add_argument(
+        "-b", "--byte-offset", action="store_true", help="バイトオフセットを表示"
+    )
+    grep.add_argument(
+        "-o", "--only-matching", action="store_true", help="一致した部分だけを表示"
+    )
+    grep.add_argument(
+        "-j", "--jobs", type=int, default=1, help="ファイルを並列に処理するプロセス数"
+    )
     args = parser.parse_args()
 
+    if args.analyze:
+        try:
+            result = analyze(args.pattern)
+        except SyntaxError as e:
+            parser.error(f"invalid pattern: {e}")
+        print(result)
+        sys.exit(0 if result.safe else 1)
+    if args.file is not None:
+        if args.text is not None:
+            parser.error("text cannot be combined with -f")
+        # grep モードは行ごとに bytes パターンで探すだけなので、照合の指定は受け付けない
+        for flag, value in (
+            ("--engine", args.engine),
+            ("--trace", args.trace),
+            ("--profile", args.profile),
+            ("--dump-ast", args.dump_ast),
+            ("--search", args.search),
+        ):
+            if value:
+                parser.error(f"{flag} cannot be combined with -f")
+        sys.exit(run_grep(args))
+    if args.text is None:
+        parser.error("the following arguments are required: text")
+    if args.trace and args.engine not in (None, "backtrack"):
+        parser.error("--trace is only supported by the backtrack engine")
+    if args.trace and args.profile:
+        parser.error("--trace cannot be combined with --profile")
+
+    if args.dump_ast:
+        print(dump(compile(args.pattern).ast))
+
+    if args.profile:
+        import json  # 起動時間を抑えるため --profile のときだけ読み込む
+
+        method = "search" if args.search else "fullmatch"
+        profile = compile(args.pattern).profile(args.text, method, args.engine)
+        print(json.dumps(profile.to_dict(), ensure_ascii=False, indent=2))
+        return
+
     if args.search:
-        success = search(args.pattern, args.text, trace=args.trace)
+        success = search(args.pattern, args.text, trace=args.trace, engine=args.engine)
     else:
-        success = fullmatch(args.pattern, args.text, trace=args.trace)
+        success = fullmatch(
+            args.pattern, args.text, trace=args.trace, engine=args.engine
+        )
 
     if success:
         print("✅  Matched")
@@ -24,5 +109,32 @@ def main():
         print("❌  Not matched")
 
 
+def run_grep(args):
+    """grep モードを実行し、grep と同じ終了コード（一致あり 0 / なし 1 / エラー 2）を返す"""
+    # 行をデコードせずに照合できるよう、パターンはコマンドライン引数のバイト列に戻す
+    try:
+        pattern = compile(os.fsencode(args.pattern))
+    except SyntaxError as e:
+        print(f"matchbox: invalid pattern: {e}", file=sys.stderr)
+        return 2
+    paths = args.file or ["-"]
+    for path in paths:
+        if path != "-" and not os.path.isfile(path):
+            print(f"matchbox: {path}: No such file", file=sys.stderr)
+            return 2
+    options = GrepOptions(
+        line_regexp=args.line_regexp,
+        count=args.count,
+        line_number=args.line_number,
+        byte_offset=args.byte_offset,
+        only_matching=args.only_matching,
+        with_filename=len(paths) > 1,
+    )
+    out = sys.stdout.buffer
+    total = grep_paths(pattern, paths, options, out, jobs=args.jobs)
+    out.flush()
+    return 0 if total else 1
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,408 @@
+# matchbox/analyzer.py
+# パターンを受け付ける前に、バックトラッキングで爆発しうる形をASTから静的に見つける
+#
+# 見積もるのは、入力を1文字ずつ試し直す素朴なバックトラッキング（Python の re など）での
+# 最悪計算量。matchbox の nfa / dfa エンジンはどのパターンでも入力長に対して線形なので、
+# 危険と判定されたパターンはそちらに回せばよい。
+#
+# 判定は文字集合の重なりに基づく近似で、迷う形は危険側に倒す（安全なパターンを危険と
+# 判定することはある）。
+from collections import Counter
+from dataclasses import dataclass, field
+
+from matchbox.ast_nodes import (
+    AnchorNode,
+    CharNode,
+    CharSetNode,
+    ConcatNode,
+    GroupNode,
+    LiteralNode,
+    OrNode,
+    RepeatNode,
+)
+from matchbox.parser import parse
+
+LINEAR = "linear"
+POLYNOMIAL = "polynomial"
+EXPONENTIAL = "exponential"
+
+# 指摘に載せる部分式の最大の長さ
+_FRAGMENT_LIMIT = 80
+
+
+@dataclass
+class Issue:
+    """危険な部分式1つ分の指摘"""
+
+    kind: str  # 指摘の種類（"nested quantifier" など）
+    fragment: str  # 該当する部分式（パターン表記）
+    complexity: str  # この部分式が引き起こす計算量のクラス
+
+
+@dataclass
+class Analysis:
+    """analyze() の結果"""
+
+    pattern: str
+    complexity: str  # LINEAR / POLYNOMIAL / EXPONENTIAL
+    degree: int = 1  # POLYNOMIAL のときの次数 k（O(n^k)）
+    issues: list = field(default_factory=list)
+
+    @property
+    def safe(self) -> bool:
+        """バックトラッキングでも入力長に対して線形に収まるか"""
+        return self.complexity == LINEAR
+
+    @property
+    def bound(self) -> str:
+        if self.complexity == EXPONENTIAL:
+            return "O(2^n)"
+        if self.complexity == POLYNOMIAL:
+            return f"O(n^{self.degree})"
+        return "O(n)"
+
+    def __str__(self):
+        lines = [f"{self.pattern!r}: {self.complexity} {self.bound}"]
+        for issue in self.issues:
+            lines.append(f"  - {issue.kind}: {issue.fragment} ({issue.complexity})")
+        return "\n".join(lines)
+
+
+def analyze(pattern) -> Analysis:
+    """パターン文字列（または parse() したAST）の最悪計算量を見積もる"""
+    if isinstance(pattern, str):
+        source, ast = pattern, parse(pattern)
+    else:
+        source, ast = _source(pattern), pattern
+    issues = []
+    degree = _walk(ast, issues)
+    if any(issue.complexity == EXPONENTIAL for issue in issues):
+        return Analysis(source, EXPONENTIAL, degree, issues)
+    if degree > 1:
+        return Analysis(source, POLYNOMIAL, degree, issues)
+    return Analysis(source, LINEAR, 1, issues)
+
+
+def _walk(root, issues):
+    """部分木の多項式の次数を返す
+
+    入れ子は再帰せず、たどる途中のノードを (ノード, それを囲む無制限の繰り返しの数, 子) と
+    してスタックに積む。指摘は、ノードに入るとき（繰り返し・OR）と子をたどり終えたとき
+    （連結）に、再帰でたどるのと同じ順に足す。各ノードの性質（_facts）は最初に木全体の分を
+    1度だけ求めて使い回す。
+    """
+    facts = _facts(root)
+    degrees = {}  # id(ノード) -> 次数
+    stack = [(root, 0, None)]
+    while stack:
+        node, loops, children = stack.pop()
+        if children is not None:
+            degree = max((degrees[id(child)] for child in children), default=1)
+            if isinstance(node, ConcatNode):
+                count, run = _overlapping_run(children, facts)
+                if count > 1:
+                    fragment = "".join(_fragment(item, node) for item in run)
+                    issues.append(
+                        Issue("overlapping quantifiers", fragment, POLYNOMIAL)
+                    )
+                    degree = max(degree, count)
+            elif isinstance(node, RepeatNode) and _spills_over(node, facts):
+                # (.*a){3} は .*a.*a.*a と同じく、回ごとに繰り返しの終わりを試し直す
+                issues.append(Issue("repeated quantifier", _fragment(node), POLYNOMIAL))
+                degree *= node.high
+            degrees[id(node)] = degree
+            continue
+        inner = loops
+        if isinstance(node, (GroupNode, RepeatNode)):
+            if isinstance(node, RepeatNode) and node.high is None:
+                _check_nested(node, issues, facts)
+                inner += 1
+            children = [node.node]
+        elif isinstance(node, OrNode):
+            children = _flatten(node, OrNode)
+            if loops and _ambiguous(children, facts):
+                issues.append(
+                    Issue("ambiguous alternation", _fragment(node), EXPONENTIAL)
+                )
+        elif isinstance(node, ConcatNode):
+            children = _flatten(node, ConcatNode)
+        else:
+            degrees[id(node)] = 1
+            continue
+        stack.append((node, loops, children))
+        stack.extend((child, inner, None) for child in reversed(children))
+    return degrees[id(root)]
+
+
+def _check_nested(outer, issues, facts):
+    """繰り返しの中の繰り返しで、1回分の一致を複数の反復に分けられるものを探す"""
+    items = _flatten(_ungroup(outer.node), ConcatNode)
+    alphabets = [_alphabet(item) for item in items]
+    counts = Counter(ch for alphabet in alphabets for ch in alphabet)
+    nullables = [_nullable(item, facts) for item in items]
+    required = nullables.count(False)  # 空文字列に一致しえない要素の数
+    for i, item in enumerate(items):
+        inner = _unbounded_repeat(item)
+        if inner is None:
+            if _contains_unbounded(item):
+                # OR などの奥にある繰り返しは分け方を追い切れないので危険とみなす
+                issues.append(Issue("nested quantifier", _fragment(outer), EXPONENTIAL))
+                return
+            continue
+        # 自分以外の要素の文字集合（同じ文字を含む他の要素があるものだけ残す）
+        others = {ch for ch in counts if counts[ch] > (ch in alphabets[i])}
+        if required == (not nullables[i]) or _overlaps(_alphabet(inner.node), others):
+            issues.append(Issue("nested quantifier", _fragment(outer), EXPONENTIAL))
+            return
+
+
+def _spills_over(node, facts):
+    """回数指定の繰り返しで、本体の中の無制限の繰り返しが次の回の分まで一致しうるか
+
+    本体の残りが空文字列に一致しうるか、繰り返しと同じ文字を含むときにそうなる
+    （(a*b){3} の a* は b を越えられないので、回の境目は1通りに決まる）。
+    """
+    if node.high is None or node.high < 2:
+        return False
+    body = node.node
+    loops = []
+    stack = [body]
+    while stack:
+        item = _ungroup(stack.pop())
+        if _unbounded_repeat(item) is not None:
+            loops.append(item)
+        stack.extend(_children(item))
+    if not loops:
+        return False
+    if _nullable(body, facts):
+        return True
+    return any(_overlaps(_alphabet(loop.node), _alphabet(body, loop)) for loop in loops)
+
+
+def _ambiguous(branches, facts):
+    """同じ文字で始まりうる枝の組があるか"""
+    firsts = [first for first in (_first(b, facts) for b in branches) if first]
+    if len(firsts) < 2:
+        return False
+    if any("." in first for first in firsts):
+        return True
+    seen = set()
+    for first in firsts:
+        if not seen.isdisjoint(first):
+            return True
+        seen |= first
+    return False
+
+
+def _overlapping_run(items, facts):
+    """連結の中で、文字集合が隣同士で重なる無制限の繰り返しが続く最長の並び
+
+    間に挟まる空文字列に一致しうる要素（b? など）は並びを切らない。
+    (繰り返しの数, 並びに含まれる要素のリスト) を返す。
+    """
+    best = (0, [])
+    start = None  # 並びの先頭の添字
+    count = 0
+    last = None  # 直前の繰り返し
+    for i, item in enumerate(items):
+        repeat = _unbounded_repeat(item)
+        if repeat is not None:
+            if last is None or not _overlaps(
+                _alphabet(last.node), _alphabet(repeat.node)
+            ):
+                start, count = i, 0
+            count += 1
+            last = repeat
+            if count > best[0]:
+                best = (count, items[start : i + 1])
+        elif not _nullable(item, facts):
+            start, count, last = None, 0, None
+    return best
+
+
+# ----------------------------------------------------------------------
+# ノードの性質
+# ----------------------------------------------------------------------
+def _ungroup(node):
+    while isinstance(node, GroupNode):
+        node = node.node
+    return node
+
+
+def _unbounded_repeat(node):
+    node = _ungroup(node)
+    if isinstance(node, RepeatNode) and node.high is None:
+        return node
+    return None
+
+
+def _contains_unbounded(node):
+    stack = [node]
+    while stack:
+        node = _ungroup(stack.pop())
+        if _unbounded_repeat(node) is not None:
+            return True
+        stack.extend(_children(node))
+    return False
+
+
+def _children(node):
+    if isinstance(node, (ConcatNode, OrNode)):
+        return (node.left, node.right)
+    if isinstance(node, (RepeatNode, GroupNode)):
+        return (node.node,)
+    return ()
+
+
+def _postorder(root):
+    """グループを外した部分木のノードを、子が親より先になる順に返す（再帰しない）"""
+    order = []
+    stack = [root]
+    while stack:
+        node = _ungroup(stack.pop())
+        order.append(node)
+        stack.extend(_children(node))
+    return reversed(order)
+
+
+def _facts(root):
+    """部分木の各ノードの (空文字列に一致しうるか, 先頭になりうる文字の集合) を求める
+
+    id(ノード) -> 値 の辞書を2つ返す。子を先に求めるので、深い木でも再帰しない。
+    """
+    nullable = {}
+    first = {}
+    for node in _postorder(root):
+        if isinstance(node, CharNode):
+            nullable[id(node)] = not node.char
+            first[id(node)] = {node.char} if node.char else set()
+        elif isinstance(node, LiteralNode):
+            nullable[id(node)] = False
+            first[id(node)] = {node.string[0]}
+        elif isinstance(node, CharSetNode):
+            nullable[id(node)] = False
+            first[id(node)] = set(node.chars)
+        elif isinstance(node, AnchorNode):
+            nullable[id(node)] = True
+            first[id(node)] = set()
+        elif isinstance(node, RepeatNode):
+            child = id(_ungroup(node.node))
+            nullable[id(node)] = not node.low or nullable[child]
+            first[id(node)] = first[child] if node.high != 0 else set()
+        elif isinstance(node, (ConcatNode, OrNode)):
+            left, right = id(_ungroup(node.left)), id(_ungroup(node.right))
+            if isinstance(node, ConcatNode):
+                nullable[id(node)] = nullable[left] and nullable[right]
+                first[id(node)] = (
+                    first[left] | first[right] if nullable[left] else first[left]
+                )
+            else:
+                nullable[id(node)] = nullable[left] or nullable[right]
+                first[id(node)] = first[left] | first[right]
+        else:
+            raise TypeError(f"Cannot analyze node: {node!r}")
+    return nullable, first
+
+
+def _nullable(node, facts):
+    """空文字列に一致しうるか（facts は node を含む木の _facts()）"""
+    return facts[0][id(_ungroup(node))]
+
+
+def _first(node, facts):
+    """一致の先頭になりうる文字の集合（"." は任意の文字）"""
+    return facts[1][id(_ungroup(node))]
+
+
+def _alphabet(node, skip=None):
+    """ノードが消費しうる文字の集合（"." は任意の文字）。skip の部分木は数えない"""
+    chars = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is skip:
+            continue
+        if isinstance(node, CharNode):
+            if node.char:
+                chars.add(node.char)
+        elif isinstance(node, LiteralNode):
+            chars.update(node.string)
+        elif isinstance(node, CharSetNode):
+            chars.update(node.chars)
+        elif isinstance(node, (AnchorNode, ConcatNode, OrNode, RepeatNode, GroupNode)):
+            stack.extend(_children(node))
+        else:
+            raise TypeError(f"Cannot analyze node: {node!r}")
+    return chars
+
+
+def _overlaps(a, b):
+    if not a or not b:
+        return False
+    return "." in a or "." in b or bool(a & b)
+
+
+def _flatten(node, cls):
+    items = []
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, cls):
+            stack.append(n.right)
+            stack.append(n.left)
+        else:
+            items.append(n)
+    return items
+
+
+def _fragment(node, parent=None):
+    """指摘に載せる部分式。長いものは先頭だけにする（入れ子の指摘ごとに全体を書き出さない）"""
+    return _source(node, parent, _FRAGMENT_LIMIT)
+
+
+def _source(node, parent=None, limit=None):
+    """ASTをパターン表記に戻す（指摘の表示用）
+
+    括弧が要るかは親の種類で決まるので、(ノード, 親) か出力する文字列をスタックに積む。
+    limit を超えたら、そこまでの limit 文字に "..." を付けて返す。
+    """
+    out = []
+    size = 0
+    stack = [(node, parent)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            out.append(item)
+            size += len(item)
+            if limit is not None and size > limit:
+                return "".join(out)[:limit] + "..."
+            continue
+        node, parent = item
+        if isinstance(node, GroupNode):
+            parts = ["(", (node.node, None), ")"]
+        elif isinstance(node, CharNode):
+            parts = [node.char]
+        elif isinstance(node, LiteralNode):
+            parts = [node.string]
+            if isinstance(parent, RepeatNode):
+                parts = ["(", *parts, ")"]
+        elif isinstance(node, CharSetNode):
+            parts = ["|".join(sorted(node.chars))]
+            if parent is not None:
+                parts = ["(", *parts, ")"]
+        elif isinstance(node, AnchorNode):
+            parts = [node.anchor_type]
+        elif isinstance(node, RepeatNode):
+            parts = [(node.node, node), node.op]
+        elif isinstance(node, ConcatNode):
+            parts = [(node.left, node), (node.right, node)]
+            if isinstance(parent, RepeatNode):
+                parts = ["(", *parts, ")"]
+        elif isinstance(node, OrNode):
+            parts = [(node.left, node), "|", (node.right, node)]
+            if isinstance(parent, (ConcatNode, RepeatNode)):
+                parts = ["(", *parts, ")"]
+        else:
+            raise TypeError(f"Cannot analyze node: {node!r}")
+        stack.extend(reversed(parts))
+    return "".join(out)
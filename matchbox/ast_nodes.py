@@ -1,72 +1,93 @@
 from dataclasses import dataclass
-from rich.console import Console
 
-console = Console()
 
-
-@dataclass
+@dataclass(slots=True)
 class MatchContext:
-    """マッチング処理中に引き回すコンテキスト情報"""
+    """マッチング処理中に引き回すコンテキスト情報
+
+    テキストは切り出さず、共有バッファ original_text と現在位置 pos で表す。
+    トレース表示と深さの管理は tracer.py の Tracer が別経路で行うので、ここには持たない。
+    """
+
+    original_text: str  # 元の完全なテキスト（全コンテキストで共有）
+    pos: int = 0  # 現在のマッチング位置
 
-    text: str  # 現在のマッチング対象テキスト
-    original_text: str  # 元の完全なテキスト
-    trace: bool = False
-    depth: int = 0
+    @property
+    def text(self):
+        """現在位置以降のテキスト"""
+        return self.original_text[self.pos :]
 
     def advance(self, n=1):
-        """テキストをn文字進めた新しいコンテキストを返す"""
-        return MatchContext(
-            text=self.text[n:],
-            original_text=self.original_text,
-            trace=self.trace,
-            depth=self.depth + 1,
-        )
-
-    def next_depth(self):
-        return MatchContext(
-            text=self.text,
-            original_text=self.original_text,
-            trace=self.trace,
-            depth=self.depth + 1,
-        )
+        """位置をn文字進めた新しいコンテキストを返す"""
+        return self.at(self.pos + n)
+
+    def at(self, pos):
+        """指定位置から始めるコンテキストを返す"""
+        return MatchContext(self.original_text, pos)
 
 
 class Node:
-    """ASTノードの基底クラス"""
+    """ASTノードの基底クラス
+
+    ノードは1文字ごとに作られうるので、どのノードも __slots__ で属性を固定して
+    インスタンスごとの __dict__ を持たない。
+    """
+
+    __slots__ = ()
+    # 葉か、葉だけを並べた連結・OR か（下の「子を持つノードの評価」を参照）
+    _flat = False
 
     def match(self, ctx: MatchContext):
+        """ctx.pos から一致できる終了位置の集合を返す（一致しなければ None）
+
+        子を持つノード（連結・OR・繰り返し・グループ）は再帰せず、_match が明示的な
+        スタックでたどる。葉のノードはそれぞれ自分で評価する。
+        """
+        return _match(self, ctx.original_text, ctx.pos)
+
+    def scan(self, text: str, positions: set) -> set:
+        """positions のいずれかから一致できる終了位置の集合をまとめて返す"""
+        return _scan(self, text, positions)
+
+
+class Leaf(Node):
+    """子を持たないノード。1つの位置からの評価は ends() が行う"""
+
+    __slots__ = ()
+    _flat = True
+
+    def match(self, ctx: MatchContext):
+        return self.ends(ctx.original_text, ctx.pos) or None
+
+    def ends(self, text: str, pos: int):
+        """pos から一致できる終了位置の集合（一致しなければ空集合）"""
         raise NotImplementedError
 
 
+_NO_ENDS = frozenset()
+
+
 # ----------------------------------------------------------------------
 # アンカー (^, $)
 # ----------------------------------------------------------------------
-class AnchorNode(Node):
+class AnchorNode(Leaf):
+    __slots__ = ("anchor_type",)
+
     def __init__(self, anchor_type):
         if anchor_type not in ("^", "$"):
             raise ValueError(f"Invalid anchor type: {anchor_type}")
         self.anchor_type = anchor_type
 
-    def match(self, ctx: MatchContext):
-        pad = "  " * ctx.depth
-        if ctx.trace:
-            console.print(
-                f"{pad}[blue][Anchor('{self.anchor_type}')][/blue] text='[dim]{ctx.text}[/dim]'"
-            )
-
+    def ends(self, text, pos):
         # アンカーは文字を消費しない
-        if self.anchor_type == "^" and ctx.text == ctx.original_text:
-            if ctx.trace:
-                console.print(f"{pad}[green]✔️ Anchor start matches[/green]")
-            return [ctx.text]  # 成功、テキストはそのまま
-        elif self.anchor_type == "$" and ctx.text == "":
-            if ctx.trace:
-                console.print(f"{pad}[green]✔️ Anchor end matches[/green]")
-            return [ctx.text]
-        else:
-            if ctx.trace:
-                console.print(f"{pad}[red]❌ FAIL (Anchor condition not met)[/red]")
-            return None
+        if self.anchor_type == "^":
+            return {0} if pos == 0 else _NO_ENDS
+        return {pos} if pos == len(text) else _NO_ENDS
+
+    def scan(self, text, positions):
+        if self.anchor_type == "^":
+            return {0} & positions
+        return {len(text)} & positions
 
     def __repr__(self):
         return f"Anchor({self.anchor_type!r})"
@@ -75,151 +96,548 @@ class AnchorNode(Node):
 # ----------------------------------------------------------------------
 # リテラル文字
 # ----------------------------------------------------------------------
-class CharNode(Node):
+class CharNode(Leaf):
+    __slots__ = ("char",)
+
     def __init__(self, char):
         self.char = char
 
-    def match(self, ctx: MatchContext):
-        pad = "  " * ctx.depth
-        if ctx.trace:
-            console.print(
-                f"{pad}[blue][Char('{self.char}')][/blue] text='[dim]{ctx.text}[/dim]'"
-            )
-
-        if not ctx.text:
-            if ctx.trace:
-                console.print(f"{pad}[red]❌ FAIL (no input)[/red]")
-            return None
-
-        if self.char == "." or ctx.text[0] == self.char:
-            if ctx.trace:
-                console.print(
-                    f"{pad}[yellow]→ consumes '{ctx.text[0]}'[/yellow] -> rest='[dim]{ctx.text[1:]}[/dim]'"
-                )
-            return [ctx.text[1:]]
-        else:
-            if ctx.trace:
-                console.print(
-                    f"{pad}[red]❌ FAIL (expected '{self.char}', got '{ctx.text[0]}')[/red]"
-                )
-            return None
+    def ends(self, text, pos):
+        if not self.char:  # 空パターンは何も消費せずに一致する
+            return {pos}
+        if pos < len(text) and (self.char == "." or text[pos] == self.char):
+            return {pos + 1}
+        return _NO_ENDS
+
+    def scan(self, text, positions):
+        if not self.char:
+            return set(positions)
+        n = len(text)
+        if self.char == ".":
+            return {p + 1 for p in positions if p < n}
+        char = self.char
+        return {p + 1 for p in positions if p < n and text[p] == char}
 
     def __repr__(self):
         return f"Char({self.char!r})"
 
 
 # ----------------------------------------------------------------------
-# 繰り返し (*, +, ?)
+# リテラル文字列（最適化で連続する文字をまとめたもの）
+# ----------------------------------------------------------------------
+class LiteralNode(Leaf):
+    __slots__ = ("string",)
+
+    def __init__(self, string):
+        self.string = string
+
+    def ends(self, text, pos):
+        if text.startswith(self.string, pos):
+            return {pos + len(self.string)}
+        return _NO_ENDS
+
+    def scan(self, text, positions):
+        string = self.string
+        n = len(string)
+        return {p + n for p in positions if text.startswith(string, p)}
+
+    def __repr__(self):
+        return f"Literal({self.string!r})"
+
+
+# ----------------------------------------------------------------------
+# 文字集合（最適化で1文字同士の OR をまとめたもの）
+# ----------------------------------------------------------------------
+class CharSetNode(Leaf):
+    __slots__ = ("chars",)
+
+    def __init__(self, chars):
+        self.chars = frozenset(chars)
+
+    def ends(self, text, pos):
+        if pos < len(text) and text[pos] in self.chars:
+            return {pos + 1}
+        return _NO_ENDS
+
+    def scan(self, text, positions):
+        n = len(text)
+        chars = self.chars
+        return {p + 1 for p in positions if p < n and text[p] in chars}
+
+    def __repr__(self):
+        return f"CharSet({''.join(sorted(self.chars))!r})"
+
+
+# ----------------------------------------------------------------------
+# 繰り返し (*, +, ?, {m,n})
 # ----------------------------------------------------------------------
 class RepeatNode(Node):
+    """op は "*", "+", "?" か回数指定の "{m}", "{m,}", "{m,n}"
+
+    low / high は繰り返す回数の下限と上限（上限がなければ None）。回数指定も本体を
+    並べた木には展開せず、評価器はこの2つの値で何回目の繰り返しかを数える。
+    """
+
+    __slots__ = ("node", "op", "low", "high")
+
     def __init__(self, node, op):
         self.node = node
         self.op = op
-
-    def match(self, ctx: MatchContext):
-        pad = "  " * ctx.depth
-        if ctx.trace:
-            console.print(
-                f"{pad}[blue][Repeat {self.op}][/blue] start text='[dim]{ctx.text}[/dim]'"
-            )
-
-        results = [ctx.text]
-        current = [ctx.text]
-
-        while current:
-            new = []
-            for t in current:
-                nexts = self.node.match(
-                    ctx.next_depth().advance(len(ctx.text) - len(t))
-                )
-                if nexts:
-                    for n in nexts:
-                        if n not in results:
-                            results.append(n)
-                            new.append(n)
-            current = new
-
-        # 演算子別の調整
-        if self.op == "+":
-            results = results[1:] if len(results) > 1 else []
-        elif self.op == "?":
-            results = results[:2]
-
-        if ctx.trace:
-            for r in results:
-                console.print(
-                    f"{pad}[green]✔️ Repeat result rest='[dim]{r}[/dim]'[/green]"
-                )
-
-        return results if results else None
+        self.low, self.high = repeat_bounds(op)
 
     def __repr__(self):
-        return f"Repeat({self.node}, {self.op!r})"
+        return _format(self)
+
+
+_BOUNDS = {"*": (0, None), "+": (1, None), "?": (0, 1)}
+
+
+def repeat_bounds(op):
+    """繰り返し記号の (下限, 上限)。上限がなければ None"""
+    bounds = _BOUNDS.get(op)
+    if bounds is not None:
+        return bounds
+    if op[:1] == "{" and op[-1:] == "}":
+        low, comma, high = op[1:-1].partition(",")
+        if low.isdigit() and (high.isdigit() or not high):
+            if not comma:
+                return int(low), int(low)
+            return int(low), int(high) if high else None
+    raise ValueError(f"Invalid repeat operator: {op!r}")
 
 
 # ----------------------------------------------------------------------
 # 連結 (ab)
 # ----------------------------------------------------------------------
 class ConcatNode(Node):
+    __slots__ = ("left", "right", "_items", "_flat")
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
-
-    def match(self, ctx: MatchContext):
-        pad = "  " * ctx.depth
-        if ctx.trace:
-            console.print(
-                f"{pad}[blue][Concat][/blue] start text='[dim]{ctx.text}[/dim]'"
-            )
-
-        left_res = self.left.match(ctx.next_depth())
-        results = []
-        if left_res:
-            for rem in left_res:
-                new_ctx = ctx.next_depth().advance(len(ctx.text) - len(rem))
-                right_res = self.right.match(new_ctx)
-                if right_res:
-                    results.extend(right_res)
-
-        if ctx.trace:
-            for r in results:
-                console.print(
-                    f"{pad}[green]✔️ Concat result rest='[dim]{r}[/dim]'[/green]"
-                )
-
-        return results if results else None
+        self._items = None  # 評価時に chain() が作る要素の並び
+        self._flat = None
 
     def __repr__(self):
-        return f"Concat({self.left}, {self.right})"
+        return _format(self)
 
 
 # ----------------------------------------------------------------------
 # OR (a|b)
 # ----------------------------------------------------------------------
 class OrNode(Node):
+    __slots__ = ("left", "right", "_items", "_flat")
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
+        self._items = None
+        self._flat = None
 
-    def match(self, ctx: MatchContext):
-        pad = "  " * ctx.depth
-        if ctx.trace:
-            console.print(f"{pad}[blue][Or][/blue] start text='[dim]{ctx.text}[/dim]'")
-
-        left_res = self.left.match(ctx.next_depth())
-        right_res = self.right.match(ctx.next_depth())
+    def __repr__(self):
+        return _format(self)
 
-        results = []
-        if left_res:
-            results.extend(left_res)
-        if right_res:
-            results.extend(right_res)
 
-        if ctx.trace:
-            for r in results:
-                console.print(f"{pad}[green]✔️ Or result rest='[dim]{r}[/dim]'[/green]")
+# ----------------------------------------------------------------------
+# グループ ((...))
+# ----------------------------------------------------------------------
+class GroupNode(Node):
+    __slots__ = ("node", "index")
 
-        return results if results else None
+    def __init__(self, node, index):
+        self.node = node
+        self.index = index  # 開き括弧の出現順に 1 から振る番号
 
     def __repr__(self):
-        return f"Or({self.left}, {self.right})"
+        return _format(self)
+
+
+# ----------------------------------------------------------------------
+# 子を持つノードの評価（再帰しない）
+#
+# 連結と OR の鎖はグループを外した要素の並びにして順に処理する。子の評価が必要になったら
+# 途中の状態をフレームとしてスタックに積み、子の結果が出たら親のフレームに戻す。Python の
+# 関数呼び出しで木をたどらないので、深い木でも再帰の上限に当たらない。
+#
+# 葉と、葉だけを並べた連結・OR（_flat が真のノード）は、開始位置ごとに評価しても位置の
+# 集合でまとめて評価しても、評価する (ノード, 位置) の組が変わらない（各葉が消費する
+# 長さは決まっているので、別の開始位置から同じ組に届くことがない）。そこでフレームを
+# 積まずに集合のまま scan する。
+# ----------------------------------------------------------------------
+_LEAVES = frozenset({AnchorNode, CharNode, LiteralNode, CharSetNode})
+
+# フレームの種類（フレームはリストで、先頭が種類）
+_CONCAT = 0  # [_CONCAT, 要素の並び, 評価中の添字, 残りの開始位置, 終了位置]
+_OR = 1  # [_OR, 枝の並び, 評価中の添字, 開始位置, 終了位置]
+# [_REPEAT, 本体, 下限, 上限, 一致済みの終了位置, 残りの開始位置, 新しい終了位置, 回数]
+_REPEAT = 2
+
+
+def chain(root):
+    """root 以下の連結・OR の鎖をすべて要素の並びにしておき、root の並びを返す
+
+    並びはグループを外した左から順の要素のタプルで、ノードに覚える（グループは一致する
+    位置を変えないので、(a(bc))d は a, b, c, d の並びとして扱える）。下の鎖もまとめて
+    並べておくので、評価中はどのノードが _flat かを属性だけで判断できる。
+    """
+    pending = [root]
+    while pending:
+        node = pending.pop()
+        cls = type(node)
+        if cls is RepeatNode or cls is GroupNode:
+            pending.append(node.node)
+            continue
+        if (cls is not ConcatNode and cls is not OrNode) or node._items is not None:
+            continue
+        items = []
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            while type(n) is GroupNode:
+                n = n.node
+            if type(n) is cls:
+                stack.append(n.right)
+                stack.append(n.left)
+            else:
+                items.append(n)
+        node._items = tuple(items)
+        node._flat = all(type(item) in _LEAVES for item in items)
+        pending.extend(items)
+    return root._items
+
+
+def _flat_scan(node, text, positions):
+    """_flat なノードを positions からまとめて評価する
+
+    位置が1つだけのとき（開始位置ごとの評価ではこれがほとんど）は、内包表記を使う scan()
+    ではなく ends() で済ませる。
+    """
+    cls = type(node)
+    if cls is ConcatNode:
+        for item in node._items:
+            if len(positions) == 1:
+                for p in positions:
+                    positions = item.ends(text, p)
+            else:
+                positions = item.scan(text, positions)
+            if not positions:
+                break
+        return positions
+    if len(positions) == 1:
+        for p in positions:
+            if cls is OrNode:
+                result = set()
+                for branch in node._items:
+                    result |= branch.ends(text, p)
+                return result
+            return node.ends(text, p)
+    if cls is OrNode:
+        result = set()
+        for branch in node._items:
+            result |= branch.scan(text, positions)
+        return result
+    return node.scan(text, positions)
+
+
+def _repeat_flat(body, low, high, text, positions):
+    """本体が _flat な繰り返しを、位置の集合のまま進める
+
+    下限に届くまでは回ごとの位置の集合をそのまま次の回に渡す。届いてからは、すでに
+    一致済みの位置から先は調べ直さない（同じ位置から残りの回数で届く位置は、前に
+    その位置に来たときに調べてある）ので、上限がなければ不動点で止まる。
+    """
+    if type(body) is CharSetNode or (type(body) is CharNode and len(body.char) == 1):
+        return _repeat_run(body, low, high, text, positions)
+    current = positions
+    for _ in range(low):
+        current = _flat_scan(body, text, current)
+        if not current:
+            return set()
+    results = set(current)
+    level = low
+    while current and level != high:
+        current = _flat_scan(body, text, current) - results
+        results |= current
+        level += 1
+    return results
+
+
+def _repeat_run(body, low, high, text, positions):
+    """1文字に一致する葉の繰り返し（a*, .*, (a|b){2,5} など）を文字の並びの走査で求める
+
+    位置 p から本体に一致する文字が end の手前まで続くなら、終了位置は p + low から
+    min(end, p + high) までのすべて。位置を小さい順に見ると、同じ並びの中の位置は end を
+    共有し、加える範囲も右へずれていくだけなので、加え済みの右端より先だけを加える。
+    """
+    n = len(text)
+    if type(body) is CharSetNode:
+        chars = "".join(body.chars)
+    else:
+        chars = None if body.char == "." else body.char  # None は任意の文字
+    results = set()
+    end = covered = -1  # 直前の並びの終わりと、results に加え済みの範囲の右端
+    for p in sorted(positions):
+        if p > end:
+            end = n if chars is None else _run_end(text, p, chars)
+        stop = end if high is None else min(end, p + high)
+        start = max(p + low, covered + 1)
+        if start <= stop:
+            results.update(range(start, stop + 1))
+            covered = stop
+    return results
+
+
+def _run_end(text, pos, chars):
+    """pos から chars のいずれかの文字が続く並びの終わり
+
+    lstrip で塊ごとに読み飛ばす（塊は倍々に大きくするので、長い並びでも線形）。
+    """
+    n = len(text)
+    size = 64
+    while pos < n:
+        chunk = text[pos : pos + size]
+        rest = chunk.lstrip(chars)
+        pos += len(chunk) - len(rest)
+        if rest:
+            return pos
+        size *= 2
+    return n
+
+
+def _advance(items, i, frontier, text):
+    """連結の i 番目から続く _flat な要素を frontier のまま進め、(次の添字, 終了位置) を返す"""
+    while i < len(items) and frontier and items[i]._flat:
+        frontier = _flat_scan(items[i], text, frontier)
+        i += 1
+    return i, frontier
+
+
+def _match(root, text, pos):
+    """root.match() の本体。1つの開始位置から、各子を開始位置ごとに評価する"""
+    stack = []
+    node = root
+    while True:
+        # node を pos から評価する。子を持つノードはフレームを積んで、_flat でない子へ進む
+        while True:
+            cls = type(node)
+            if cls is GroupNode:
+                node = node.node
+                continue
+            if cls is ConcatNode:
+                items = node._items or chain(node)
+                i, result = _advance(items, 0, {pos}, text)
+                if i == len(items) or not result:
+                    break
+                todo = list(result)
+                stack.append([_CONCAT, items, i, todo, set()])
+                node = items[i]
+                pos = todo.pop()
+            elif cls is OrNode:
+                items = node._items or chain(node)
+                result = set()
+                for i, branch in enumerate(items):
+                    if not branch._flat:
+                        stack.append([_OR, items, i, pos, result])
+                        node = branch
+                        break
+                    result |= _flat_scan(branch, text, {pos})
+                else:
+                    break
+            elif cls is RepeatNode:
+                body = node.node
+                while type(body) is GroupNode:
+                    body = body.node
+                if body._flat is None:
+                    chain(body)
+                low, high = node.low, node.high
+                if body._flat:
+                    result = _repeat_flat(body, low, high, text, {pos})
+                    break
+                if high == 0:
+                    result = {pos}
+                    break
+                # 下限に届くまでは一致を集めない（None）。下限が 0 なら開始位置も一致に含む
+                results = None if low else {pos}
+                stack.append([_REPEAT, body, low, high, results, [], set(), 0])
+                node = body
+            elif cls in _LEAVES:
+                result = node.ends(text, pos)
+                break
+            else:
+                raise TypeError(f"Cannot match node: {node!r}")
+
+        # 子の結果 result を親のフレームに渡す。次に評価する子が決まったら上へ戻る
+        while stack:
+            frame = stack[-1]
+            kind = frame[0]
+            if kind == _REPEAT:
+                todo = frame[5]
+                frame[6] |= result
+                if not todo:
+                    # この回の繰り返しを全開始位置から評価し終えた
+                    frame[7] += 1
+                    results, new = frame[4], frame[6]
+                    if results is None:
+                        if frame[7] == frame[2]:
+                            frame[4] = results = set(new)
+                    else:
+                        new -= results
+                        results |= new
+                    if not new or frame[7] == frame[3]:
+                        stack.pop()
+                        result = results or _NO_ENDS
+                        continue
+                    todo.extend(new)
+                    frame[6] = set()
+                node = frame[1]
+                pos = todo.pop()
+                break
+            if kind == _CONCAT:
+                frame[4] |= result
+                todo = frame[3]
+                if todo:
+                    node = frame[1][frame[2]]
+                    pos = todo.pop()
+                    break
+                # この要素を全開始位置から評価し終えた。続く _flat な要素はまとめて進める
+                items = frame[1]
+                i, result = _advance(items, frame[2] + 1, frame[4], text)
+                if i == len(items) or not result:
+                    stack.pop()
+                    continue
+                todo = list(result)
+                frame[2], frame[3], frame[4] = i, todo, set()
+                node = items[i]
+                pos = todo.pop()
+                break
+            # _OR
+            items, acc = frame[1], frame[4]
+            acc |= result
+            pos = frame[3]
+            for i in range(frame[2] + 1, len(items)):
+                branch = items[i]
+                if not branch._flat:
+                    frame[2] = i
+                    node = branch
+                    break
+                acc |= _flat_scan(branch, text, {pos})
+            else:
+                stack.pop()
+                result = acc
+                continue
+            break
+        else:
+            return result or None
+
+
+def _scan(root, text, positions):
+    """root.scan() の本体。位置の集合をまとめて各子に流す"""
+    stack = []
+    node = root
+    while True:
+        while True:
+            cls = type(node)
+            if cls is GroupNode:
+                node = node.node
+                continue
+            if cls is ConcatNode:
+                items = node._items or chain(node)
+                i, result = _advance(items, 0, positions, text)
+                if i == len(items) or not result:
+                    break
+                stack.append([_CONCAT, items, i])
+                node = items[i]
+                positions = result
+            elif cls is OrNode:
+                items = node._items or chain(node)
+                stack.append([_OR, items, 0, positions, set()])
+                node = items[0]
+            elif cls is RepeatNode:
+                body = node.node
+                while type(body) is GroupNode:
+                    body = body.node
+                if body._flat is None:
+                    chain(body)
+                low, high = node.low, node.high
+                if body._flat:
+                    result = _repeat_flat(body, low, high, text, positions)
+                    break
+                if high == 0:
+                    result = set(positions)
+                    break
+                results = None if low else set(positions)
+                stack.append([_REPEAT, body, low, high, results, 0])
+                node = body
+            elif cls in _LEAVES:
+                result = node.scan(text, positions)
+                break
+            else:
+                raise TypeError(f"Cannot scan node: {node!r}")
+
+        while stack:
+            frame = stack[-1]
+            kind = frame[0]
+            if kind == _REPEAT:
+                frame[5] += 1
+                results = frame[4]
+                if results is None:
+                    new = result
+                    if frame[5] == frame[2]:
+                        frame[4] = results = set(result)
+                else:
+                    new = result - results
+                    results |= new
+                if not new or frame[5] == frame[3]:
+                    stack.pop()
+                    result = set() if results is None else results
+                    continue
+                node = frame[1]
+                positions = new
+                break
+            if kind == _CONCAT:
+                items = frame[1]
+                i, result = _advance(items, frame[2] + 1, result, text)
+                if i == len(items) or not result:
+                    stack.pop()
+                    continue
+                frame[2] = i
+                node = items[i]
+                positions = result
+                break
+            # _OR
+            frame[4] |= result
+            i = frame[2] + 1
+            if i < len(frame[1]):
+                frame[2] = i
+                node = frame[1][i]
+                positions = frame[3]
+                break
+            stack.pop()
+            result = frame[4]
+        else:
+            return result
+
+
+def _format(root):
+    """repr(root)。深い木でも再帰しないよう、出力する断片をスタックで並べる"""
+    out = []
+    stack = [root]
+    while stack:
+        item = stack.pop()
+        cls = type(item)
+        if cls is str:
+            out.append(item)
+            continue
+        if cls is RepeatNode:
+            parts = ("Repeat(", item.node, f", {item.op!r})")
+        elif cls is ConcatNode:
+            parts = ("Concat(", item.left, ", ", item.right, ")")
+        elif cls is OrNode:
+            parts = ("Or(", item.left, ", ", item.right, ")")
+        elif cls is GroupNode:
+            parts = ("Group(", item.node, f", {item.index})")
+        else:
+            out.append(repr(item))
+            continue
+        stack.extend(reversed(parts))
+    return "".join(out)
@@ -0,0 +1,56 @@
+# matchbox/batch.py
+# 1つのパターンを大量のテキストに当てる。件数が多ければプロセスプールで並列に処理する
+#
+# コンパイル済みパターン（AST・命令列・遅延DFA）は各ワーカーの起動時に一度だけ送る。
+# DFAの状態キャッシュは送らず、ワーカーごとに温め直す。
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# これより少ない件数は、プロセス起動とテキスト転送の方が高くつくので直列で処理する
+DEFAULT_MIN_PARALLEL = 10_000
+# ワーカー1つあたりに配るチャンクの数（多いほど負荷は均等になるが、転送回数が増える）
+CHUNKS_PER_WORKER = 4
+MAX_CHUNK_SIZE = 50_000
+
+_worker_pattern = None  # ワーカープロセス内で使うパターン
+
+
+def match_many(pattern, method, texts, workers=None, chunksize=None, min_parallel=None):
+    """texts の各要素に pattern.is_<method> を適用し、結果（bool）を入力順のリストで返す"""
+    texts = texts if isinstance(texts, list) else list(texts)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    if min_parallel is None:
+        min_parallel = DEFAULT_MIN_PARALLEL
+    if workers == 1 or len(texts) < min_parallel:
+        fn = getattr(pattern, f"is_{method}")
+        return [fn(text) for text in texts]
+
+    if chunksize is None:
+        chunksize = tune_chunksize(len(texts), workers)
+    chunks = [texts[i : i + chunksize] for i in range(0, len(texts), chunksize)]
+    results = []
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(pattern,)
+    ) as pool:
+        for part in pool.map(_match_chunk, [method] * len(chunks), chunks):
+            results.extend(part)
+    return results
+
+
+def tune_chunksize(count, workers):
+    """件数とワーカー数からチャンクの大きさを決める"""
+    size = -(-count // (workers * CHUNKS_PER_WORKER))  # 切り上げ
+    return max(1, min(size, MAX_CHUNK_SIZE))
+
+
+def _init_worker(pattern):
+    global _worker_pattern
+    _worker_pattern = pattern
+
+
+def _match_chunk(method, chunk):
+    fn = getattr(_worker_pattern, f"is_{method}")
+    return [fn(text) for text in chunk]
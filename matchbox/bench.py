@@ -0,0 +1,415 @@
+# matchbox/bench.py
+# 再現可能なベンチマーク一式。解析・コンパイル時間、fullmatch / search のスループット、
+# メモリのピーク、最悪ケースのパターンを入力の大きさごとに測り、JSON で保存・比較する
+#
+#   python -m matchbox.bench [run] [--sizes 1000 10000 100000] [--json out.json]
+#   python -m matchbox.bench compare base.json new.json [--threshold 0.1]
+#
+# 入力はすべて固定の乱数の種から生成するので、ネットワークもデータファイルも要らない。
+# compare は2回の実行を同じケース名どうしで突き合わせ、閾値を超えて遅く（大きく）なった
+# ものを回帰として表示し、1つでもあれば終了コード 1 を返す。
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+
+from matchbox.evaluator import Pattern
+from matchbox.parser import parse
+
+RESULT_FORMAT = 1  # JSON の構造を変えたら上げる
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_PATTERN_SIZES = (100, 1_000)
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.10
+DEFAULT_SEED = 0
+
+# 1回の計測はこの秒数以上になるよう、速いケースは繰り返し回数を増やしてまとめて測る
+_MIN_BATCH_SECONDS = 0.01
+# バックトラッキング系は入力長に対して多項式時間なので、これより長い入力では測らない
+_BACKTRACK_MAX_SIZE = 1_000
+
+LOWER = "abcdefghijklmnopqrstuvwxyz"
+
+
+def _any_of(chars):
+    """文字クラスの代わりに1文字ずつの OR を作る（構文に [...] はない）"""
+    return "(" + "|".join(chars) + ")"
+
+
+@dataclass
+class Case:
+    """ベンチマーク1件。make() が計測対象の引数なし関数を返す（準備は計測に含めない）"""
+
+    name: str  # 比較のキー（"search/dfa/log-error/10000" など）
+    group: str  # parse / compile / fullmatch / search / worst
+    size: int  # 入力（または生成パターン）の文字数
+    make: object
+    memory: bool = True  # tracemalloc でピークも測るか
+
+
+@dataclass
+class Result:
+    name: str
+    group: str
+    size: int
+    seconds: float | None = None  # 1回あたりの最短時間
+    cold_seconds: float | None = None  # 準備直後の1回目（DFA の状態構築などを含む）
+    throughput: float | None = None  # 1秒あたりの文字数（照合のケースのみ）
+    peak_bytes: int | None = None  # 1回の実行中に確保したメモリのピーク
+    error: str | None = None  # 失敗したケースの例外名
+
+
+# ----------------------------------------------------------------------
+# コーパス（固定の種から生成する擬似的な実データ）
+# ----------------------------------------------------------------------
+def _log_corpus(rng, size):
+    levels = ["INFO", "INFO", "INFO", "DEBUG", "WARN", "ERROR"]
+    messages = [
+        "request served in 12ms",
+        "cache miss for key user42",
+        "retrying connection to db1",
+        "disk full on /var",
+        "net down on eth0",
+        "request timeout after 30s",
+    ]
+    lines = []
+    length = 0
+    while length < size:
+        line = (
+            f"2024-05-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:"
+            f"{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d} "
+            f"{rng.choice(levels)} {rng.choice(messages)}"
+        )
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)[:size]
+
+
+def _prose_corpus(rng, size):
+    words = "the of and to in is was for on that with as by at from it an be".split()
+    words += ["contact", "support", "example", "mailbox", "regular", "expression"]
+    out = []
+    length = 0
+    while length < size:
+        if rng.random() < 0.02:
+            word = "".join(rng.choice(LOWER) for _ in range(6)) + "@example.com"
+        else:
+            word = rng.choice(words)
+        out.append(word)
+        length += len(word) + 1
+    return " ".join(out)[:size]
+
+
+def _dna_corpus(rng, size):
+    return "".join(rng.choice("ACGT") for _ in range(size))
+
+
+# (名前, パターン, コーパス生成関数)
+CORPUS_CASES = [
+    ("log-error", "ERROR (disk|net) (full|down)", _log_corpus),
+    ("log-level", "(WARN|ERROR) .*timeout", _log_corpus),
+    (
+        "log-time",
+        "(0|1|2)(0|1|2|3|4|5|6|7|8|9):(0|1|2|3|4|5)(0|1|2|3|4|5|6|7|8|9):",
+        _log_corpus,
+    ),
+    ("email", f"{_any_of(LOWER)}+@{_any_of(LOWER)}+\\.(com|org|net)", _prose_corpus),
+    ("dna", "GATTACA(A|T)*(C|G)+TTAG", _dna_corpus),
+]
+
+# (名前, パターン, 入力生成関数)。素朴なバックトラッキングで爆発する形を全体一致で試す。
+# 入力は必須リテラルを末尾近くに含み（プレフィルタでは弾けない）、最後の1文字で失敗する
+WORST_CASES = [
+    ("ambiguous-or", "(a|a)*(a|a)*b", lambda n: "a" * n + "ba"),
+    ("overlap", "(a|aa)*c", lambda n: "a" * n + "ca"),
+    ("dot-star", ".*.*.*x", lambda n: "y" * n + "xy"),
+]
+
+ENGINES = ("dfa", "nfa")
+WORST_ENGINES = ("dfa", "nfa", "memo", "backtrack")
+
+# 生成パターンの部品（解析・コンパイルの計測用）
+_PATTERN_PIECES = ["a", "b", "(c|d)", "e*", ".", "(fg|h)+", "x?", "ijk"]
+
+
+def _generated_pattern(rng, size):
+    parts = []
+    length = 0
+    while length < size:
+        piece = rng.choice(_PATTERN_PIECES)
+        parts.append(piece)
+        length += len(piece)
+    return "".join(parts)
+
+
+# ----------------------------------------------------------------------
+# ケースの組み立て
+# ----------------------------------------------------------------------
+def build_cases(sizes=DEFAULT_SIZES, pattern_sizes=DEFAULT_PATTERN_SIZES, seed=0):
+    """計測するケースのリストを返す（同じ引数なら同じ入力になる）"""
+    cases = []
+    for size in pattern_sizes:
+        pattern = _generated_pattern(random.Random(seed + size), size)
+        cases.append(
+            Case(f"parse/generated/{size}", "parse", size, lambda p=pattern: _parse(p))
+        )
+        cases.append(
+            Case(
+                f"compile/generated/{size}",
+                "compile",
+                size,
+                lambda p=pattern: lambda: Pattern(p),
+            )
+        )
+    for size in sizes:
+        for name, pattern, corpus in CORPUS_CASES:
+            text = corpus(random.Random(seed + size), size)
+            for engine in ENGINES:
+                cases.append(
+                    Case(
+                        f"search/{engine}/{name}/{size}",
+                        "search",
+                        size,
+                        _matcher(pattern, "is_search", text, engine),
+                    )
+                )
+            # 全体一致は「.*パターン.*」で入力全体を走査させる
+            cases.append(
+                Case(
+                    f"fullmatch/dfa/{name}/{size}",
+                    "fullmatch",
+                    size,
+                    _matcher(f".*({pattern}).*", "is_fullmatch", text, "dfa"),
+                )
+            )
+        for name, pattern, make_text in WORST_CASES:
+            text = make_text(size)
+            for engine in WORST_ENGINES:
+                if engine in ("memo", "backtrack") and size > _BACKTRACK_MAX_SIZE:
+                    continue
+                cases.append(
+                    Case(
+                        f"worst/{engine}/{name}/{size}",
+                        "worst",
+                        size,
+                        _matcher(pattern, "is_fullmatch", text, engine),
+                    )
+                )
+    return cases
+
+
+def _parse(pattern):
+    return lambda: parse(pattern)
+
+
+def _matcher(pattern, method, text, engine):
+    def make():
+        fn = getattr(Pattern(pattern), method)
+        return lambda: fn(text, engine=engine)
+
+    return make
+
+
+# ----------------------------------------------------------------------
+# 計測
+# ----------------------------------------------------------------------
+def measure(case, repeat=DEFAULT_REPEAT):
+    """ケースを1件計測して Result を返す。例外はケースの失敗として記録する"""
+    result = Result(case.name, case.group, case.size)
+    try:
+        fn = case.make()
+        start = time.perf_counter()
+        fn()
+        result.cold_seconds = time.perf_counter() - start
+        number = _calibrate(fn, result.cold_seconds)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            best = min(best, (time.perf_counter() - start) / number)
+        result.seconds = best
+        if case.group in ("search", "fullmatch", "worst"):
+            result.throughput = case.size / best if best > 0 else None
+        if case.memory:
+            result.peak_bytes = _peak(fn)
+    except Exception as e:
+        result.error = type(e).__name__
+    return result
+
+
+def _calibrate(fn, seconds):
+    """1回の計測が _MIN_BATCH_SECONDS 以上になる繰り返し回数"""
+    number = 1
+    while seconds * number < _MIN_BATCH_SECONDS:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        seconds = (time.perf_counter() - start) / number
+        number *= 2
+    return number
+
+
+def _peak(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(cases, repeat=DEFAULT_REPEAT, out=None):
+    """全ケースを計測し、結果の辞書（JSON にそのまま書ける）を返す"""
+    results = []
+    for case in cases:
+        result = measure(case, repeat)
+        results.append(result)
+        if out is not None:
+            out.write(_format_result(result) + "\n")
+            out.flush()
+    return {
+        "format": RESULT_FORMAT,
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": [asdict(r) for r in results],
+    }
+
+
+def _format_result(r):
+    if r.error:
+        return f"{r.name:<36} ERROR {r.error}"
+    rate = f"{r.throughput / 1e6:>8.2f} Mch/s" if r.throughput else " " * 14
+    peak = f"{r.peak_bytes / 1024:>10,.0f} KiB" if r.peak_bytes is not None else ""
+    return f"{r.name:<36} {r.seconds * 1e3:>10.3f}ms {rate} {peak}"
+
+
+# ----------------------------------------------------------------------
+# 比較
+# ----------------------------------------------------------------------
+@dataclass
+class Change:
+    name: str
+    metric: str  # "seconds" / "peak_bytes" / "error"
+    base: object
+    new: object
+    ratio: float | None  # new / base
+    regression: bool
+
+
+def compare(base, new, threshold=DEFAULT_THRESHOLD, memory_threshold=None):
+    """2回分の結果を比べ、閾値を超えた変化の Change のリストを返す
+
+    時間は threshold、メモリのピークは memory_threshold（省略時は threshold）を超えて
+    増えたら回帰。成功していたケースが失敗するようになったものも回帰とする。
+    """
+    if memory_threshold is None:
+        memory_threshold = threshold
+    for data in (base, new):
+        if data.get("format") != RESULT_FORMAT:
+            raise ValueError(f"unsupported result format: {data.get('format')!r}")
+    old = {r["name"]: r for r in base["results"]}
+    changes = []
+    for r in new["results"]:
+        b = old.get(r["name"])
+        if b is None:
+            continue
+        if b["error"] or r["error"]:
+            if b["error"] != r["error"]:
+                regression = r["error"] is not None
+                changes.append(
+                    Change(r["name"], "error", b["error"], r["error"], None, regression)
+                )
+            continue
+        for metric, limit in (("seconds", threshold), ("peak_bytes", memory_threshold)):
+            before, after = b[metric], r[metric]
+            if not before or after is None:
+                continue
+            ratio = after / before
+            if ratio > 1 + limit:
+                changes.append(Change(r["name"], metric, before, after, ratio, True))
+            elif ratio < 1 - limit:
+                changes.append(Change(r["name"], metric, before, after, ratio, False))
+    return changes
+
+
+def _format_change(c):
+    flag = "REGRESSION" if c.regression else "improved"
+    if c.metric == "error":
+        return f"{flag:<10} {c.name:<36} error: {c.base} -> {c.new}"
+    if c.metric == "seconds":
+        before, after = f"{c.base * 1e3:.3f}ms", f"{c.new * 1e3:.3f}ms"
+    else:
+        before, after = f"{c.base / 1024:,.0f}KiB", f"{c.new / 1024:,.0f}KiB"
+    return f"{flag:<10} {c.name:<36} {c.metric:<10} {before:>12} -> {after:>12} ({c.ratio:.2f}x)"
+
+
+# ----------------------------------------------------------------------
+# コマンドライン
+# ----------------------------------------------------------------------
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0].startswith("-"):
+        argv.insert(0, "run")  # サブコマンド省略時は run
+
+    parser = argparse.ArgumentParser(
+        prog="python -m matchbox.bench", description="matchbox benchmark suite"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    run_parser.add_argument(
+        "--pattern-sizes", type=int, nargs="+", default=DEFAULT_PATTERN_SIZES
+    )
+    run_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run_parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    run_parser.add_argument(
+        "--filter", help="only run cases whose name contains this string"
+    )
+    run_parser.add_argument("--json", help="write the results to this file")
+
+    cmp_parser = commands.add_parser("compare", help="compare two JSON results")
+    cmp_parser.add_argument("base")
+    cmp_parser.add_argument("new")
+    cmp_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    cmp_parser.add_argument("--memory-threshold", type=float)
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return _main_compare(args)
+
+    cases = build_cases(args.sizes, args.pattern_sizes, args.seed)
+    if args.filter:
+        cases = [c for c in cases if args.filter in c.name]
+    data = run(cases, args.repeat, out=sys.stdout)
+    data["meta"]["seed"] = args.seed
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(data, f, indent=1)
+    return 0
+
+
+def _main_compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    changes = compare(base, new, args.threshold, args.memory_threshold)
+    for change in changes:
+        print(_format_change(change))
+    regressions = sum(c.regression for c in changes)
+    print(f"{regressions} regression(s), {len(changes) - regressions} improvement(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+# matchbox/dfa.py
+# NFA命令列から DFA の状態を必要になった時点で構築する（RE2 方式の遅延DFA）
+import threading
+from dataclasses import dataclass
+
+from matchbox.nfa import ANY, BOL, CHAR, EOL, JMP, MATCH, SAVE, SET, SPLIT
+
+DEFAULT_MAX_MEMORY = 8 * 1024 * 1024  # 状態キャッシュの上限（推定バイト数）
+
+# メモリ使用量の見積もり（CPython の dict / frozenset のおおよそのサイズ）
+_STATE_COST = 400
+_PC_COST = 16
+_TRANSITION_COST = 100
+
+
+@dataclass
+class DFAInfo:
+    """遅延DFAの統計情報"""
+
+    cache_size: int  # 現在キャッシュされている状態数
+    memory: int  # キャッシュの推定使用量（バイト）
+    max_memory: int
+    states_built: int  # これまでに構築した状態の累計
+    flushes: int  # キャッシュを破棄した回数
+
+
+class DFAState:
+    """NFAスレッド集合に対応するDFA状態"""
+
+    __slots__ = (
+        "pcs",
+        "unanchored",
+        "matches",
+        "final_matches",
+        "accepting",
+        "final",
+        "dead",
+        "next",
+        "generation",
+    )
+
+    def __init__(self, pcs, unanchored, matches, final_matches):
+        self.pcs = pcs  # 文字を消費する命令 / MATCH / EOL の pc 集合
+        self.unanchored = unanchored  # 探索モード（各位置で開始スレッドを追加）
+        self.matches = matches  # 途中位置で到達している MATCH のパターン番号
+        self.final_matches = final_matches  # 入力末尾で受理するパターン番号（$ を含む）
+        self.accepting = bool(matches)
+        self.final = bool(final_matches)
+        self.dead = not pcs and not unanchored
+        self.next = {}  # 文字 -> DFAState
+        self.generation = 0  # 登録時のキャッシュ世代（フラッシュごとに進む）
+
+    def __repr__(self):
+        return f"DFAState({sorted(self.pcs)}, accepting={self.accepting})"
+
+
+class LazyDFA:
+    """遅延構築DFA。状態は上限付きキャッシュに保存し、溢れたら全破棄する"""
+
+    def __init__(self, program, max_memory=DEFAULT_MAX_MEMORY):
+        self.program = program
+        self.max_memory = max_memory
+        self.states_built = 0
+        self.flushes = 0
+        self._states = {}
+        self._starts = {}
+        self._memory = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # 状態キャッシュとロックは送らない（受け取った側で遅延構築し直す）
+        return {"program": self.program, "max_memory": self.max_memory}
+
+    def __setstate__(self, state):
+        self.__init__(state["program"], state["max_memory"])
+
+    # ------------------------------------------------------------------
+    # 実行
+    # ------------------------------------------------------------------
+    def fullmatch(self, text: str) -> bool:
+        state = self._start(anchored=True)
+        for ch in text:
+            state = state.next.get(ch) or self._transition(state, ch)
+            if state.dead:
+                return False
+        return state.final
+
+    def match(self, text: str) -> bool:
+        state = self._start(anchored=True)
+        for ch in text:
+            if state.accepting:
+                return True
+            state = state.next.get(ch) or self._transition(state, ch)
+            if state.dead:
+                return False
+        return state.final
+
+    def search(self, text: str, prefix="") -> bool:
+        """prefix を渡すと、進行中のスレッドがない間は str.find で候補位置まで飛ばす"""
+        state = self._start(anchored=False)
+        idle = self._idle() if prefix else None
+        i, end = 0, len(text)
+        while i < end:
+            if state.accepting:
+                return True
+            if state is idle:
+                i = text.find(prefix, i)
+                if i < 0:
+                    return False
+            ch = text[i]
+            state = state.next.get(ch) or self._transition(state, ch)
+            i += 1
+        return state.final
+
+    # ------------------------------------------------------------------
+    # 複数パターン用: 受理したパターン番号の集合を返す
+    # ------------------------------------------------------------------
+    def fullmatch_ids(self, text: str):
+        state = self._start(anchored=True)
+        for ch in text:
+            state = state.next.get(ch) or self._transition(state, ch)
+            if state.dead:
+                return frozenset()
+        return state.final_matches
+
+    def match_ids(self, text: str, limit=None):
+        found = set()
+        state = self._start(anchored=True)
+        for ch in text:
+            found |= state.matches
+            if len(found) == limit:
+                return found
+            state = state.next.get(ch) or self._transition(state, ch)
+            if state.dead:
+                return found
+        return found | state.final_matches
+
+    def search_ids(self, text: str, limit=None):
+        """limit 個すべてが見つかった時点で走査を打ち切る"""
+        found = set()
+        state = self._start(anchored=False)
+        for ch in text:
+            if state.matches:
+                found |= state.matches
+                if len(found) == limit:
+                    return found
+            state = state.next.get(ch) or self._transition(state, ch)
+        return found | state.final_matches
+
+    # ------------------------------------------------------------------
+    # 構築済み状態の書き出し・読み込み（serialize 用）
+    # ------------------------------------------------------------------
+    def export_states(self):
+        """構築済みの状態と遷移を、状態への参照を添字に置き換えた素の値で返す
+
+        (状態の表, 開始状態の添字) を返す。表の各要素は
+        (pcs, unanchored, matches, final_matches, {文字: 遷移先の添字})。
+        """
+        with self._lock:
+            states = list(self._states.values())
+            number = {id(state): i for i, state in enumerate(states)}
+            table = [
+                (
+                    state.pcs,
+                    state.unanchored,
+                    state.matches,
+                    state.final_matches,
+                    {
+                        ch: number[id(nxt)]
+                        for ch, nxt in state.next.items()
+                        if id(nxt) in number
+                    },
+                )
+                for state in states
+            ]
+            starts = {
+                key: number[id(state)]
+                for key, state in self._starts.items()
+                if id(state) in number
+            }
+        return table, starts
+
+    def import_states(self, table, starts) -> bool:
+        """export_states() の結果で空のキャッシュを埋める
+
+        推定使用量が max_memory を超えるなら何もせず False を返す（遅延構築に任せる）。
+        """
+        cost = sum(
+            _STATE_COST + _PC_COST * len(pcs) + _TRANSITION_COST * len(nxt)
+            for pcs, _, _, _, nxt in table
+        )
+        if cost > self.max_memory:
+            return False
+        with self._lock:
+            states = [
+                DFAState(pcs, unanchored, matches, final_matches)
+                for pcs, unanchored, matches, final_matches, _ in table
+            ]
+            for state, (_, _, _, _, nxt) in zip(states, table):
+                state.next = {ch: states[i] for ch, i in nxt.items()}
+                state.generation = self._generation
+                self._states[(state.pcs, state.unanchored)] = state
+            for key, i in starts.items():
+                self._starts[key] = states[i]
+            self._memory += cost
+        return True
+
+    def info(self) -> DFAInfo:
+        return DFAInfo(
+            cache_size=len(self._states),
+            memory=self._memory,
+            max_memory=self.max_memory,
+            states_built=self.states_built,
+            flushes=self.flushes,
+        )
+
+    # ------------------------------------------------------------------
+    # 状態の構築
+    # ------------------------------------------------------------------
+    def _start(self, anchored):
+        state = self._starts.get(anchored)
+        if state is None:
+            with self._lock:
+                pcs = self._closure([0], at_start=True)
+                state = self._intern(pcs, unanchored=not anchored)
+                self._starts[anchored] = state
+        return state
+
+    def _idle(self):
+        """先頭以外の位置で、開始スレッドしか生きていない状態"""
+        state = self._starts.get(None)
+        if state is None:
+            with self._lock:
+                state = self._intern(self._closure([0]), unanchored=True)
+                self._starts[None] = state
+        return state
+
+    def _transition(self, state, ch):
+        ops, xs = self.program.ops, self.program.xs
+        seeds = []
+        for pc in state.pcs:
+            op = ops[pc]
+            if (
+                op == ANY
+                or (op == CHAR and xs[pc] == ch)
+                or (op == SET and ch in xs[pc])
+            ):
+                seeds.append(pc + 1)
+        if state.unanchored:
+            seeds.append(0)
+        with self._lock:
+            nxt = self._intern(self._closure(seeds), state.unanchored)
+            if state.generation != self._generation:
+                # フラッシュで捨てられた状態から遷移したので入れ直す
+                self._reinsert(state)
+            state.next[ch] = nxt
+            self._memory += _TRANSITION_COST
+        return nxt
+
+    def _intern(self, pcs, unanchored):
+        key = (pcs, unanchored)
+        state = self._states.get(key)
+        if state is not None:
+            return state
+        cost = _STATE_COST + _PC_COST * len(pcs)
+        if self._memory + cost > self.max_memory and self._states:
+            self._flush()
+        ops, xs = self.program.ops, self.program.xs
+        matches = frozenset(xs[pc] for pc in pcs if ops[pc] == MATCH)
+        state = DFAState(pcs, unanchored, matches, matches | self._matches_at_end(pcs))
+        state.generation = self._generation
+        self._states[key] = state
+        self._memory += cost
+        self.states_built += 1
+        return state
+
+    def _reinsert(self, state):
+        key = (state.pcs, state.unanchored)
+        state.generation = self._generation
+        if key not in self._states:
+            self._states[key] = state
+            self._memory += _STATE_COST + _PC_COST * len(state.pcs)
+
+    def _flush(self):
+        """キャッシュを全破棄する。保持中の状態の遷移表も切り離してメモリを解放する"""
+        for state in self._states.values():
+            state.next.clear()
+        self._states.clear()
+        self._starts.clear()
+        self._memory = 0
+        self._generation += 1
+        self.flushes += 1
+
+    def _closure(self, seeds, at_start=False):
+        """ε 遷移をたどり、文字を消費する命令・MATCH・EOL の pc 集合を返す"""
+        ops, xs, ys = self.program.ops, self.program.xs, self.program.ys
+        seen = set()
+        result = set()
+        stack = list(seeds)
+        while stack:
+            pc = stack.pop()
+            if pc in seen:
+                continue
+            seen.add(pc)
+            op = ops[pc]
+            if op == JMP:
+                stack.append(xs[pc])
+            elif op == SPLIT:
+                stack.append(xs[pc])
+                stack.append(ys[pc])
+            elif op == SAVE:
+                stack.append(pc + 1)
+            elif op == BOL:
+                if at_start:
+                    stack.append(pc + 1)
+            else:
+                result.add(pc)
+        return frozenset(result)
+
+    def _matches_at_end(self, pcs):
+        """入力末尾で $ を通過して到達できる MATCH のパターン番号"""
+        ops, xs, ys = self.program.ops, self.program.xs, self.program.ys
+        found = set()
+        seen = set()
+        stack = [pc for pc in pcs if ops[pc] == EOL]
+        while stack:
+            pc = stack.pop()
+            if pc in seen:
+                continue
+            seen.add(pc)
+            op = ops[pc]
+            if op == MATCH:
+                found.add(xs[pc])
+            elif op == EOL or op == SAVE:
+                stack.append(pc + 1)
+            elif op == JMP:
+                stack.append(xs[pc])
+            elif op == SPLIT:
+                stack.append(xs[pc])
+                stack.append(ys[pc])
+        return frozenset(found)
@@ -1,40 +1,509 @@
 from matchbox.parser import parse
 from matchbox.ast_nodes import MatchContext
-from rich.console import Console
-
-console = Console()
-
-
-def fullmatch(pattern: str, text: str, trace=False) -> bool:
-    """テキスト全体が正規表現に一致するか"""
-    ast = parse(pattern)
-    ctx = MatchContext(text=text, original_text=text, trace=trace)
-    if trace:
-        console.rule(f"[bold cyan]TRACE for /{pattern}/ on '{text}' (fullmatch)[/]")
-    result = ast.match(ctx)
-    success = result is not None and "" in result
-    if trace:
-        if success:
-            console.print("[bold green]✅ SUCCESS[/bold green]")
+from matchbox.cache import LRUCache
+from matchbox.dfa import LazyDFA
+from matchbox.match import Match
+from matchbox.memo import MemoMatcher
+from matchbox.nfa import (
+    compile_program,
+    encode_program,
+    group_count,
+    pike_captures,
+    pike_match,
+)
+from matchbox.optimizer import optimize
+from matchbox.prefilter import extract
+from matchbox.scanner import Scanner
+
+DEFAULT_CACHE_SIZE = 512
+
+# backtrack: ASTを直接たどる評価器（--trace で可視化できる）
+# memo: (ノード, 位置) ごとに結果を覚えるバックトラッキング（max_steps / timeout を指定できる）
+# nfa: Thompson NFA + Pike VM（入力長に対して線形時間）
+# dfa: NFAから遅延構築するDFA（1文字あたり辞書引き1回）
+ENGINES = ("backtrack", "memo", "nfa", "dfa")
+
+# bytes パターンを扱えるエンジン（ASTを直接たどる評価器は文字列専用）
+BYTES_ENGINES = ("nfa", "dfa")
+
+_cache = LRUCache(DEFAULT_CACHE_SIZE)
+_disk_cache = None  # set_cache_dir() で設定する serialize.DiskCache
+
+
+class Pattern:
+    """コンパイル済みの正規表現（ASTを保持して使い回す）
+
+    bytes のパターンは bytes モードでコンパイルされ、bytes / bytearray / memoryview / mmap
+    をコピーせずにバイト単位で照合する（1バイトが1文字。"." は任意の1バイト）。
+
+    profile_hook に関数を設定すると、照合のたびに計測付きの評価器で判定し、その
+    profiler.Profile を渡して呼ぶ（set_profile_hook() で全パターンに設定できる）。
+    """
+
+    profile_hook = None
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.bytes_mode = isinstance(pattern, bytes)
+        # bytes は latin-1 で文字列にして解析する（1バイトが同じ値の1文字になる）
+        ast = optimize(parse(pattern.decode("latin-1") if self.bytes_mode else pattern))
+        program = compile_program(ast)
+        if self.bytes_mode:
+            program = encode_program(program)
+        # 必須リテラルによる絞り込み（使えるリテラルがなければ None）
+        prefilter = extract(ast)
+        if prefilter and self.bytes_mode:
+            prefilter = prefilter.encode()
+        self._assemble(ast, program, prefilter)
+
+    @classmethod
+    def _restore(cls, pattern, ast, program, prefilter):
+        """解析・コンパイル済みの部品から組み立てる（serialize.loads 用）"""
+        self = cls.__new__(cls)
+        self.pattern = pattern
+        self.bytes_mode = isinstance(pattern, bytes)
+        self._assemble(ast, program, prefilter)
+        return self
+
+    def __getstate__(self):
+        # フックは関数なので送らない（ワーカープロセスでは計測しない）。ASTは深いと pickle
+        # の再帰が上限に当たるので、serialize と同じ入れ子のない表にして送る
+        from matchbox.serialize import _encode_ast
+
+        state = self.__dict__.copy()
+        state.pop("profile_hook", None)
+        state["ast"] = _encode_ast(self.ast)
+        return state
+
+    def __setstate__(self, state):
+        from matchbox.serialize import _decode_ast
+
+        state["ast"] = _decode_ast(state["ast"])
+        self.__dict__.update(state)
+
+    def _assemble(self, ast, program, prefilter):
+        self.ast = ast
+        self.program = program
+        self.groups = group_count(program)
+        self.dfa = LazyDFA(program)
+        self.prefilter = prefilter
+
+    # ------------------------------------------------------------------
+    # Match を返す API（位置とグループは Pike VM で求める）
+    # ------------------------------------------------------------------
+    def fullmatch(
+        self, text: str, trace=False, engine=None, max_steps=None, timeout=None
+    ):
+        """テキスト全体が一致すれば Match、しなければ None"""
+        view = self._input(text)
+        if not self.is_fullmatch(view, trace, engine, max_steps, timeout):
+            return None
+        return self._capture(view, "fullmatch", string=text)
+
+    def match(self, text: str, trace=False, engine=None, max_steps=None, timeout=None):
+        """テキストの先頭から一致すれば Match、しなければ None"""
+        view = self._input(text)
+        if not self.is_match(view, trace, engine, max_steps, timeout):
+            return None
+        return self._capture(view, "match", string=text)
+
+    def search(self, text: str, trace=False, engine=None, max_steps=None, timeout=None):
+        """テキスト中で最も左にある一致の Match、なければ None"""
+        view = self._input(text)
+        engine = self._engine(engine, trace, max_steps, timeout)
+        if engine == "nfa" and not trace and self.profile_hook is None:
+            # Pike VM なら一致判定と位置の記録を1回の走査で行える
+            prefilter = self._prefilter(view)
+            if prefilter and prefilter.rejects(view):
+                return None
+            return self._capture(view, "search", string=text)
+        if not self.is_search(view, trace, engine, max_steps, timeout):
+            return None
+        return self._capture(view, "search", string=text)
+
+    def _capture(self, text, mode, start=0, must_advance=False, string=None):
+        """string は Match に持たせる元の入力（mmap などを memoryview にする前のもの）"""
+        prefilter = self._prefilter(text)
+        prefix = prefilter.prefix if prefilter else ""
+        regs = pike_captures(self.program, text, mode, prefix, start, must_advance)
+        if regs is None:
+            return None
+        return Match(self, text if string is None else string, regs)
+
+    # ------------------------------------------------------------------
+    # 全一致の列挙・置換・分割（前回の一致の終わりから走査を再開する）
+    # ------------------------------------------------------------------
+    def finditer(self, text: str):
+        """重ならない一致を左から順に1つずつ返すジェネレータ"""
+        view = self._input(text)
+        prefilter = self._prefilter(view)
+        if prefilter and prefilter.rejects(view):
+            return
+        pos, must_advance = 0, False
+        while pos <= len(view):
+            m = self._capture(view, "search", pos, must_advance, text)
+            if m is None:
+                return
+            yield m
+            # 空一致の直後は同じ位置での空一致を禁止して無限ループを防ぐ
+            pos = m.end()
+            must_advance = m.start() == m.end()
+
+    def fullmatch_many(self, texts, workers=None, chunksize=None, min_parallel=None):
+        """各テキストが全体一致するかを入力順の bool のリストで返す
+
+        件数が min_parallel 以上なら、workers 個のプロセスに chunksize 件ずつ配って並列に
+        処理する（省略時はCPU数と件数から決める）。少なければ直列で処理する。
+        """
+        from matchbox.batch import match_many  # 並列処理を使うときだけ読み込む
+
+        return match_many(self, "fullmatch", texts, workers, chunksize, min_parallel)
+
+    def search_many(self, texts, workers=None, chunksize=None, min_parallel=None):
+        """各テキストのどこかに一致するかを入力順の bool のリストで返す"""
+        from matchbox.batch import match_many
+
+        return match_many(self, "search", texts, workers, chunksize, min_parallel)
+
+    def scanner(self):
+        """チャンクごとに feed() できるストリーム走査器を作る"""
+        return Scanner(self)
+
+    def findall(self, text: str):
+        """一致した文字列のリスト。グループがあればグループの文字列（複数ならタプル）"""
+        empty = b"" if self.bytes_mode else ""
+        if self.groups == 0:
+            return [m.group() for m in self.finditer(text)]
+        if self.groups == 1:
+            return [m.group(1) or empty for m in self.finditer(text)]
+        return [m.groups(default=empty) for m in self.finditer(text)]
+
+    def sub(self, repl, text: str, count=0):
+        """一致箇所を repl で置き換えた文字列を返す"""
+        return self.subn(repl, text, count)[0]
+
+    def subn(self, repl, text: str, count=0):
+        """sub と同じだが、(置換後の文字列, 置換回数) を返す"""
+        expand = repl if callable(repl) else _template(repl, self.groups)
+        text = self._input(text)
+        pieces = []
+        last = n = 0
+        for m in self.finditer(text):
+            pieces.append(text[last : m.start()])
+            pieces.append(expand(m))
+            last = m.end()
+            n += 1
+            if n == count:
+                break
+        pieces.append(text[last:])
+        # bytes.join は memoryview の断片もそのまま連結できる
+        return (b"" if self.bytes_mode else "").join(pieces), n
+
+    def split(self, text: str, maxsplit=0):
+        """一致箇所で分割する。グループがあれば、その文字列も結果に含める"""
+        text = self._input(text)
+        pieces = []
+        last = n = 0
+        for m in self.finditer(text):
+            pieces.append(text[last : m.start()])
+            pieces.extend(m.groups())
+            last = m.end()
+            n += 1
+            if n == maxsplit:
+                break
+        pieces.append(text[last:])
+        if isinstance(text, memoryview):
+            return [
+                p if p is None or isinstance(p, bytes) else bytes(p) for p in pieces
+            ]
+        return pieces
+
+    # ------------------------------------------------------------------
+    # bool だけを返す高速パス
+    # ------------------------------------------------------------------
+    def is_fullmatch(
+        self, text: str, trace=False, engine=None, max_steps=None, timeout=None
+    ) -> bool:
+        """テキスト全体が正規表現に一致するか"""
+        if self.profile_hook is not None and not trace:
+            return self._profiled("fullmatch", text, engine, max_steps, timeout)
+        text = self._input(text)
+        engine = self._engine(engine, trace, max_steps, timeout)
+        if self._rejects(text, trace):
+            return False
+        if engine == "dfa":
+            return self.dfa.fullmatch(text)
+        if engine == "nfa":
+            return pike_match(self.program, text, "fullmatch")
+        if trace:
+            from matchbox.tracer import trace_fullmatch  # rich はトレース時だけ読み込む
+
+            return trace_fullmatch(self, text)
+        if engine == "memo":
+            result = MemoMatcher(text, max_steps, timeout).match(self.ast, 0)
         else:
-            console.print("[bold red]❌ FAIL[/bold red]")
-    return success
+            result = self.ast.match(MatchContext(text))
+        return result is not None and len(text) in result
 
+    def is_match(
+        self, text: str, trace=False, engine=None, max_steps=None, timeout=None
+    ) -> bool:
+        """テキストの先頭から正規表現に一致するか"""
+        if self.profile_hook is not None and not trace:
+            return self._profiled("match", text, engine, max_steps, timeout)
+        text = self._input(text)
+        engine = self._engine(engine, trace, max_steps, timeout)
+        if self._rejects(text, trace):
+            return False
+        if engine == "dfa":
+            return self.dfa.match(text)
+        if engine == "nfa":
+            return pike_match(self.program, text, "match")
+        if trace:
+            from matchbox.tracer import trace_match
 
-def search(pattern: str, text: str, trace=False) -> bool:
-    """テキストのどこか一部に正規表現が一致するか"""
-    ast = parse(pattern)
-    for i in range(len(text) + 1):
-        sub = text[i:]
-        ctx = MatchContext(text=sub, original_text=text, trace=trace)
+            return trace_match(self, text)
+        if engine == "memo":
+            return MemoMatcher(text, max_steps, timeout).match(self.ast, 0) is not None
+        return self.ast.match(MatchContext(text)) is not None
+
+    def is_search(
+        self, text: str, trace=False, engine=None, max_steps=None, timeout=None
+    ) -> bool:
+        """テキストのどこか一部に正規表現が一致するか"""
+        if self.profile_hook is not None and not trace:
+            return self._profiled("search", text, engine, max_steps, timeout)
+        text = self._input(text)
+        engine = self._engine(engine, trace, max_steps, timeout)
+        prefix = ""
+        prefilter = self._prefilter(text)
+        if prefilter and not trace:
+            if prefilter.rejects(text):
+                return False
+            prefix = prefilter.prefix
+        if engine == "dfa":
+            return self.dfa.search(text, prefix)
+        if engine == "nfa":
+            return pike_match(self.program, text, "search", prefix)
         if trace:
-            console.rule(f"[bold cyan]TRY at index {i} — '{sub}'[/]")
-        result = ast.match(ctx)
-        # ✅ 残りが空("")でなくても、マッチしていればOKにする
-        if result is not None:
-            if trace:
-                console.print(f"[green]✅ SUCCESS at index {i}[/green]")
-            return True
-    if trace:
-        console.print("[red]❌ No partial match found[/red]")
-    return False
+            from matchbox.tracer import trace_search
+
+            return trace_search(self, text)
+        if engine == "memo":
+            # メモは開始位置をまたいで共有できる（部分問題の答えは開始位置によらない）
+            matcher = MemoMatcher(text, max_steps, timeout)
+            starts = self.prefilter.candidates(text) if prefix else range(len(text) + 1)
+            return any(matcher.match(self.ast, i) is not None for i in starts)
+        # 全開始位置を1つの位置集合としてASTに1回だけ流す
+        if prefix:
+            starts = set(self.prefilter.candidates(text))
+        else:
+            starts = set(range(len(text) + 1))
+        return bool(self.ast.scan(text, starts))
+
+    # ------------------------------------------------------------------
+    # 計測
+    # ------------------------------------------------------------------
+    def profile(self, text, method="search", engine=None, max_steps=None, timeout=None):
+        """is_<method>(text) と同じ判定を計測付きで行い、profiler.Profile を返す"""
+        from matchbox.profiler import profile  # 計測するときだけ読み込む
+
+        return profile(self, method, text, engine, max_steps, timeout)
+
+    def _profiled(self, method, text, engine, max_steps, timeout):
+        from matchbox.profiler import profile
+
+        hook = self.profile_hook
+        return profile(self, method, text, engine, max_steps, timeout, hook).matched
+
+    def _rejects(self, text, trace):
+        """先頭一致・全体一致の前に、リテラル条件だけで不一致と分かるか"""
+        prefilter = self._prefilter(text)
+        if prefilter is None or trace:
+            return False
+        return not text.startswith(prefilter.prefix) or prefilter.rejects(text)
+
+    def _prefilter(self, text):
+        """text に使えるプレフィルタ
+
+        memoryview には find / in による部分列探索がなく、bytes にするとコピーになるので、
+        プレフィルタを使わずエンジンだけで照合する。
+        """
+        if isinstance(text, memoryview):
+            return None
+        return self.prefilter
+
+    def _input(self, text):
+        """パターンの種類に合う入力か確かめ、エンジンが1バイトずつ走査できる形にする
+
+        bytes / bytearray はそのまま使う。それ以外のバッファ（memoryview / mmap など）は
+        走査すると int が並ぶ memoryview として見る（どちらもコピーしない）。
+        """
+        if isinstance(text, str):
+            if self.bytes_mode:
+                raise TypeError("cannot use a bytes pattern on a string-like object")
+            return text
+        if not self.bytes_mode:
+            raise TypeError("cannot use a string pattern on a bytes-like object")
+        if isinstance(text, (bytes, bytearray)):
+            return text
+        return memoryview(text).cast("B")
+
+    def _engine(self, engine, trace, max_steps, timeout):
+        engine = _select_engine(engine, trace, max_steps, timeout)
+        if self.bytes_mode and engine not in BYTES_ENGINES:
+            raise ValueError(
+                f"the {engine} engine does not support bytes patterns"
+                f" (choose from {BYTES_ENGINES})"
+            )
+        return engine
+
+    def __repr__(self):
+        return f"Pattern({self.pattern!r})"
+
+
+def _template(repl, groups: int):
+    """置換文字列の \\1 / \\g<1> / \\\\ を解釈し、Match から文字列を作る関数を返す
+
+    repl が bytes なら、同じ規則で解釈して bytes を作る関数を返す。
+    """
+    empty = repl[:0]
+    if isinstance(repl, bytes):
+        repl = repl.decode("latin-1")
+    parts = []  # 文字列（リテラル）か int（グループ番号）
+    literal = []
+    i = 0
+    while i < len(repl):
+        ch = repl[i]
+        if ch != "\\":
+            literal.append(ch)
+            i += 1
+            continue
+        nxt = repl[i + 1 : i + 2]
+        if nxt == "\\":
+            literal.append("\\")
+            i += 2
+            continue
+        if nxt.isdigit():
+            index, i = int(nxt), i + 2
+        elif nxt == "g" and repl[i + 2 : i + 3] == "<" and ">" in repl[i + 3 :]:
+            close = repl.index(">", i + 3)
+            name = repl[i + 3 : close]
+            if not name.isdigit():
+                raise ValueError(f"Bad group reference in replacement: {name!r}")
+            index, i = int(name), close + 1
+        else:
+            raise ValueError(f"Bad escape in replacement: {repl[i : i + 2]!r}")
+        if index > groups:
+            raise ValueError(f"Invalid group reference in replacement: {index}")
+        if literal:
+            parts.append("".join(literal))
+            literal = []
+        parts.append(index)
+    if literal:
+        parts.append("".join(literal))
+    if isinstance(empty, bytes):
+        parts = [p.encode("latin-1") if isinstance(p, str) else p for p in parts]
+
+    def expand(m):
+        return empty.join(
+            (m.group(p) or empty) if isinstance(p, int) else p for p in parts
+        )
+
+    return expand
+
+
+def _select_engine(engine, trace, max_steps=None, timeout=None):
+    """エンジン名を決める
+
+    未指定なら trace 時はバックトラッキング、上限の指定があればメモ化、それ以外は DFA
+    """
+    limited = max_steps is not None or timeout is not None
+    if engine is None:
+        if trace:
+            engine = "backtrack"
+        else:
+            return "memo" if limited else "dfa"
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine!r} (choose from {ENGINES})")
+    if trace and engine != "backtrack":
+        raise ValueError("trace is only supported by the backtrack engine")
+    if limited and engine != "memo":
+        raise ValueError("max_steps and timeout are only supported by the memo engine")
+    return engine
+
+
+def compile(pattern) -> Pattern:
+    """パターンをコンパイルする（同じパターンはLRUキャッシュから再利用）"""
+    if isinstance(pattern, Pattern):
+        return pattern
+    compiled = _cache.get(pattern)
+    if compiled is None:
+        disk = _disk_cache
+        if disk is not None:
+            compiled = disk.get(pattern)
+        if compiled is None:
+            compiled = Pattern(pattern)
+            if disk is not None:
+                disk.put(compiled)
+        _cache.put(pattern, compiled)
+    return compiled
+
+
+def set_cache_dir(directory, dfa=False):
+    """コンパイル済みパターンをディスクにも保存するディレクトリを設定する（None で無効）
+
+    メモリ上のキャッシュにないパターンは、まずこのディレクトリから読み込み、なければ
+    コンパイルして保存する。dfa=True なら保存時点で構築済みのDFA状態も含める。
+    """
+    global _disk_cache
+    if directory is None:
+        _disk_cache = None
+        return
+    from matchbox.serialize import DiskCache  # ディスクキャッシュを使うときだけ読み込む
+
+    _disk_cache = DiskCache(directory, dfa)
+
+
+def set_profile_hook(hook):
+    """全パターンの照合で hook(profiler.Profile) を呼ぶようにする（None で解除）
+
+    パターンごとに設定するなら compile(pattern).profile_hook に代入する（そちらが優先）。
+    """
+    Pattern.profile_hook = None if hook is None else staticmethod(hook)
+
+
+def set_cache_size(maxsize: int):
+    """コンパイル済みパターンのキャッシュ上限を変更する"""
+    _cache.resize(maxsize)
+
+
+def cache_info():
+    """キャッシュのヒット/ミス/追い出し回数を返す"""
+    return _cache.info()
+
+
+def purge():
+    """キャッシュを空にする"""
+    _cache.clear()
+
+
+def fullmatch(
+    pattern, text: str, trace=False, engine=None, max_steps=None, timeout=None
+) -> bool:
+    """テキスト全体が正規表現に一致するか（位置が必要なら compile(pattern) を使う）"""
+    return compile(pattern).is_fullmatch(text, trace, engine, max_steps, timeout)
+
+
+def match(
+    pattern, text: str, trace=False, engine=None, max_steps=None, timeout=None
+) -> bool:
+    """テキストの先頭から正規表現に一致するか"""
+    return compile(pattern).is_match(text, trace, engine, max_steps, timeout)
+
+
+def search(
+    pattern, text: str, trace=False, engine=None, max_steps=None, timeout=None
+) -> bool:
+    """テキストのどこか一部に正規表現が一致するか"""
+    return compile(pattern).is_search(text, trace, engine, max_steps, timeout)
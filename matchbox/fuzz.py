@@ -0,0 +1,416 @@
+# matchbox/fuzz.py
+# 標準の re との差分ファジング。解析器が受け付ける文法の範囲でパターンと入力を乱数で作り、
+# すべてのエンジン（bytes モードを含む）と re の結果を突き合わせる
+#
+#   python -m matchbox.fuzz [--iterations 1000] [--seed 0] [--json out.json]
+#
+# 比べるのは fullmatch / match / search の一致の有無・位置・全グループの位置。食い違いが
+# 見つかったら、同じエンジン・メソッドで食い違ったままになる範囲でパターンと入力を縮めて
+# から報告する。照合時間もエンジンごとに記録し、re より極端に遅かったものを外れ値として
+# 並べる。食い違いが1つでもあれば終了コード 1 を返す。
+import argparse
+import itertools
+import json
+import random
+import re
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+
+from matchbox.ast_nodes import (
+    AnchorNode,
+    CharNode,
+    ConcatNode,
+    GroupNode,
+    OrNode,
+    RepeatNode,
+)
+from matchbox.evaluator import BYTES_ENGINES, ENGINES, Pattern
+from matchbox.parser import parse
+
+# 照合する対象。"nfa:bytes" は bytes パターンを bytes の入力で照合したもの
+TARGETS = (*ENGINES, *(f"{engine}:bytes" for engine in BYTES_ENGINES))
+METHODS = ("fullmatch", "match", "search")
+
+ALPHABET = "abc"
+DEFAULT_ITERATIONS = 1_000
+DEFAULT_TEXTS = 8  # 1パターンあたりの入力の数
+DEFAULT_MAX_DEPTH = 4
+DEFAULT_MAX_TEXT = 12
+DEFAULT_SEED = 0
+# re よりこの倍率以上遅く、かつ _OUTLIER_MIN_SECONDS 以上かかった照合を外れ値とする
+DEFAULT_OUTLIER_RATIO = 50.0
+_OUTLIER_MIN_SECONDS = 0.001
+_MAX_OUTLIERS = 20
+
+
+@dataclass
+class Mismatch:
+    """re と結果が食い違った照合1件。結果は None か、全グループの (開始, 終了) のタプル"""
+
+    pattern: str
+    text: str
+    engine: str
+    method: str
+    expected: object
+    actual: object  # 例外が出たらその名前
+
+
+@dataclass
+class Outlier:
+    pattern: str
+    text: str
+    engine: str
+    seconds: float  # METHODS すべての照合時間の合計
+    re_seconds: float
+    ratio: float
+
+
+@dataclass
+class Report:
+    seed: int
+    cases: int = 0  # 照合した (パターン, 入力) の組の数
+    failures: int = 0  # 食い違った照合の数（縮める前）
+    counterexamples: list = field(default_factory=list)  # 縮めた Mismatch
+    seconds: dict = field(default_factory=dict)  # エンジン名（re を含む）-> 合計時間
+    outliers: list = field(default_factory=list)  # Outlier（倍率の大きい順）
+
+
+# ----------------------------------------------------------------------
+# re への変換
+# ----------------------------------------------------------------------
+def to_re(pattern):
+    """matchbox のパターンと同じ意味の re のパターンをコンパイルする
+
+    matchbox の ^ / $ は式全体に掛かり（a|b$ は (a|b)$）、文字列の先頭・末尾にだけ
+    一致する。. は改行にも一致する。
+    """
+    head = tail = ""
+    if pattern.startswith("^"):
+        head, pattern = r"\A", pattern[1:]
+    if pattern.endswith("$"):
+        tail, pattern = r"\Z", pattern[:-1]
+    return re.compile(f"{head}(?:{pattern}){tail}", re.DOTALL)
+
+
+# ----------------------------------------------------------------------
+# 生成
+# ----------------------------------------------------------------------
+def random_pattern(rng, max_depth=DEFAULT_MAX_DEPTH, alphabet=ALPHABET):
+    """解析器が受け付けるパターンを1つ作る"""
+    while True:
+        pattern = _random_expr(rng, max_depth, alphabet)
+        if rng.random() < 0.15:
+            pattern = "^" + pattern
+        if rng.random() < 0.15:
+            pattern += "$"
+        try:
+            parse(pattern)
+        except SyntaxError:
+            continue  # (a*)* のような繰り返しの重ねは構文エラー
+        return pattern
+
+
+def _random_expr(rng, depth, alphabet):
+    kind = rng.random()
+    if depth <= 0 or kind < 0.3:
+        return rng.choice(alphabet + ".")
+    if kind < 0.55:
+        return _random_expr(rng, depth - 1, alphabet) + _random_expr(
+            rng, depth - 1, alphabet
+        )
+    if kind < 0.7:
+        return (
+            f"{_random_expr(rng, depth - 1, alphabet)}|"
+            f"{_random_expr(rng, depth - 1, alphabet)}"
+        )
+    inner = _random_expr(rng, depth - 1, alphabet)
+    if kind < 0.8:
+        return f"({inner})"
+    if len(inner) > 1:
+        inner = f"({inner})"
+    if kind < 0.95:
+        return inner + rng.choice("*+?")
+    return inner + _random_count(rng)
+
+
+def _random_count(rng):
+    """小さな回数指定 {m} {m,} {m,n} {,n} のどれか"""
+    low = rng.randint(0, 3)
+    high = low + rng.randint(0, 2)
+    return rng.choice(
+        (f"{{{low}}}", f"{{{low},}}", f"{{{low},{high}}}", f"{{,{high}}}")
+    )
+
+
+def random_text(rng, pattern, max_length=DEFAULT_MAX_TEXT, alphabet=ALPHABET):
+    """入力を1つ作る
+
+    半分はパターンに一致する文字列を少し変えたもの（一致する入力と、惜しくも一致しない
+    入力を増やす）、残りはアルファベットと改行・範囲外の文字からの一様な乱択。
+    """
+    chars = alphabet + "\nx"
+    if rng.random() < 0.5:
+        text = list(_sample(parse(pattern), rng, chars))
+        for _ in range(rng.randint(0, 2)):
+            i = rng.randint(0, len(text))
+            if text and rng.random() < 0.5:
+                del text[min(i, len(text) - 1)]
+            else:
+                text.insert(i, rng.choice(chars))
+        return "".join(text[:max_length])
+    return "".join(rng.choice(chars) for _ in range(rng.randint(0, max_length)))
+
+
+def _sample(node, rng, chars):
+    """AST に一致する文字列を1つ作る（解析直後の小さな AST が対象）"""
+    if isinstance(node, CharNode):
+        return rng.choice(chars) if node.char == "." else node.char
+    if isinstance(node, ConcatNode):
+        return _sample(node.left, rng, chars) + _sample(node.right, rng, chars)
+    if isinstance(node, OrNode):
+        return _sample(rng.choice((node.left, node.right)), rng, chars)
+    if isinstance(node, RepeatNode):
+        high = node.low + 3 if node.high is None else node.high
+        count = rng.randint(node.low, high)
+        return "".join(_sample(node.node, rng, chars) for _ in range(count))
+    if isinstance(node, GroupNode):
+        return _sample(node.node, rng, chars)
+    if isinstance(node, AnchorNode):
+        return ""
+    raise TypeError(f"Unknown node type: {node!r}")
+
+
+# ----------------------------------------------------------------------
+# 照合と比較
+# ----------------------------------------------------------------------
+def check(pattern, text, engines=TARGETS):
+    """1組の (パターン, 入力) を engines と re で照合する
+
+    (Mismatch のリスト, {エンジン名: METHODS すべての照合時間の合計}) を返す。
+    時間には re の分も "re" として含める。
+    """
+    expected = {}
+    seconds = {}
+    compiled = to_re(pattern)
+    start = time.perf_counter()
+    for method in METHODS:
+        expected[method] = _outcome(getattr(compiled, method)(text))
+    seconds["re"] = time.perf_counter() - start
+
+    mismatches = []
+    compiled = {}
+    for target in engines:
+        engine, _, mode = target.partition(":")
+        try:
+            if mode not in compiled:
+                source = pattern.encode("latin-1") if mode else pattern
+                compiled[mode] = Pattern(source)
+            p = compiled[mode]
+        except (Exception, RecursionError) as e:
+            for method in METHODS:
+                mismatches.append(
+                    Mismatch(
+                        pattern,
+                        text,
+                        target,
+                        method,
+                        expected[method],
+                        type(e).__name__,
+                    )
+                )
+            continue
+        data = text.encode("latin-1") if mode else text
+        start = time.perf_counter()
+        for method in METHODS:
+            try:
+                actual = _outcome(getattr(p, method)(data, engine=engine))
+            except (Exception, RecursionError) as e:
+                actual = type(e).__name__
+            if actual != expected[method]:
+                mismatches.append(
+                    Mismatch(pattern, text, target, method, expected[method], actual)
+                )
+        seconds[target] = time.perf_counter() - start
+    return mismatches, seconds
+
+
+def _outcome(m):
+    """Match（re のものでも matchbox のものでも）を比べられる値にする"""
+    if m is None:
+        return None
+    return tuple(m.span(i) for i in range(m.re.groups + 1))
+
+
+def minimize(pattern, text, fails):
+    """fails(pattern, text) が真のまま、パターンと入力をできるだけ短くする
+
+    入力は1文字ずつ、パターンは1〜2文字ずつと括弧の対ごとに削る（解析できなくなる
+    パターンは飛ばす）。どちらか一方では縮まなくなったら両方を同時に削ってみて
+    （.c と "\\nc" のように、片方だけ削ると食い違いが消える組のため）、それでも縮まなく
+    なるまで繰り返す。
+    """
+    while True:
+        candidates = itertools.chain(
+            ((pattern, t) for t in _removals(text, (1,))),
+            ((p, text) for p in _pattern_removals(pattern)),
+            itertools.product(_pattern_removals(pattern), list(_removals(text, (1,)))),
+        )
+        for candidate in candidates:
+            if fails(*candidate):
+                pattern, text = candidate
+                break
+        else:
+            return pattern, text
+
+
+def _removals(s, widths):
+    for width in widths:
+        for i in range(len(s) - width + 1):
+            yield s[:i] + s[i + width :]
+
+
+def _pattern_removals(pattern):
+    candidates = list(_removals(pattern, (1, 2)))
+    stack = []
+    for i, ch in enumerate(pattern):
+        if ch == "(":
+            stack.append(i)
+        elif ch == ")" and stack:
+            j = stack.pop()
+            candidates.append(pattern[:j] + pattern[j + 1 : i] + pattern[i + 1 :])
+    for candidate in candidates:
+        try:
+            parse(candidate)
+        except SyntaxError:
+            continue
+        yield candidate
+
+
+# ----------------------------------------------------------------------
+# 実行
+# ----------------------------------------------------------------------
+def run(
+    iterations=DEFAULT_ITERATIONS,
+    seed=DEFAULT_SEED,
+    engines=TARGETS,
+    texts=DEFAULT_TEXTS,
+    max_depth=DEFAULT_MAX_DEPTH,
+    max_text=DEFAULT_MAX_TEXT,
+    outlier_ratio=DEFAULT_OUTLIER_RATIO,
+):
+    """iterations 個のパターンについて texts 個ずつ入力を作って照合し、Report を返す
+
+    反例はエンジンとメソッドの組ごとに最初の1件だけを縮めて残す（同じ不具合の反例が
+    並ぶのを避け、縮める時間も抑える）。
+    """
+    rng = random.Random(seed)
+    report = Report(seed)
+    report.seconds = {name: 0.0 for name in ("re", *engines)}
+    reported = set()
+    for _ in range(iterations):
+        pattern = random_pattern(rng, max_depth)
+        for _ in range(texts):
+            text = random_text(rng, pattern, max_text)
+            mismatches, seconds = check(pattern, text, engines)
+            report.cases += 1
+            for name, spent in seconds.items():
+                report.seconds[name] += spent
+            _record_outliers(report, pattern, text, seconds, outlier_ratio)
+            report.failures += len(mismatches)
+            for m in mismatches:
+                if (m.engine, m.method) not in reported:
+                    reported.add((m.engine, m.method))
+                    report.counterexamples.append(_shrink(m))
+    report.outliers.sort(key=lambda o: o.ratio, reverse=True)
+    del report.outliers[_MAX_OUTLIERS:]
+    return report
+
+
+def _shrink(mismatch):
+    key = (mismatch.engine, mismatch.method)
+
+    def fails(pattern, text):
+        found, _ = check(pattern, text, (mismatch.engine,))
+        return any((m.engine, m.method) == key for m in found)
+
+    pattern, text = minimize(mismatch.pattern, mismatch.text, fails)
+    found, _ = check(pattern, text, (mismatch.engine,))
+    return next(m for m in found if (m.engine, m.method) == key)
+
+
+def _record_outliers(report, pattern, text, seconds, ratio):
+    base = seconds["re"]
+    for name, spent in seconds.items():
+        if name == "re" or spent < _OUTLIER_MIN_SECONDS:
+            continue
+        if base > 0 and spent / base >= ratio:
+            report.outliers.append(
+                Outlier(pattern, text, name, spent, base, spent / base)
+            )
+
+
+def format_report(report):
+    lines = [f"{report.cases} cases (seed {report.seed})", ""]
+    base = report.seconds.get("re") or None
+    lines.append(f"{'engine':<12} {'total':>10} {'per case':>10} {'vs re':>8}")
+    for name, spent in report.seconds.items():
+        per_case = spent / report.cases * 1e6 if report.cases else 0.0
+        ratio = f"{spent / base:>7.1f}x" if base else ""
+        lines.append(f"{name:<12} {spent * 1e3:>8.1f}ms {per_case:>8.1f}us {ratio}")
+    if report.outliers:
+        lines += ["", "slow cases:"]
+        for o in report.outliers:
+            lines.append(
+                f"  {o.engine:<10} {o.seconds * 1e3:>8.2f}ms ({o.ratio:,.0f}x re)"
+                f"  pattern={o.pattern!r} text={o.text!r}"
+            )
+    lines += ["", f"{report.failures} mismatch(es)"]
+    for m in report.counterexamples:
+        lines.append(
+            f"  {m.engine}.{m.method}({m.text!r}) with {m.pattern!r}:"
+            f" expected {m.expected}, got {m.actual}"
+        )
+    return "\n".join(lines)
+
+
+# ----------------------------------------------------------------------
+# コマンドライン
+# ----------------------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m matchbox.fuzz",
+        description="differential fuzzing of the matchbox engines against re",
+    )
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument(
+        "--texts", type=int, default=DEFAULT_TEXTS, help="texts per pattern"
+    )
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH)
+    parser.add_argument("--max-text", type=int, default=DEFAULT_MAX_TEXT)
+    parser.add_argument(
+        "--engines", nargs="+", choices=TARGETS, default=TARGETS, metavar="ENGINE"
+    )
+    parser.add_argument("--outlier-ratio", type=float, default=DEFAULT_OUTLIER_RATIO)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.iterations,
+        args.seed,
+        tuple(args.engines),
+        args.texts,
+        args.max_depth,
+        args.max_text,
+        args.outlier_ratio,
+    )
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(asdict(report), f, indent=1)
+    return 1 if report.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+# matchbox/grep.py
+# CLI の grep モード。パターンを1回だけコンパイルし、ファイルや標準入力を行ごとに照合する
+#
+# 入力は大きなブロック単位で読み、行に切り分けてから照合する。CLI はパターンを bytes で
+# コンパイルするので、行はデコードせずにバイト列のまま照合する（オフセットはバイト位置）。
+# 文字列のパターンを渡した場合は、行を latin-1 で文字列にする（1バイト = 1文字）。
+# 出力には元のバイト列をそのまま書くので、どんなエンコーディングのファイルでも行の内容は
+# 変わらない。
+import io
+import sys
+from dataclasses import dataclass
+
+DEFAULT_BLOCK_SIZE = 1 << 20
+ENCODING = "latin-1"
+
+
+@dataclass
+class GrepOptions:
+    line_regexp: bool = False  # -x: 行全体が一致する行だけ
+    count: bool = False  # -c: 一致した行数だけを表示
+    line_number: bool = False  # -n: 行番号を付ける
+    byte_offset: bool = False  # -b: 行（-o なら一致）のバイトオフセットを付ける
+    only_matching: bool = False  # -o: 一致した部分だけを1つずつ表示
+    with_filename: bool = False  # ファイル名を付ける（複数ファイルのとき）
+
+
+def grep_stream(pattern, stream, options, out, label="(standard input)"):
+    """バイナリストリームを行ごとに照合して out に書き出し、一致した行数を返す"""
+    test = pattern.is_fullmatch if options.line_regexp else pattern.is_search
+    prefix = f"{label}:".encode() if options.with_filename else b""
+    count = 0
+    for lineno, offset, raw in _lines(stream):
+        line = raw if pattern.bytes_mode else raw.decode(ENCODING)
+        if not test(line):
+            continue
+        count += 1
+        if options.count:
+            continue
+        head = prefix
+        if options.line_number:
+            head += b"%d:" % lineno
+        if options.only_matching:
+            matches = (
+                [pattern.fullmatch(line)]
+                if options.line_regexp
+                else pattern.finditer(line)
+            )
+            for m in matches:
+                if m.start() == m.end():
+                    continue  # grep -o と同じく空の一致は表示しない
+                tag = b"%d:" % (offset + m.start()) if options.byte_offset else b""
+                out.write(head + tag + raw[m.start() : m.end()] + b"\n")
+            continue
+        tag = b"%d:" % offset if options.byte_offset else b""
+        out.write(head + tag + raw + b"\n")
+    if options.count:
+        out.write(prefix + b"%d\n" % count)
+    return count
+
+
+def grep_path(pattern, path, options, out):
+    """ファイル（"-" なら標準入力）を照合し、一致した行数を返す"""
+    if path == "-":
+        return grep_stream(pattern, sys.stdin.buffer, options, out)
+    with open(path, "rb", buffering=DEFAULT_BLOCK_SIZE) as f:
+        return grep_stream(pattern, f, options, out, label=path)
+
+
+def grep_paths(pattern, paths, options, out, jobs=1):
+    """複数のファイルを照合し、一致した行数の合計を返す
+
+    jobs が2以上なら、ファイルごとにプロセスプールで並列に処理する。出力はファイルの順に並ぶ。
+    """
+    if jobs <= 1 or len(paths) <= 1 or "-" in paths:
+        return sum(grep_path(pattern, path, options, out) for path in paths)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    total = 0
+    with ProcessPoolExecutor(min(jobs, len(paths))) as pool:
+        results = pool.map(
+            _grep_to_bytes, [pattern] * len(paths), paths, [options] * len(paths)
+        )
+        for count, data in results:
+            out.write(data)
+            total += count
+    return total
+
+
+def _grep_to_bytes(pattern, path, options):
+    buf = io.BytesIO()
+    count = grep_path(pattern, path, options, buf)
+    return count, buf.getvalue()
+
+
+def _lines(stream, block_size=DEFAULT_BLOCK_SIZE):
+    """(行番号, 行頭のバイトオフセット, 改行を除いた行) を順に返す"""
+    lineno = 0
+    offset = 0
+    rest = b""
+    while block := stream.read(block_size):
+        lines = (rest + block).split(b"\n")
+        rest = lines.pop()
+        for raw in lines:
+            lineno += 1
+            yield lineno, offset, raw
+            offset += len(raw) + 1
+    if rest:
+        yield lineno + 1, offset, rest
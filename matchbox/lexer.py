@@ -11,9 +11,44 @@ class Token:
 def tokenize(pattern: str):
     tokens = []
     specials = {"*", "+", "?", "|", "(", ")", ".", "^", "$"}
-    for ch in pattern:
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        i += 1
         if ch in specials:
             tokens.append(Token(ch))
-        else:
-            tokens.append(Token("CHAR", ch))
+            continue
+        if ch == "{":
+            counted = _counted(pattern, i)
+            if counted is not None:
+                op, i = counted
+                tokens.append(Token("REPEAT", op))
+                continue
+        tokens.append(Token("CHAR", ch))
     return tokens
+
+
+def _counted(pattern, i):
+    """pattern[i - 1] の { から始まる回数指定を ("{m,n}" の形の記号, 次の位置) で返す
+
+    re と同じく {m} {m,} {,n} {m,n} {,} を回数指定とし、それ以外の { はただの文字とする。
+    記号は "{m}" "{m,}" "{m,n}" の形にそろえる（{,n} は {0,n}、{,} は {0,}）。
+    """
+    close = pattern.find("}", i)
+    if close < 0:
+        return None
+    low, comma, high = pattern[i:close].partition(",")
+    if not (low or comma) or not (_digits(low) and _digits(high)):
+        return None
+    low = int(low or 0)
+    if not comma:
+        op = f"{{{low}}}"
+    elif high:
+        op = f"{{{low},{int(high)}}}"
+    else:
+        op = f"{{{low},}}"
+    return op, close + 1
+
+
+def _digits(s):
+    return s == "" or (s.isascii() and s.isdigit())
@@ -0,0 +1,58 @@
+# matchbox/match.py
+
+
+class Match:
+    """一致結果。位置とキャプチャグループを保持する"""
+
+    __slots__ = ("re", "string", "offset", "_regs")
+
+    def __init__(self, pattern, string, regs, offset=0):
+        self.re = pattern  # 一致した Pattern
+        self.string = string  # 対象テキスト（offset 以降の部分だけのこともある）
+        self.offset = offset  # string[0] の位置（ストリーム走査では入力全体での位置）
+        self._regs = regs  # [開始, 終了, g1開始, g1終了, ...]（未一致は -1）
+
+    def span(self, group=0):
+        """グループの (開始, 終了)。一致しなかったグループは (-1, -1)"""
+        index = self._index(group)
+        return self._regs[2 * index], self._regs[2 * index + 1]
+
+    def start(self, group=0):
+        return self.span(group)[0]
+
+    def end(self, group=0):
+        return self.span(group)[1]
+
+    def group(self, *groups):
+        """グループの文字列。一致しなかったグループは None。複数指定ならタプル"""
+        if not groups:
+            return self._text(0)
+        if len(groups) == 1:
+            return self._text(groups[0])
+        return tuple(self._text(g) for g in groups)
+
+    def groups(self, default=None):
+        """1番以降のすべてのグループの文字列"""
+        return tuple(
+            default if text is None else text
+            for text in (self._text(g) for g in range(1, len(self._regs) // 2))
+        )
+
+    def __getitem__(self, group):
+        return self._text(group)
+
+    def _text(self, group):
+        start, end = self.span(group)
+        if start < 0 or end < 0:
+            return None
+        text = self.string[start - self.offset : end - self.offset]
+        # memoryview / mmap 上の一致は、その部分だけを bytes にして返す
+        return bytes(text) if isinstance(text, memoryview) else text
+
+    def _index(self, group):
+        if not isinstance(group, int) or not 0 <= group < len(self._regs) // 2:
+            raise IndexError(f"no such group: {group!r}")
+        return group
+
+    def __repr__(self):
+        return f"<Match span={self.span()}, match={self.group()!r}>"
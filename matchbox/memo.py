@@ -0,0 +1,221 @@
+# matchbox/memo.py
+# (ノード, 位置) ごとに結果を覚えるバックトラッキング評価器と、ステップ数・時間の上限
+#
+# ast_nodes の match() は同じ部分問題を何度も解きうる（例: (a|a)*(a|a)*b の右側は、
+# 左側の終了位置ごとに評価し直される）。ここでは各 (ノード, 位置) を一度だけ評価するので、
+# 評価回数は「ノード数 × (テキスト長 + 1)」で抑えられる。ただしメモの答え（終了位置の
+# 集合）を親にまとめる手間は評価回数に比例しない（.* の答えはテキスト長に比例する）ので、
+# ステップ数にはメモを引いた回数とまとめた終了位置の数も数える。
+import time
+
+from matchbox.ast_nodes import (
+    ConcatNode,
+    GroupNode,
+    Leaf,
+    OrNode,
+    RepeatNode,
+    chain,
+)
+
+# 経過時間はこのステップ数ごとに確認する（毎回 perf_counter を呼ぶと遅い）
+_CLOCK_INTERVAL = 256
+
+# match() が積むフレームの種類（フレームはリストで、先頭が種類、2番目がメモのキー）
+_CONCAT = 0  # [_CONCAT, キー, 要素の並び, 評価中の添字, 残りの開始位置, 終了位置]
+_OR = 1  # [_OR, キー, 枝の並び, 評価中の添字, 終了位置]
+# [_REPEAT, キー, 本体, 下限, 上限, 一致済みの終了位置, 残りの開始位置, 新しい終了位置, 回数]
+_REPEAT = 2
+
+_NO_ENDS = frozenset()
+
+
+class MatchTimeout(RuntimeError):
+    """評価がステップ数または経過時間の上限を超えた"""
+
+    def __init__(self, message, steps, elapsed):
+        super().__init__(message)
+        self.steps = steps  # 打ち切るまでのステップ数（MemoMatcher.steps を参照）
+        self.elapsed = elapsed  # 打ち切るまでの経過秒数
+
+
+class MemoMatcher:
+    """1つのテキストに対する (ノード, 位置) -> 終了位置の集合 のメモ付き評価器
+
+    steps は評価した (ノード, 位置) の数、メモから答えた回数、親にまとめた終了位置の数の
+    合計で、かかる時間にほぼ比例する。
+
+    max_steps: 使ってよいステップ数（None なら無制限）
+    timeout: 評価にかけてよい秒数（None なら無制限）
+    """
+
+    def __init__(self, text: str, max_steps=None, timeout=None):
+        self.text = text
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.steps = 0
+        self._memo = {}
+        self._started = time.perf_counter()
+        self._clock_at = 1  # steps がここに達したら経過時間を確認する
+        self._deadline = None if timeout is None else self._started + timeout
+
+    def match(self, node, pos):
+        """node.match() と同じ終了位置の集合（frozenset）か None を返す
+
+        ast_nodes の _match と同じく、子の評価は再帰せずフレームのスタックに積んでたどる。
+        子の (ノード, 位置) はどれもメモを引いてから評価する。
+        """
+        text = self.text
+        memo = self._memo
+        stack = []
+        while True:
+            # (node, pos) の答えを result に求める。メモになく子を持つならフレームを積む
+            while True:
+                while type(node) is GroupNode:
+                    node = node.node
+                key = (node, pos)
+                if key in memo:
+                    self._step()
+                    result = memo[key] or _NO_ENDS
+                    break
+                self._step()
+                cls = type(node)
+                if isinstance(node, Leaf):
+                    result = node.ends(text, pos)
+                    memo[key] = frozenset(result) if result else None
+                    break
+                if cls is ConcatNode:
+                    items = node._items or chain(node)
+                    stack.append([_CONCAT, key, items, 0, [], set()])
+                    node = items[0]
+                elif cls is OrNode:
+                    items = node._items or chain(node)
+                    stack.append([_OR, key, items, 0, set()])
+                    node = items[0]
+                elif cls is RepeatNode:
+                    body = node.node
+                    while type(body) is GroupNode:
+                        body = body.node
+                    low, high = node.low, node.high
+                    if isinstance(body, Leaf) or high == 0:
+                        result = self._repeat_leaf(body, low, high, pos)
+                        memo[key] = frozenset(result) if result else None
+                        break
+                    results = None if low else {pos}
+                    stack.append([_REPEAT, key, body, low, high, results, [], set(), 0])
+                    node = body
+                else:
+                    raise TypeError(f"Cannot match node: {node!r}")
+
+            # 子の結果を親のフレームに渡す。親が終わったらその答えをメモして、さらに上へ
+            while stack:
+                if result:
+                    self._step(len(result))  # 子の終了位置を親にまとめる
+                frame = stack[-1]
+                kind = frame[0]
+                if kind == _CONCAT:
+                    frame[5] |= result
+                    todo = frame[4]
+                    if not todo:
+                        frame[3] += 1
+                        if frame[3] < len(frame[2]) and frame[5]:
+                            todo.extend(frame[5])
+                            frame[5] = set()
+                    if todo:
+                        node = frame[2][frame[3]]
+                        if isinstance(node, Leaf):
+                            # 葉は残りの開始位置の分をここでまとめて評価する
+                            ends = frame[5]
+                            while todo:
+                                ends |= self._leaf(node, todo.pop())
+                            result = _NO_ENDS
+                            continue
+                        pos = todo.pop()
+                        break
+                    result = frame[5]
+                elif kind == _OR:
+                    frame[4] |= result
+                    frame[3] += 1
+                    if frame[3] < len(frame[2]):
+                        node = frame[2][frame[3]]
+                        pos = frame[1][1]
+                        break
+                    result = frame[4]
+                else:  # _REPEAT
+                    todo = frame[6]
+                    frame[7] |= result
+                    if not todo:
+                        # この回の繰り返しを全開始位置から評価し終えた
+                        frame[8] += 1
+                        results, new = frame[5], frame[7]
+                        if results is None:
+                            if frame[8] == frame[3]:
+                                frame[5] = results = set(new)
+                        else:
+                            new -= results
+                            results |= new
+                        if new and frame[8] != frame[4]:
+                            todo.extend(new)
+                            frame[7] = set()
+                    if todo:
+                        node = frame[2]
+                        pos = todo.pop()
+                        break
+                    result = frame[5] or _NO_ENDS
+                stack.pop()
+                key = frame[1]
+                memo[key] = frozenset(result) if result else None
+            else:
+                return memo[key]
+
+    def _repeat_leaf(self, body, low, high, pos):
+        """本体が葉の繰り返し（a* や .* など）を、フレームを積まずに pos から評価する
+
+        評価する (本体, 位置) の組とメモの引き方はフレームを使う場合と同じ。
+        """
+        leaf = self._leaf
+        results = None if low else {pos}
+        current = {pos}
+        level = 0
+        while current and level != high:
+            new = set()
+            for p in current:
+                new |= leaf(body, p)
+            level += 1
+            if results is None:
+                current = new
+                if level == low:
+                    results = set(new)
+            else:
+                current = new - results
+                results |= current
+        return results or set()
+
+    def _leaf(self, node, pos):
+        """葉の (node, pos) をメモを引いて評価し、終了位置の集合を返す
+
+        呼び出し側は答えを集合にまとめるので、その終了位置の数もステップに数える。
+        """
+        key = (node, pos)
+        memo = self._memo
+        self._step()
+        if key in memo:
+            ends = memo[key] or _NO_ENDS
+        else:
+            ends = node.ends(self.text, pos)
+            memo[key] = frozenset(ends) if ends else None
+        if ends:
+            self._step(len(ends))
+        return ends
+
+    def _step(self, n=1):
+        self.steps += n
+        if self.max_steps is not None and self.steps > self.max_steps:
+            self._abort(f"step budget of {self.max_steps} exceeded")
+        if self._deadline is not None and self.steps >= self._clock_at:
+            self._clock_at = self.steps + _CLOCK_INTERVAL
+            if time.perf_counter() > self._deadline:
+                self._abort(f"timeout of {self.timeout}s exceeded")
+
+    def _abort(self, message):
+        elapsed = time.perf_counter() - self._started
+        raise MatchTimeout(message, self.steps, elapsed)
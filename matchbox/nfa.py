@@ -0,0 +1,580 @@
+# matchbox/nfa.py
+# ASTをThompson NFAの命令列にコンパイルし、Pike VMで線形時間シミュレーションする
+#
+# 命令列は命令ごとのオブジェクトではなく、命令コードの array と被演算子のタプルを並べた
+# フラットな表（Program）で持つ。命令 pc は (ops[pc], xs[pc], ys[pc]) で、実行時は
+# 添字で引くだけなので属性の参照も命令ごとのオブジェクトも要らない。
+
+from array import array
+from dataclasses import dataclass
+
+from matchbox.ast_nodes import (
+    AnchorNode,
+    CharNode,
+    CharSetNode,
+    ConcatNode,
+    GroupNode,
+    LiteralNode,
+    OrNode,
+    RepeatNode,
+)
+
+# 命令コード
+CHAR = 0  # x の1文字を消費
+ANY = 1  # 任意の1文字を消費
+SET = 2  # 集合 x に含まれる1文字を消費
+SPLIT = 3  # x と y に分岐（x を優先）
+JMP = 4  # x へ移動（y が 0 以外なら、空文字列に一致しうる本体を持つ繰り返しの印 y）
+BOL = 5  # 入力の先頭でのみ通過
+EOL = 6  # 入力の末尾でのみ通過
+SAVE = 7  # 現在位置をキャプチャスロット x に記録
+MATCH = 8  # 受理（x はパターン番号）
+
+OP_NAMES = ("CHAR", "ANY", "SET", "SPLIT", "JMP", "BOL", "EOL", "SAVE", "MATCH")
+
+MODES = ("fullmatch", "match", "search")
+
+
+@dataclass(slots=True)
+class Instruction:
+    """命令1つ分の読み取り用の表現（Program を添字で引いたときに作る）"""
+
+    op: int
+    x: object = None
+    y: object = None
+
+    def __repr__(self):
+        name = OP_NAMES[self.op]
+        if self.op in (CHAR, JMP, MATCH, SAVE):
+            return f"{name} {self.x!r}"
+        if self.op == SET:
+            chars = sorted(self.x)
+            text = (
+                bytes(chars) if chars and isinstance(chars[0], int) else "".join(chars)
+            )
+            return f"{name} {text!r}"
+        if self.op == SPLIT:
+            return f"{name} {self.x}, {self.y}"
+        return name
+
+
+class Program:
+    """フラットな命令列
+
+    ops: 命令コードの array("B")
+    xs: 被演算子 x のタプル（文字 / 文字集合 / 飛び先 / スロット番号 / パターン番号）
+    ys: SPLIT の2つめの飛び先と JMP の印の array("i")（他の命令では 0）
+    """
+
+    __slots__ = ("ops", "xs", "ys", "groups", "loops", "owners")
+
+    def __init__(self, ops, xs, ys):
+        self.ops = array("B", ops)
+        self.xs = tuple(xs)
+        self.ys = array("i", ys)
+        # 記録するキャプチャグループの数（照合のたびに数え直さないよう先に求めておく）
+        self.groups = max(
+            (x // 2 for op, x in zip(self.ops, self.xs) if op == SAVE), default=0
+        )
+        self.loops, self.owners = _loop_table(self.ops, self.xs, self.ys)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __getitem__(self, pc):
+        op = self.ops[pc]
+        return Instruction(op, self.xs[pc], self.ys[pc] if op == SPLIT else None)
+
+    def __iter__(self):
+        return (self[pc] for pc in range(len(self.ops)))
+
+    def __eq__(self, other):
+        if not isinstance(other, Program):
+            return NotImplemented
+        return (self.ops, self.xs, self.ys) == (other.ops, other.xs, other.ys)
+
+    def __getstate__(self):
+        return (self.ops.tobytes(), self.xs, self.ys.tolist())
+
+    def __setstate__(self, state):
+        ops, xs, ys = state
+        self.__init__(ops, xs, ys)
+
+    def __repr__(self):
+        return f"Program({list(self)!r})"
+
+
+def _loop_table(ops, xs, ys):
+    """印の付いた繰り返しの範囲を調べる（_add_capture_thread 用）
+
+    戻り値は、印ごとにその繰り返しの最後の命令の pc を引く辞書（ループの末尾の JMP か、
+    省略できる回の並びの最後の命令）と、各命令を囲む最も内側の繰り返しの印の
+    array("i")（囲まれていなければ 0）。
+    """
+    ranges = []
+    for pc, (op, x, y) in enumerate(zip(ops, xs, ys)):
+        if op != JMP or y != pc + 1:
+            continue
+        if x < pc:
+            ranges.append((x, pc, y))
+        else:  # 省略できる回の並びの入口: 直後の SPLIT のもう一方の飛び先が出口
+            ranges.append((pc, ys[pc + 1] - 1, y))
+    ranges.sort(key=lambda r: (r[0], -r[1]))
+    ends = {}
+    owners = array("i", bytes(4 * len(ops)))
+    enclosing = []
+    i = 0
+    for pc in range(len(ops)):
+        while enclosing and enclosing[-1][1] < pc:
+            enclosing.pop()
+        while i < len(ranges) and ranges[i][0] == pc:
+            enclosing.append(ranges[i])
+            ends[ranges[i][2]] = ranges[i][1]
+            i += 1
+        if enclosing:
+            owners[pc] = enclosing[-1][2]
+    return ends, owners
+
+
+class _Builder:
+    """命令を1つずつ積み、最後に Program にまとめる（飛び先は後から書き換えられる）"""
+
+    __slots__ = ("ops", "xs", "ys")
+
+    def __init__(self):
+        self.ops = []
+        self.xs = []
+        self.ys = []
+
+    def emit(self, op, x=None, y=0):
+        """命令を追加し、その pc を返す"""
+        self.ops.append(op)
+        self.xs.append(x)
+        self.ys.append(y)
+        return len(self.ops) - 1
+
+    def __len__(self):
+        return len(self.ops)
+
+    def build(self):
+        return Program(self.ops, self.xs, self.ys)
+
+
+def compile_program(ast, match_id=0):
+    """ASTから命令列（Program）を生成する。末尾は MATCH 命令"""
+    builder = _Builder()
+    _emit(ast, builder)
+    builder.emit(MATCH, match_id)
+    return builder.build()
+
+
+def compile_set(asts):
+    """複数のASTを1つの命令列にまとめる。i 番目のパターンは MATCH i で受理する"""
+    builder = _Builder()
+    for i, ast in enumerate(asts):
+        split = None
+        if i < len(asts) - 1:
+            split = builder.emit(SPLIT, len(builder) + 1)
+        _emit(ast, builder)
+        builder.emit(MATCH, i)
+        if split is not None:
+            builder.ys[split] = len(builder)
+    return builder.build()
+
+
+def encode_program(program):
+    """CHAR / SET の文字をバイト値（int）に置き換えた命令列を返す（bytes パターン用）
+
+    bytes パターンは latin-1 で文字列にしてからコンパイルするので、各文字の ord() が
+    そのまま元のバイト値になる。bytes を走査すると要素は int なので、比較もそのまま通る。
+    """
+    xs = []
+    for op, x in zip(program.ops, program.xs):
+        if op == CHAR:
+            x = ord(x)
+        elif op == SET:
+            x = frozenset(map(ord, x))
+        xs.append(x)
+    return Program(program.ops, xs, program.ys)
+
+
+def _emit(root, builder):
+    """root の命令を積み、それが空文字列に一致しうるかを返す
+
+    入れ子は再帰せずにたどる。stack には、これから出力するノードと、子を出力し終えた
+    あとに行う後始末 (_AFTER_*, 引数) を積む。出力し終えた部分木が空文字列に一致しうるかは
+    nullables に積み、後始末がそれを取り出して親の分をまとめる。
+    """
+    nullables = []
+    stack = [root]
+    while stack:
+        task = stack.pop()
+        if type(task) is tuple:
+            _finish(task, builder, nullables)
+            continue
+        node = task
+        if isinstance(node, CharNode):
+            if node.char == ".":
+                builder.emit(ANY)
+            elif node.char:  # 空パターンは何も消費しない
+                builder.emit(CHAR, node.char)
+            nullables.append(not node.char)
+        elif isinstance(node, LiteralNode):
+            for ch in node.string:
+                builder.emit(CHAR, ch)
+            nullables.append(not node.string)
+        elif isinstance(node, CharSetNode):
+            builder.emit(SET, node.chars)
+            nullables.append(False)
+        elif isinstance(node, AnchorNode):
+            builder.emit(BOL if node.anchor_type == "^" else EOL)
+            nullables.append(True)
+        elif isinstance(node, GroupNode):
+            builder.emit(SAVE, 2 * node.index)
+            stack.append((_AFTER_GROUP, node.index))
+            stack.append(node.node)
+        elif isinstance(node, ConcatNode):
+            # 長い連結の鎖も、並びにしてから順に出力する
+            items = _chain(node, ConcatNode)
+            stack.append((_AFTER_CONCAT, len(items)))
+            stack.extend(reversed(items))
+        elif isinstance(node, OrNode):
+            # a|b|c は SPLIT a, (SPLIT b, c) と同じ優先順の分岐の並びにする
+            branches = _chain(node, OrNode)
+            state = [None, []]  # [最後の SPLIT の pc, 各枝の末尾の JMP の pc]
+            stack.append((_AFTER_OR, state, len(branches)))
+            stack.append(branches[-1])
+            for branch in reversed(branches[:-1]):
+                stack.append((_AFTER_BRANCH, state))
+                stack.append(branch)
+                stack.append((_BEFORE_BRANCH, state))
+        elif isinstance(node, RepeatNode):
+            # ループの末尾の直後が出口。本体が空文字列に一致しうるループは末尾を印付きの
+            # JMP にする（_add_capture_thread が同じ位置での空の繰り返しを見分けるため）
+            if node.high == 0:
+                # {0} の本体は飛び越して実行しない（グループの数を数えるため命令は置く）
+                start = builder.emit(JMP)
+                stack.append((_AFTER_SKIP, start))
+                stack.append(node.node)
+                continue
+            if node.op not in ("*", "+", "?"):
+                # 回数指定は本体を回数分並べる。省略できる回が2回以上あれば、その部分は
+                # _BEFORE_OPTIONAL で分岐と印を挟みながら並べる
+                optional = 0 if node.high is None else node.high - node.low
+                if optional < 2:
+                    stack.append(_unroll(node.node, node.low, node.high))
+                    continue
+                state = [None, [], []]  # [入口の JMP の pc, 各回の SPLIT, 抜ける JMP]
+                stack.append((_AFTER_OPTIONAL, state, node.low))
+                for i in reversed(range(optional)):
+                    stack.append(node.node)
+                    stack.append((_BEFORE_OPTIONAL, state, i))
+                if node.low:
+                    stack.append(_unroll(node.node, node.low, node.low))
+                continue
+            if node.op == "+":
+                start = len(builder)
+            else:
+                start = builder.emit(SPLIT, len(builder) + 1)
+            stack.append((_AFTER_REPEAT, node.op, start))
+            stack.append(node.node)
+        else:
+            raise TypeError(f"Cannot compile node: {node!r}")
+    return nullables.pop()
+
+
+# _emit が子を出力し終えたあとに行う後始末の種類
+_AFTER_GROUP = 0
+_AFTER_CONCAT = 1
+_BEFORE_BRANCH = 2
+_AFTER_BRANCH = 3
+_AFTER_OR = 4
+_AFTER_REPEAT = 5
+_AFTER_SKIP = 6
+_BEFORE_OPTIONAL = 7
+_AFTER_OPTIONAL = 8
+
+
+def _finish(task, builder, nullables):
+    kind = task[0]
+    if kind == _AFTER_GROUP:
+        builder.emit(SAVE, 2 * task[1] + 1)
+    elif kind == _AFTER_CONCAT:
+        n = task[1]
+        nullable = all(nullables[-n:])
+        del nullables[-n:]
+        nullables.append(nullable)
+    elif kind == _BEFORE_BRANCH:
+        task[1][0] = builder.emit(SPLIT, len(builder) + 1)
+    elif kind == _AFTER_BRANCH:
+        split, jumps = task[1]
+        jumps.append(builder.emit(JMP))
+        builder.ys[split] = len(builder)
+    elif kind == _AFTER_OR:
+        for jmp in task[1][1]:
+            builder.xs[jmp] = len(builder)
+        n = task[2]
+        nullable = any(nullables[-n:])
+        del nullables[-n:]
+        nullables.append(nullable)
+    elif kind == _AFTER_SKIP:
+        builder.xs[task[1]] = len(builder)
+        nullables[-1] = True
+    elif kind == _BEFORE_OPTIONAL:
+        # 省略できる回の並び: 入口の JMP のあと、各回を SPLIT で始め、回と回の間に印を置く。
+        # re と同じく、空文字列に一致した回のあとはもう繰り返さないように、本体が空文字列に
+        # 一致しうるなら入口と回の間の JMP を同じ印にし、印を2度通ったら並びを抜ける
+        state = task[1]
+        if task[2] == 0:
+            state[0] = builder.emit(JMP, len(builder) + 1)
+        elif nullables.pop():
+            mark = state[0] + 1
+            builder.ys[state[0]] = mark
+            builder.emit(JMP, len(builder) + 2, mark)
+            state[2].append(builder.emit(JMP))
+        state[1].append(builder.emit(SPLIT, len(builder) + 1))
+    elif kind == _AFTER_OPTIONAL:
+        state = task[1]
+        nullables.pop()
+        for split in state[1]:
+            builder.ys[split] = len(builder)
+        for jmp in state[2]:
+            builder.xs[jmp] = len(builder)
+        if not task[2]:
+            nullables.append(True)
+    else:  # _AFTER_REPEAT
+        op, start = task[1], task[2]
+        empty = nullables.pop()
+        # 印は JMP 自身の pc + 1（繰り返しごとに異なる 0 以外の値）
+        if op == "*":
+            builder.emit(JMP, start, len(builder) + 1 if empty else 0)
+            builder.ys[start] = len(builder)
+            nullables.append(True)
+        elif op == "+":
+            if empty:
+                builder.emit(SPLIT, len(builder) + 1, len(builder) + 2)
+                builder.emit(JMP, start, len(builder) + 1)
+            else:
+                builder.emit(SPLIT, start, len(builder) + 1)
+            nullables.append(empty)
+        else:
+            builder.ys[start] = len(builder)
+            nullables.append(True)
+
+
+def _unroll(body, low, high):
+    """body{low,high} を、同じ本体を並べた式にする（省略できる回は1回まで）
+
+    x{3} は xxx、x{2,} は xx+、x{2,3} は xxx? になる。本体のノードは複製せずに共有する
+    （展開した式はこの出力にだけ使い、ASTには残さない）。
+    """
+    items = [body] * low
+    if high is None:
+        if low:
+            items[-1] = RepeatNode(body, "+")
+        else:
+            items.append(RepeatNode(body, "*"))
+    elif high > low:
+        items.append(RepeatNode(body, "?"))
+    unrolled = items[0]
+    for item in items[1:]:
+        unrolled = ConcatNode(unrolled, item)
+    return unrolled
+
+
+def _chain(node, cls):
+    """同じ種類の二項ノードの入れ子を、左から順の要素のリストにする"""
+    items = []
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, cls):
+            stack.append(n.right)
+            stack.append(n.left)
+        else:
+            items.append(n)
+    return items
+
+
+def group_count(program):
+    """命令列が記録するキャプチャグループの数"""
+    return program.groups
+
+
+def _add_thread(program, threads, seen, pc, pos, end):
+    """pc から ε 遷移を優先順にたどり、文字を消費する命令をスレッドとして積む"""
+    ops, xs = program.ops, program.xs
+    stack = [pc]
+    while stack:
+        pc = stack.pop()
+        if pc in seen:
+            continue
+        seen.add(pc)
+        op = ops[pc]
+        if op == JMP:
+            stack.append(xs[pc])
+        elif op == SPLIT:
+            stack.append(program.ys[pc])
+            stack.append(xs[pc])  # x を先にたどる
+        elif op == SAVE:
+            stack.append(pc + 1)
+        elif op == BOL:
+            if pos == 0:
+                stack.append(pc + 1)
+        elif op == EOL:
+            if pos == end:
+                stack.append(pc + 1)
+        else:
+            threads.append(pc)
+
+
+def pike_match(program, text: str, mode="fullmatch", prefix="") -> bool:
+    """Pike VMで命令列を実行する。計算量は O(len(program) × len(text))
+
+    search で prefix を渡すと、生きたスレッドがない間は str.find で候補位置まで飛ばす。
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    end = len(text)
+    anchored = mode != "search"
+    ops, xs = program.ops, program.xs
+    clist = []
+    _add_thread(program, clist, set(), 0, 0, end)
+    pos = 0
+    while pos <= end:
+        if anchored and not clist:
+            return False
+        ch = text[pos] if pos < end else None
+        nlist = []
+        nseen = set()
+        for pc in clist:
+            op = ops[pc]
+            if op == MATCH:
+                if mode != "fullmatch" or pos == end:
+                    return True
+            elif ch is not None and (
+                op == ANY
+                or (op == CHAR and xs[pc] == ch)
+                or (op == SET and ch in xs[pc])
+            ):
+                _add_thread(program, nlist, nseen, pc + 1, pos + 1, end)
+        pos += 1
+        if not anchored and pos <= end:
+            if prefix and not nlist:
+                pos = text.find(prefix, pos)
+                if pos < 0:
+                    return False
+            # 非アンカー探索: 次の位置から始まるスレッドを最低優先度で追加
+            _add_thread(program, nlist, nseen, 0, pos, end)
+        clist = nlist
+    return False
+
+
+def _add_capture_thread(program, threads, seen, pc, pos, end, caps):
+    """_add_thread と同じだが、スレッドごとにキャプチャ位置を持ち回る
+
+    end が None のときは $ で止まったスレッドも積んでおく。
+
+    繰り返しは re と同じく、この位置で始めた回が空文字列に一致して末尾まで来たら、もう
+    1回は繰り返さずにループを抜ける（その回のキャプチャを残したまま）。そのため印付きの
+    JMP で繰り返しに入り直したスレッドは、文字を消費するまでその印 loop を持ち、loop を
+    持ったまま印付きの JMP に来たら次の命令（ループの出口）へ進む。入り直した繰り返しの
+    範囲を出たら loop は 0 に戻す（それを囲む繰り返しは、まだこの位置で入り直していない）。
+    文字を消費しない命令は pc と「loop が pc を囲む最も内側の繰り返しか」の組ごとに1回
+    だけたどるので、1つの位置でたどる状態は命令数の3倍で抑えられる（通った印の組を
+    持つと、空文字列に一致しうるループが k 個並んだだけで 2^k 通りになる）。
+    """
+    ops, xs, ys = program.ops, program.xs, program.ys
+    loops, owners = program.loops, program.owners
+    stack = [(pc, caps, 0)]
+    while stack:
+        pc, caps, loop = stack.pop()
+        if loop and pc > loops[loop]:
+            loop = 0  # 入り直したループを抜けた
+        op = ops[pc]
+        key = (pc, loop == owners[pc]) if loop and SET < op < MATCH else pc
+        if key in seen:
+            continue
+        seen.add(key)
+        if op == JMP:
+            if not ys[pc]:
+                stack.append((xs[pc], caps, loop))
+            elif loop:
+                stack.append((pc + 1, caps, loop))  # 空の繰り返し: ループを抜ける
+            else:
+                stack.append((xs[pc], caps, ys[pc]))
+        elif op == SPLIT:
+            stack.append((ys[pc], caps, loop))
+            stack.append((xs[pc], caps, loop))
+        elif op == SAVE:
+            caps = list(caps)
+            caps[xs[pc]] = pos
+            stack.append((pc + 1, caps, loop))
+        elif op == BOL:
+            if pos == 0:
+                stack.append((pc + 1, caps, loop))
+        elif op == EOL:
+            if pos == end:
+                stack.append((pc + 1, caps, loop))
+            elif end is None:
+                # 入力の末尾がまだ分からない（ストリーム走査）ので保留する
+                threads.append((pc, caps))
+        else:
+            threads.append((pc, caps))
+
+
+def pike_captures(
+    program, text: str, mode="search", prefix="", start=0, must_advance=False
+):
+    """Pike VMで最左・優先順位つきの一致を求め、キャプチャ位置のリストを返す
+
+    戻り値は [開始, 終了, 1番グループ開始, 1番グループ終了, ...]（未一致のグループは -1）。
+    一致しなければ None。start から走査を始め（^ は常にテキストの先頭でのみ一致）、
+    must_advance なら start 位置での空一致を認めない（finditer の空一致の次の探索用）。
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    end = len(text)
+    anchored = mode != "search"
+    ops, xs = program.ops, program.xs
+    nslots = 2 * (program.groups + 1)
+    matched = None
+    clist = []
+    _add_capture_thread(program, clist, set(), 0, start, end, _fresh(nslots, start))
+    pos = start
+    while clist or (not anchored and matched is None):
+        ch = text[pos] if pos < end else None
+        nlist = []
+        nseen = set()
+        for pc, caps in clist:
+            op = ops[pc]
+            if op == MATCH:
+                if must_advance and pos == start == caps[0]:
+                    continue
+                if mode != "fullmatch" or pos == end:
+                    matched = list(caps)
+                    matched[1] = pos
+                    break  # 優先度の低いスレッドは打ち切る
+            elif ch is not None and (
+                op == ANY
+                or (op == CHAR and xs[pc] == ch)
+                or (op == SET and ch in xs[pc])
+            ):
+                _add_capture_thread(program, nlist, nseen, pc + 1, pos + 1, end, caps)
+        if pos >= end:
+            break
+        pos += 1
+        if not anchored and matched is None:
+            if prefix and not nlist:
+                pos = text.find(prefix, pos)
+                if pos < 0:
+                    break
+            _add_capture_thread(program, nlist, nseen, 0, pos, end, _fresh(nslots, pos))
+        clist = nlist
+    return matched
+
+
+def _fresh(nslots, start):
+    caps = [-1] * nslots
+    caps[0] = start
+    return caps
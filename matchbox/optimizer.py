@@ -0,0 +1,258 @@
+# matchbox/optimizer.py
+# parse() が作る二分木を、評価前に浅く・少ないノードへ書き換える
+#
+# - 連結中の連続する文字を1つの LiteralNode にまとめる          abcdef  -> Literal('abcdef')
+# - 隣り合う1文字の OR を CharSetNode にまとめる                 a|b|c   -> CharSet('abc')
+# - 隣り合う OR の枝から共通の接頭辞をくくり出す                 abc|abd -> ab(c|d)
+# - 直接入れ子になった繰り返しを1つにする                       (a*)*   -> a*
+#
+# どの書き換えも、一致する終了位置の集合と OR の枝の優先順位を変えない。
+# グループの境界はまたがないので、キャプチャ位置も変わらない。
+from matchbox.ast_nodes import (
+    AnchorNode,
+    CharNode,
+    CharSetNode,
+    ConcatNode,
+    GroupNode,
+    LiteralNode,
+    OrNode,
+    RepeatNode,
+)
+
+# 外側と内側の繰り返し記号から、まとめた後の記号を引く表
+_NESTED_REPEAT = {
+    ("*", "*"): "*",
+    ("*", "+"): "*",
+    ("*", "?"): "*",
+    ("+", "*"): "*",
+    ("+", "+"): "+",
+    ("+", "?"): "*",
+    ("?", "*"): "*",
+    ("?", "+"): "*",
+    ("?", "?"): "?",
+}
+
+
+def optimize(root):
+    """最適化したASTを返す（元のASTは変更しない）
+
+    子を先に最適化してから親を組み立てる。深い木でも再帰しないよう、たどる途中の
+    ノードはスタックに積む。
+    """
+    done = {}  # id(元のノード) -> 最適化したノード
+    stack = [(root, None)]
+    while stack:
+        node, children = stack.pop()
+        if children is None:
+            children = _children(node)
+            stack.append((node, children))
+            stack.extend((child, None) for child in reversed(children))
+        else:
+            done[id(node)] = _rewrite(node, [done[id(child)] for child in children])
+    return done[id(root)]
+
+
+def _children(node):
+    """最適化で先に処理する子（連結・OR は鎖を並べた要素）"""
+    if isinstance(node, ConcatNode):
+        return _flatten(node, ConcatNode)
+    if isinstance(node, OrNode):
+        return _flatten(node, OrNode)
+    if isinstance(node, (RepeatNode, GroupNode)):
+        return [node.node]
+    if isinstance(node, (AnchorNode, CharNode, LiteralNode, CharSetNode)):
+        return []
+    raise TypeError(f"Cannot optimize node: {node!r}")
+
+
+def _rewrite(node, children):
+    """最適化済みの子から node の代わりになるノードを作る"""
+    if isinstance(node, ConcatNode):
+        return _concat(children)
+    if isinstance(node, OrNode):
+        return _alternate(children)
+    if isinstance(node, RepeatNode):
+        inner = children[0]
+        # 回数指定を含む組み合わせ（(x{2}){3} など）はまとめられるとは限らないので残す
+        if isinstance(inner, RepeatNode) and (node.op, inner.op) in _NESTED_REPEAT:
+            return RepeatNode(inner.node, _NESTED_REPEAT[node.op, inner.op])
+        return RepeatNode(inner, node.op)
+    if isinstance(node, GroupNode):
+        return GroupNode(children[0], node.index)
+    return node
+
+
+def dump(root) -> str:
+    """ASTを1行1ノードの字下げ表示にする（デバッグ用）"""
+    lines = []
+    stack = [(root, 0)]
+    while stack:
+        node, indent = stack.pop()
+        pad = "  " * indent
+        if isinstance(node, (ConcatNode, OrNode)):
+            lines.append(f"{pad}{'Concat' if isinstance(node, ConcatNode) else 'Or'}")
+            children = _flatten(node, type(node))
+        elif isinstance(node, RepeatNode):
+            lines.append(f"{pad}Repeat {node.op}")
+            children = [node.node]
+        elif isinstance(node, GroupNode):
+            lines.append(f"{pad}Group {node.index}")
+            children = [node.node]
+        else:
+            lines.append(f"{pad}{node!r}")
+            children = []
+        stack.extend((child, indent + 1) for child in reversed(children))
+    return "\n".join(lines)
+
+
+def _flatten(node, cls):
+    """同じ種類の二分木ノードの連なりを、左から順の子のリストにする"""
+    items = []
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, cls):
+            stack.append(n.right)
+            stack.append(n.left)
+        else:
+            items.append(n)
+    return items
+
+
+def _build(items, cls):
+    """子のリストを parse() と同じ左結合の二分木に戻す"""
+    node = items[0]
+    for item in items[1:]:
+        node = cls(node, item)
+    return node
+
+
+def _literal_text(node):
+    """リテラルとして連結できるノードならその文字列、できなければ None"""
+    if isinstance(node, LiteralNode):
+        return node.string
+    if isinstance(node, CharNode) and node.char != ".":
+        return node.char
+    return None
+
+
+def _literal(text):
+    return LiteralNode(text) if len(text) > 1 else CharNode(text)
+
+
+def _concat(items):
+    merged = []
+    pending = ""
+    for item in items:
+        text = _literal_text(item)
+        if text is not None:
+            pending += text
+            continue
+        if pending:
+            merged.append(_literal(pending))
+            pending = ""
+        merged.append(item)
+    if pending or not merged:
+        merged.append(_literal(pending))
+    return _build(merged, ConcatNode)
+
+
+def _split_head(node):
+    """先頭のリテラル文字列と残りの要素のリストに分ける"""
+    items = _flatten(node, ConcatNode)
+    head = _literal_text(items[0])
+    if head:
+        return head, items[1:]
+    return "", items
+
+
+def _alternate(branches):
+    merged = []
+    for branch in branches:
+        if merged and _same(branch, merged[-1]):
+            continue  # 同じ枝が続いても新しい一致は増えない
+        chars = _single_chars(branch)
+        if chars is not None and merged:
+            prev = _single_chars(merged[-1])
+            if prev is not None:
+                merged[-1] = _charset(prev | chars)
+                continue
+        merged.append(branch)
+    return _build(_factor(merged), OrNode)
+
+
+def _same(a, b):
+    """2つのASTが同じ形か。最初に違いが見つかったところで打ち切る"""
+    stack = [(a, b)]
+    while stack:
+        a, b = stack.pop()
+        if a is b:
+            continue
+        if type(a) is not type(b):
+            return False
+        if isinstance(a, (ConcatNode, OrNode)):
+            stack.append((a.right, b.right))
+            stack.append((a.left, b.left))
+        elif isinstance(a, RepeatNode):
+            if a.op != b.op:
+                return False
+            stack.append((a.node, b.node))
+        elif isinstance(a, GroupNode):
+            if a.index != b.index:
+                return False
+            stack.append((a.node, b.node))
+        elif any(getattr(a, slot) != getattr(b, slot) for slot in type(a).__slots__):
+            return False  # 葉は属性を比べる
+    return True
+
+
+def _single_chars(node):
+    """ちょうど1文字に一致するリテラル/集合ならその文字集合、それ以外は None"""
+    if isinstance(node, CharSetNode):
+        return node.chars
+    if isinstance(node, CharNode) and len(node.char) == 1 and node.char != ".":
+        return frozenset(node.char)
+    return None
+
+
+def _charset(chars):
+    if len(chars) == 1:
+        return CharNode(next(iter(chars)))
+    return CharSetNode(chars)
+
+
+def _factor(branches):
+    """先頭の文字が同じ、隣り合う枝の共通接頭辞をくくり出す"""
+    result = []
+    i = 0
+    while i < len(branches):
+        head, _ = _split_head(branches[i])
+        j = i + 1
+        if head:
+            while j < len(branches):
+                other, _ = _split_head(branches[j])
+                if not other or other[0] != head[0]:
+                    break
+                j += 1
+        if j - i < 2:
+            result.append(branches[i])
+            i += 1
+            continue
+
+        run = [_split_head(b) for b in branches[i:j]]
+        prefix = run[0][0]
+        for other, _ in run[1:]:
+            n = 0
+            while n < len(prefix) and n < len(other) and prefix[n] == other[n]:
+                n += 1
+            prefix = prefix[:n]
+        rests = []
+        for text, tail in run:
+            rest = []
+            if len(text) > len(prefix):
+                rest.append(_literal(text[len(prefix) :]))
+            rest.extend(tail)
+            rests.append(_concat(rest) if rest else CharNode(""))
+        result.append(ConcatNode(_literal(prefix), _alternate(rests)))
+        i = j
+    return result
@@ -1,11 +1,22 @@
 # matchbox/parser.py
 from matchbox.lexer import tokenize
-from matchbox.ast_nodes import CharNode, RepeatNode, ConcatNode, OrNode, AnchorNode
+from matchbox.ast_nodes import (
+    AnchorNode,
+    CharNode,
+    ConcatNode,
+    GroupNode,
+    OrNode,
+    RepeatNode,
+)
+
+# 回数指定 {m,n} の回数の上限。NFA は本体の命令を回数分並べるので、命令列の大きさを抑える
+MAX_REPEAT = 1000
 
 
 def parse(pattern: str):
     tokens = tokenize(pattern)
     pos = 0
+    groups = 0
 
     def peek():
         return tokens[pos] if pos < len(tokens) else None
@@ -23,47 +34,69 @@ def parse(pattern: str):
         pos += 1
         return t
 
-    def parse_atom():
-        if not peek() or peek().type in {"|", ")"}:
-            raise SyntaxError("Pattern cannot start with or be empty inside a group")
-
-        tok = peek()
-        if tok.type == "CHAR" or tok.type == ".":
-            consume()
-            node = CharNode(tok.value or tok.type)
-        elif tok.type == "(":
-            consume("(")
-            node = parse_expr()
-            consume(")")
-        else:
-            raise SyntaxError(f"Unexpected token: {tok}")
-
-        if peek() and peek().type in {"*", "+", "?"}:
-            op = consume().type
-            if isinstance(node, RepeatNode):
+    def parse_quantifier(node):
+        if peek() and peek().type in {"*", "+", "?", "REPEAT"}:
+            tok = consume()
+            op = tok.value or tok.type
+            inner = node
+            while isinstance(inner, GroupNode):
+                inner = inner.node
+            if isinstance(inner, RepeatNode):
                 raise SyntaxError("Multiple repeaters for the same atom")
             node = RepeatNode(node, op)
-        return node
-
-    def parse_concat():
-        if not peek() or peek().type in {"|", ")", "*", "+", "?"}:
-            raise SyntaxError(
-                f"Unexpected start of sub-expression: {peek().type if peek() else 'None'}"
-            )
-
-        node = parse_atom()
-        while peek() and peek().type not in {"|", ")", "$"}:
-            node = ConcatNode(node, parse_atom())
+            if node.high is not None and node.low > node.high:
+                raise SyntaxError(f"Min repeat greater than max repeat: {op}")
+            if max(node.low, node.high or 0) > MAX_REPEAT:
+                raise SyntaxError(f"Repeat count exceeds {MAX_REPEAT}: {op}")
         return node
 
     def parse_expr():
-        node = parse_concat()
-        while peek() and peek().type == "|":
-            consume("|")
-            if not peek() or peek().type == ")":
-                raise SyntaxError("Dangling alternator '|'")
-            node = OrNode(node, parse_concat())
-        return node
+        # 括弧の中身は再帰して読まず、外側の読みかけの状態を stack に積んでから読み進める
+        # （深い入れ子でも Python の再帰の上限に当たらない）
+        nonlocal groups
+        stack = []  # 外側の括弧ごとの (OR の枝, 連結中の要素, グループ番号)
+        branches, items = [], []
+        expect_start = True  # 連結の先頭（| や括弧の直後）を読むところか
+        while True:
+            tok = peek()
+            if expect_start and (
+                not tok or tok.type in {"|", ")", "*", "+", "?", "REPEAT"}
+            ):
+                raise SyntaxError(
+                    f"Unexpected start of sub-expression: {tok.type if tok else 'None'}"
+                )
+            if tok.type == "(":
+                consume("(")
+                groups += 1
+                stack.append((branches, items, groups))
+                branches, items = [], []
+                expect_start = True
+                continue
+            if tok.type not in {"CHAR", "."}:
+                raise SyntaxError(f"Unexpected token: {tok}")
+            consume()
+            node = CharNode(tok.value or tok.type)
+            # node を連結に加える。連結や括弧が閉じたら、外側の要素として同じことを繰り返す
+            while True:
+                items.append(parse_quantifier(node))
+                tok = peek()
+                if tok and tok.type not in {"|", ")", "$"}:
+                    expect_start = False
+                    break
+                branches.append(_build(items, ConcatNode))
+                items = []
+                if tok and tok.type == "|":
+                    consume("|")
+                    if not peek() or peek().type == ")":
+                        raise SyntaxError("Dangling alternator '|'")
+                    expect_start = True
+                    break
+                expr = _build(branches, OrNode)
+                if not stack:
+                    return expr
+                consume(")")
+                branches, items, index = stack.pop()
+                node = GroupNode(expr, index)
 
     def parse_toplevel():
         # Toplevel parsing handles optional anchors
@@ -81,13 +114,7 @@ def parse(pattern: str):
             raise SyntaxError("Pattern cannot be empty")
 
         # Build a single ConcatNode from the list of nodes
-        if len(nodes) == 1:
-            return nodes[0]
-        else:
-            ast = nodes[0]
-            for node in nodes[1:]:
-                ast = ConcatNode(ast, node)
-            return ast
+        return _build(nodes, ConcatNode)
 
     if not tokens:
         return CharNode("")  # Match empty string for empty pattern
@@ -95,6 +122,14 @@ def parse(pattern: str):
     ast = parse_toplevel()
     if pos != len(tokens):
         raise SyntaxError(
-            f"Extra tokens after parse: {"".join(t.value for t in tokens[pos:])}"
+            f"Extra tokens after parse: {''.join(t.value for t in tokens[pos:])}"
         )
     return ast
+
+
+def _build(nodes, cls):
+    """要素のリストを左結合の二分木にする（a, b, c -> cls(cls(a, b), c)）"""
+    node = nodes[0]
+    for item in nodes[1:]:
+        node = cls(node, item)
+    return node
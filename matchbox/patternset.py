@@ -0,0 +1,38 @@
+# matchbox/patternset.py
+from matchbox.dfa import LazyDFA
+from matchbox.nfa import compile_set
+from matchbox.optimizer import optimize
+from matchbox.parser import parse
+
+
+class PatternSet:
+    """多数のパターンを1つのオートマトンにまとめ、1回の走査で一致したものを調べる
+
+    パターンごとに fullmatch を繰り返す代わりに、全パターンの NFA を1本の命令列に
+    つなぎ、遅延DFAで走査する。状態が温まれば1文字あたりの処理はパターン数によらない。
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        if not self.patterns:
+            raise ValueError("PatternSet needs at least one pattern")
+        self.program = compile_set([optimize(parse(p)) for p in self.patterns])
+        self.dfa = LazyDFA(self.program)
+
+    def fullmatch(self, text: str):
+        """テキスト全体に一致するパターンの番号（昇順のリスト）"""
+        return sorted(self.dfa.fullmatch_ids(text))
+
+    def match(self, text: str):
+        """テキストの先頭から一致するパターンの番号（昇順のリスト）"""
+        return sorted(self.dfa.match_ids(text, limit=len(self.patterns)))
+
+    def search(self, text: str):
+        """テキストのどこかに一致するパターンの番号（昇順のリスト）"""
+        return sorted(self.dfa.search_ids(text, limit=len(self.patterns)))
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def __repr__(self):
+        return f"PatternSet({self.patterns!r})"
@@ -0,0 +1,188 @@
+# matchbox/prefilter.py
+# ASTから「一致に必ず含まれるリテラル」を取り出し、str.find で候補位置を絞り込む
+from dataclasses import dataclass
+
+from matchbox.ast_nodes import (
+    AnchorNode,
+    CharNode,
+    CharSetNode,
+    ConcatNode,
+    GroupNode,
+    LiteralNode,
+    OrNode,
+    RepeatNode,
+)
+
+
+@dataclass
+class Prefilter:
+    """探索前に使うリテラル条件"""
+
+    prefix: str  # すべての一致がこの文字列で始まる（"" なら条件なし）
+    required: str  # すべての一致がこの文字列を含む（最長のもの）
+
+    def rejects(self, text: str) -> bool:
+        """必須リテラルを含まないテキストは、エンジンを動かすまでもなく不一致"""
+        return self.required not in text
+
+    def candidates(self, text: str):
+        """prefix が現れる位置（一致の開始候補）を左から順に返す"""
+        i = text.find(self.prefix)
+        while i >= 0:
+            yield i
+            i = text.find(self.prefix, i + 1)
+
+    def encode(self):
+        """bytes パターン用に、リテラルを latin-1 で bytes にしたもの"""
+        return Prefilter(self.prefix.encode("latin-1"), self.required.encode("latin-1"))
+
+
+@dataclass
+class _Literals:
+    exact: str | None  # ノードが一致する唯一の文字列（複数ありうるなら None）
+    prefix: str
+    suffix: str
+    inner: str  # 一致の中に必ず現れる文字列
+
+
+def extract(ast):
+    """ASTからプレフィルタを作る。使えるリテラルがなければ None"""
+    lits = _literals(ast)
+    required = max((lits.prefix, lits.inner, lits.suffix), key=len)
+    if not required:
+        return None
+    return Prefilter(prefix=lits.prefix, required=required)
+
+
+def _literals(root) -> _Literals:
+    """root の _Literals。子を先に求めてから親を組み立てる（深い木でも再帰しない）"""
+    done = {}  # id(ノード) -> _Literals
+    stack = [(root, None)]
+    while stack:
+        node, children = stack.pop()
+        if children is not None:
+            if isinstance(node, ConcatNode):
+                done[id(node)] = _concat([done[id(child)] for child in children])
+            else:
+                done[id(node)] = _combine(node, done)
+            continue
+        if isinstance(node, ConcatNode):
+            children = _spine(node)
+        elif isinstance(node, OrNode):
+            children = [node.left, node.right]
+        elif isinstance(node, GroupNode) or (isinstance(node, RepeatNode) and node.low):
+            children = [node.node]
+        else:
+            children = []
+        stack.append((node, children))
+        stack.extend((child, None) for child in reversed(children))
+    return done[id(root)]
+
+
+def _spine(node):
+    """左に入れ子になった連結 ((ab)c)d の要素 a, b, c, d"""
+    items = []
+    while isinstance(node, ConcatNode):
+        items.append(node.right)
+        node = node.left
+    items.append(node)
+    items.reverse()
+    return items
+
+
+def _concat(items) -> _Literals:
+    """要素の _Literals を左から連結したもの（2つずつ連結していくのと同じ結果）
+
+    1要素ごとに文字列を足すと長い連結で2乗の時間がかかるので、exact な要素が続く間は
+    断片を run に溜めておき、文字列が必要になったときに1回だけ join する。
+    """
+    run = []  # 直前まで続く exact な要素の文字列
+    prefix = None  # exact でない要素が来るまでは None
+    suffix = inner = ""  # prefix が決まった後の、run の直前までの suffix と inner
+    for lits in items:
+        if lits.exact is not None:
+            run.append(lits.exact)
+            continue
+        if prefix is None and lits is items[0]:
+            prefix, inner = lits.prefix, lits.inner
+        elif prefix is None:
+            exact = "".join(run)
+            prefix = exact + lits.prefix
+            inner = max((exact, lits.inner, prefix), key=len)
+        else:
+            suffix, inner = _extend(suffix, inner, run)
+            inner = max((inner, lits.inner, suffix + lits.prefix), key=len)
+        run = []
+        suffix = lits.suffix
+    if prefix is None:
+        exact = "".join(run)
+        return _Literals(exact, exact, exact, exact)
+    suffix, inner = _extend(suffix, inner, run)
+    return _Literals(None, prefix, suffix, inner)
+
+
+def _extend(suffix, inner, run):
+    """suffix の後に exact な要素 run が続いたときの (suffix, inner)
+
+    1要素ずつ連結すると、inner は suffix がそれより長くなった時点で suffix に置き換わり、
+    以後も伸びた suffix のままになる。
+    """
+    if not run:
+        return suffix, inner
+    suffix = suffix + "".join(run)
+    return suffix, suffix if len(suffix) > len(inner) else inner
+
+
+def _combine(node, done) -> _Literals:
+    """子の _Literals（done に求めてある）から、連結以外の node の _Literals を作る"""
+    if isinstance(node, CharNode):
+        if node.char == ".":
+            return _Literals(None, "", "", "")
+        return _Literals(node.char, node.char, node.char, node.char)
+    if isinstance(node, LiteralNode):
+        s = node.string
+        return _Literals(s, s, s, s)
+    if isinstance(node, CharSetNode):
+        return _Literals(None, "", "", "")
+    if isinstance(node, AnchorNode):
+        # 幅ゼロなので、リテラルの連結を妨げない
+        return _Literals("", "", "", "")
+    if isinstance(node, OrNode):
+        left = done[id(node.left)]
+        right = done[id(node.right)]
+        if left.exact is not None and left.exact == right.exact:
+            return left
+        return _Literals(
+            None,
+            _common_prefix(left.prefix, right.prefix),
+            _common_suffix(left.suffix, right.suffix),
+            "",
+        )
+    if isinstance(node, GroupNode):
+        return done[id(node.node)]
+    if isinstance(node, RepeatNode):
+        # 1回以上の繰り返しは、本体のリテラルを少なくとも low 回続けて含む
+        if node.low:
+            inner = done[id(node.node)]
+            if inner.exact is not None:
+                repeated = inner.exact * node.low
+                if node.high == node.low:
+                    return _Literals(repeated, repeated, repeated, repeated)
+                return _Literals(None, repeated, repeated, repeated)
+            return _Literals(None, inner.prefix, inner.suffix, inner.inner)
+        return _Literals(None, "", "", "")
+    raise TypeError(f"Cannot extract literals from node: {node!r}")
+
+
+def _common_prefix(a, b):
+    n = 0
+    while n < len(a) and n < len(b) and a[n] == b[n]:
+        n += 1
+    return a[:n]
+
+
+def _common_suffix(a, b):
+    n = 0
+    while n < len(a) and n < len(b) and a[-1 - n] == b[-1 - n]:
+        n += 1
+    return a[len(a) - n :]
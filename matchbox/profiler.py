@@ -0,0 +1,491 @@
+# matchbox/profiler.py
+# 照合1回分の計測（ステップ数・訪問した状態・やり直し・キャッシュのヒット・ノードごとの
+# 訪問回数・経過時間）を Profile にまとめる
+#
+# tracer.py と同じく、計装はこのモジュールにある別経路の評価器に閉じ込めている。本番の
+# 評価器（ast_nodes / memo / nfa / dfa）は計測を一切知らず、Pattern はフックが設定されて
+# いるときだけここへ処理を回す。フックがなければ照合1回につき属性の確認1回分しか増えない。
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+
+from matchbox.ast_nodes import (
+    ConcatNode,
+    GroupNode,
+    Leaf,
+    OrNode,
+    RepeatNode,
+    chain,
+)
+from matchbox.memo import MemoMatcher
+from matchbox.nfa import (
+    ANY,
+    BOL,
+    CHAR,
+    EOL,
+    JMP,
+    MATCH,
+    MODES,
+    SAVE,
+    SET,
+    SPLIT,
+)
+
+
+@dataclass
+class Profile:
+    """照合1回分の計測結果
+
+    カウンタの意味はエンジンごとに次のとおり（当てはまらないものは 0 のまま）。
+
+    - backtrack: steps は (ノード, 位置) の評価回数、states はそのうち異なる組の数、
+      backtracks は同じ組をもう一度評価した回数。search は全開始位置をまとめて流すので、
+      1回の評価で複数の位置を扱う（その位置の数だけ数える）
+    - memo: steps は MemoMatcher.steps（評価回数にメモの参照とまとめた終了位置の数を
+      足したもの）、cache_misses は (ノード, 位置) の評価回数、cache_hits / backtracks は
+      メモから答えた回数
+    - nfa: steps は実行した命令の数、states は各位置で進めたスレッド数の合計
+    - dfa: steps は消費した文字数、states は訪れたDFA状態の数、cache_hits / cache_misses は
+      遷移表にあった / 新たに作った遷移の数
+
+    node_visits は backtrack / memo ではASTノード（"番号 種類"。グループは中身に数える）ごと、nfa では命令
+    （"pc 命令"）ごとの訪問回数。
+    """
+
+    pattern: object
+    method: str
+    engine: str
+    text_length: int
+    matched: bool = False
+    seconds: float = 0.0
+    # プレフィルタだけで不一致と分かった（エンジンは走らせない）
+    prefiltered: bool = False
+    steps: int = 0
+    states: int = 0
+    backtracks: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    node_visits: dict = field(default_factory=dict)
+    error: str | None = None  # 照合が例外で終わったらその名前（MatchTimeout など）
+
+    def to_dict(self):
+        """JSON にそのまま書ける辞書（bytes のパターンは latin-1 で文字列にする）"""
+        data = asdict(self)
+        if isinstance(self.pattern, bytes):
+            data["pattern"] = self.pattern.decode("latin-1")
+        return data
+
+
+def profile(
+    pattern, method, text, engine=None, max_steps=None, timeout=None, hook=None
+):
+    """pattern.is_<method>(text) と同じ判定を計測付きで行い、Profile を返す
+
+    hook を渡すと、照合が例外で終わった場合も含めて Profile を渡して呼ぶ（例外はその後で
+    そのまま送出する）。
+    """
+    if method not in MODES:
+        raise ValueError(f"Unknown mode: {method}")
+    text = pattern._input(text)
+    engine = pattern._engine(engine, False, max_steps, timeout)
+    result = Profile(pattern.pattern, method, engine, len(text))
+    start = time.perf_counter()
+    try:
+        result.matched = _run(pattern, method, text, engine, max_steps, timeout, result)
+    except Exception as e:
+        result.error = type(e).__name__
+        raise
+    finally:
+        result.seconds = time.perf_counter() - start
+        if hook is not None:
+            hook(result)
+    return result
+
+
+def _run(pattern, method, text, engine, max_steps, timeout, result):
+    # プレフィルタの使い方は Pattern.is_* と同じ
+    prefilter = pattern._prefilter(text)
+    prefix = ""
+    if prefilter is not None:
+        if method == "search":
+            rejected = prefilter.rejects(text)
+            prefix = prefilter.prefix
+        else:
+            rejected = not text.startswith(prefilter.prefix) or prefilter.rejects(text)
+        if rejected:
+            result.prefiltered = True
+            return False
+    if method == "search" and prefix:
+        starts = list(prefilter.candidates(text))
+    else:
+        starts = range(len(text) + 1)
+
+    if engine == "dfa":
+        return _DFAProfiler(pattern.dfa, result).run(method, text, prefix)
+    if engine == "nfa":
+        return _NFAProfiler(pattern.program, result).run(method, text, prefix)
+    if engine == "memo":
+        return _MemoProfiler(text, max_steps, timeout, pattern.ast, result).run(
+            method, starts
+        )
+    return _ASTProfiler(text, pattern.ast, result).run(method, starts)
+
+
+# ----------------------------------------------------------------------
+# ASTノードの番号付け
+# ----------------------------------------------------------------------
+def _labels(root):
+    """id(ノード) -> "番号 種類"（番号は行きがけ順）"""
+    labels = {}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if id(node) in labels:
+            continue
+        labels[id(node)] = f"{len(labels)} {_describe(node)}"
+        if isinstance(node, (ConcatNode, OrNode)):
+            stack.append(node.right)
+            stack.append(node.left)
+        elif isinstance(node, (RepeatNode, GroupNode)):
+            stack.append(node.node)
+    return labels
+
+
+def _describe(node):
+    if isinstance(node, RepeatNode):
+        return f"Repeat {node.op}"
+    if isinstance(node, GroupNode):
+        return f"Group {node.index}"
+    if isinstance(node, (ConcatNode, OrNode)):
+        return type(node).__name__[: -len("Node")]
+    return repr(node)
+
+
+def _node_visits(labels, visits):
+    return {labels[key]: visits[key] for key in labels if visits[key]}
+
+
+# ----------------------------------------------------------------------
+# backtrack: ast_nodes の match() / scan() と同じ規則でたどる
+#
+# 各ノードの評価は子の評価を yield で頼むジェネレータにして、_drive がスタックで回す。
+# 本番の評価器と同じく Python の再帰を使わないので、深い木でも計測できる。葉だけの
+# 連結・OR をまとめて流す近道は取らないが、評価する (ノード, 位置) の組は変わらない。
+# ----------------------------------------------------------------------
+def _drive(gen):
+    """子の評価を yield するジェネレータを、再帰せずに最後まで進めて値を返す"""
+    stack = [gen]
+    value = None
+    while stack:
+        try:
+            child = stack[-1].send(value)
+        except StopIteration as stop:
+            stack.pop()
+            value = stop.value
+            continue
+        stack.append(child)
+        value = None
+    return value
+
+
+class _ASTProfiler:
+    def __init__(self, text, root, result):
+        self.text = text
+        self.root = root
+        self.result = result
+        self.labels = _labels(root)
+        self.visits = Counter()
+        self.done = {}  # id(ノード) -> 評価済みの位置の集合
+
+    def run(self, method, starts):
+        root = self.root
+        if method == "search":
+            matched = bool(_drive(self.scan(root, set(starts))))
+        else:
+            ends = _drive(self.match(root, 0))
+            matched = bool(ends) and (method == "match" or len(self.text) in ends)
+        result = self.result
+        result.states = sum(len(done) for done in self.done.values())
+        result.node_visits = _node_visits(self.labels, self.visits)
+        return matched
+
+    def _count(self, node, positions):
+        result = self.result
+        result.steps += len(positions)
+        self.visits[id(node)] += len(positions)
+        done = self.done.setdefault(id(node), set())
+        result.backtracks += len(positions & done)
+        done |= positions
+
+    # -- match: 1つの位置から --------------------------------------------
+    def match(self, node, pos):
+        while isinstance(node, GroupNode):
+            node = node.node
+        self._count(node, {pos})
+        if isinstance(node, Leaf):
+            return set(node.ends(self.text, pos))
+        if isinstance(node, ConcatNode):
+            positions = {pos}
+            for item in chain(node):
+                ends = set()
+                for p in positions:
+                    ends |= yield self.match(item, p)
+                positions = ends
+                if not positions:
+                    break
+            return positions
+        if isinstance(node, OrNode):
+            results = set()
+            for branch in chain(node):
+                results |= yield self.match(branch, pos)
+            return results
+        if isinstance(node, RepeatNode):
+            results = None if node.low else {pos}
+            current = {pos}
+            level = 0
+            while current and level != node.high:
+                new = set()
+                for p in current:
+                    new |= yield self.match(node.node, p)
+                level += 1
+                if results is None:
+                    current = new
+                    if level == node.low:
+                        results = set(new)
+                else:
+                    current = new - results
+                    results |= current
+            return results or set()
+        raise TypeError(f"Cannot match node: {node!r}")
+
+    # -- scan: 位置の集合をまとめて ----------------------------------------
+    def scan(self, node, positions):
+        while isinstance(node, GroupNode):
+            node = node.node
+        self._count(node, positions)
+        if isinstance(node, Leaf):
+            return node.scan(self.text, positions)
+        if isinstance(node, ConcatNode):
+            for item in chain(node):
+                positions = yield self.scan(item, positions)
+                if not positions:
+                    break
+            return positions
+        if isinstance(node, OrNode):
+            results = set()
+            for branch in chain(node):
+                results |= yield self.scan(branch, positions)
+            return results
+        if isinstance(node, RepeatNode):
+            results = None if node.low else set(positions)
+            current = positions
+            level = 0
+            while current and level != node.high:
+                current = yield self.scan(node.node, current)
+                level += 1
+                if results is None:
+                    if level == node.low:
+                        results = set(current)
+                else:
+                    current = current - results
+                    results |= current
+            return results or set()
+        raise TypeError(f"Cannot scan node: {node!r}")
+
+
+# ----------------------------------------------------------------------
+# memo: MemoMatcher のメモを、参照のたびに数える辞書に差し替えたもの
+# ----------------------------------------------------------------------
+class _CountingMemo(dict):
+    """MemoMatcher は (ノード, 位置) を評価する前に必ず `in` でメモを引くので、
+    その回数をノードごとの訪問回数、見つかった回数をキャッシュのヒットとして数える"""
+
+    def __init__(self, visits, result):
+        super().__init__()
+        self.visits = visits
+        self.result = result
+
+    def __contains__(self, key):
+        self.visits[id(key[0])] += 1
+        if dict.__contains__(self, key):
+            self.result.cache_hits += 1
+            return True
+        return False
+
+
+class _MemoProfiler(MemoMatcher):
+    def __init__(self, text, max_steps, timeout, root, result):
+        super().__init__(text, max_steps, timeout)
+        self.root = root
+        self.result = result
+        self.labels = _labels(root)
+        self.visits = Counter()
+        self._memo = _CountingMemo(self.visits, result)
+
+    def run(self, method, starts):
+        try:
+            if method == "search":
+                return any(self.match(self.root, i) is not None for i in starts)
+            ends = self.match(self.root, 0)
+            if method == "match":
+                return ends is not None
+            return ends is not None and len(self.text) in ends
+        finally:
+            result = self.result
+            result.steps = self.steps
+            result.states = len(self._memo)
+            result.cache_misses = len(self._memo)
+            result.backtracks = result.cache_hits
+            result.node_visits = _node_visits(self.labels, self.visits)
+
+
+# ----------------------------------------------------------------------
+# nfa: nfa.pike_match と同じ Pike VM
+# ----------------------------------------------------------------------
+class _NFAProfiler:
+    def __init__(self, program, result):
+        self.program = program
+        self.result = result
+        self.visits = [0] * len(program)
+
+    def run(self, method, text, prefix):
+        try:
+            return self._run(method, text, prefix)
+        finally:
+            self.result.node_visits = {
+                f"{pc} {self.program[pc]!r}": n for pc, n in enumerate(self.visits) if n
+            }
+
+    def _run(self, mode, text, prefix):
+        result = self.result
+        ops, xs = self.program.ops, self.program.xs
+        end = len(text)
+        anchored = mode != "search"
+        clist = []
+        self._add(clist, set(), 0, 0, end)
+        pos = 0
+        while pos <= end:
+            if anchored and not clist:
+                return False
+            result.states += len(clist)
+            ch = text[pos] if pos < end else None
+            nlist = []
+            nseen = set()
+            for pc in clist:
+                result.steps += 1
+                self.visits[pc] += 1
+                op = ops[pc]
+                if op == MATCH:
+                    if mode != "fullmatch" or pos == end:
+                        return True
+                elif ch is not None and (
+                    op == ANY
+                    or (op == CHAR and xs[pc] == ch)
+                    or (op == SET and ch in xs[pc])
+                ):
+                    self._add(nlist, nseen, pc + 1, pos + 1, end)
+            pos += 1
+            if not anchored and pos <= end:
+                if prefix and not nlist:
+                    pos = text.find(prefix, pos)
+                    if pos < 0:
+                        return False
+                self._add(nlist, nseen, 0, pos, end)
+            clist = nlist
+        return False
+
+    def _add(self, threads, seen, pc, pos, end):
+        result = self.result
+        ops, xs, ys = self.program.ops, self.program.xs, self.program.ys
+        stack = [pc]
+        while stack:
+            pc = stack.pop()
+            if pc in seen:
+                continue
+            seen.add(pc)
+            op = ops[pc]
+            if op in (JMP, SPLIT, SAVE, BOL, EOL):
+                # 文字を消費する命令と MATCH はスレッドとして進めるときに数える
+                result.steps += 1
+                self.visits[pc] += 1
+            if op == JMP:
+                stack.append(xs[pc])
+            elif op == SPLIT:
+                stack.append(ys[pc])
+                stack.append(xs[pc])
+            elif op == SAVE:
+                stack.append(pc + 1)
+            elif op == BOL:
+                if pos == 0:
+                    stack.append(pc + 1)
+            elif op == EOL:
+                if pos == end:
+                    stack.append(pc + 1)
+            else:
+                threads.append(pc)
+
+
+# ----------------------------------------------------------------------
+# dfa: LazyDFA の fullmatch / match / search と同じ走査
+# ----------------------------------------------------------------------
+class _DFAProfiler:
+    def __init__(self, dfa, result):
+        self.dfa = dfa
+        self.result = result
+        self.visited = set()
+
+    def run(self, method, text, prefix):
+        try:
+            return getattr(self, f"_{method}")(text, prefix)
+        finally:
+            self.result.states = len(self.visited)
+
+    def _start(self, anchored):
+        state = self.dfa._start(anchored)
+        self.visited.add(id(state))
+        return state
+
+    def _step(self, state, ch):
+        result = self.result
+        result.steps += 1
+        nxt = state.next.get(ch)
+        if nxt is None:
+            result.cache_misses += 1
+            nxt = self.dfa._transition(state, ch)
+        else:
+            result.cache_hits += 1
+        self.visited.add(id(nxt))
+        return nxt
+
+    def _fullmatch(self, text, prefix):
+        state = self._start(anchored=True)
+        for ch in text:
+            state = self._step(state, ch)
+            if state.dead:
+                return False
+        return state.final
+
+    def _match(self, text, prefix):
+        state = self._start(anchored=True)
+        for ch in text:
+            if state.accepting:
+                return True
+            state = self._step(state, ch)
+            if state.dead:
+                return False
+        return state.final
+
+    def _search(self, text, prefix):
+        state = self._start(anchored=False)
+        idle = self.dfa._idle() if prefix else None
+        i, end = 0, len(text)
+        while i < end:
+            if state.accepting:
+                return True
+            if state is idle:
+                i = text.find(prefix, i)
+                if i < 0:
+                    return False
+            state = self._step(state, text[i])
+            i += 1
+        return state.final
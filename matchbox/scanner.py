@@ -0,0 +1,188 @@
+# matchbox/scanner.py
+# テキストをチャンクごとに受け取り、Pike VMの状態を持ち越してチャンクをまたぐ一致も見つける
+import codecs
+import mmap
+
+from matchbox.match import Match
+from matchbox.nfa import ANY, CHAR, EOL, MATCH, SET, _add_capture_thread, _fresh
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class Scanner:
+    """ストリーム走査器。feed() で渡したテキストから finditer と同じ一致を返す
+
+    保持するテキストは、まだ確定していない一致の候補が始まった位置以降だけ。
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self._program = pattern.program
+        self._nslots = 2 * (pattern.groups + 1)
+        self._prefix = pattern.prefilter.prefix if pattern.prefilter else ""
+        self._buf = b"" if pattern.bytes_mode else ""  # 未確定の一致に必要なテキスト
+        self._buf_start = 0  # _buf[0] の入力全体での位置
+        self._pos = 0  # 次に処理する位置
+        self._start = 0  # 現在の探索を始めた位置
+        self._must_advance = False
+        self._matched = None
+        self._clist = []
+        self._add(self._clist, set(), 0, 0, _fresh(self._nslots, 0))
+        self._finished = False
+
+    @property
+    def position(self):
+        """これまでに受け取った文字数"""
+        return self._buf_start + len(self._buf)
+
+    def feed(self, chunk: str):
+        """チャンクを追加し、確定した一致のリストを返す
+
+        bytes パターンなら chunk は bytes（または memoryview などのバッファ）で渡す。
+        """
+        if self._finished:
+            raise ValueError("feed() called after finish()")
+        self._buf += chunk
+        matches = self._run(final=False)
+        self._trim()
+        return matches
+
+    def finish(self):
+        """入力の終わりを通知し、残りの一致のリストを返す"""
+        if self._finished:
+            return []
+        self._finished = True
+        matches = self._run(final=True)
+        self._buf = self._buf[:0]
+        return matches
+
+    # ------------------------------------------------------------------
+    def _add(self, threads, seen, pc, pos, caps):
+        # 入力の末尾はまだ分からないので end=None（$ のスレッドは保留される）
+        _add_capture_thread(self._program, threads, seen, pc, pos, None, caps)
+
+    def _run(self, final):
+        ops, xs = self._program.ops, self._program.xs
+        out = []
+        buf_end = self._buf_start + len(self._buf)
+        while True:
+            pos = self._pos
+            if pos < buf_end:
+                ch = self._buf[pos - self._buf_start]
+            elif final:
+                ch = None
+                self._expand_eol(pos)
+            else:
+                return out  # 次のチャンクを待つ
+            nlist = []
+            nseen = set()
+            for pc, caps in self._clist:
+                op = ops[pc]
+                if op == MATCH:
+                    if self._must_advance and pos == self._start == caps[0]:
+                        continue
+                    self._matched = list(caps)
+                    self._matched[1] = pos
+                    break  # 優先度の低いスレッドは打ち切る
+                if ch is not None and (
+                    op == ANY
+                    or (op == CHAR and xs[pc] == ch)
+                    or (op == SET and ch in xs[pc])
+                ):
+                    self._add(nlist, nseen, pc + 1, pos + 1, caps)
+            if ch is None:
+                nlist = []
+            else:
+                self._pos = pos + 1
+                if self._matched is None:
+                    if self._prefix and not nlist:
+                        self._skip(buf_end, final)
+                        nseen = set()
+                    if self._pos <= buf_end:
+                        caps = _fresh(self._nslots, self._pos)
+                        self._add(nlist, nseen, 0, self._pos, caps)
+            self._clist = nlist
+            if not nlist:
+                if self._matched is not None:
+                    out.append(self._emit())
+                elif ch is None or self._pos > buf_end:
+                    return out
+
+    def _skip(self, buf_end, final):
+        """進行中のスレッドがないので、次に prefix が現れる位置まで飛ばす"""
+        i = self._buf.find(self._prefix, self._pos - self._buf_start)
+        if i >= 0:
+            self._pos = self._buf_start + i
+        elif final:
+            self._pos = buf_end + 1  # これ以上の一致はない
+        else:
+            # チャンク境界をまたいで prefix が続くかもしれない部分だけ残す
+            self._pos = max(self._pos, buf_end - len(self._prefix) + 1)
+
+    def _expand_eol(self, pos):
+        """入力の末尾に達したので、$ で保留していたスレッドを先へ進める"""
+        threads = []
+        seen = set()
+        for pc, caps in self._clist:
+            if self._program.ops[pc] == EOL:
+                _add_capture_thread(
+                    self._program, threads, seen, pc + 1, pos, pos, caps
+                )
+            elif pc not in seen:
+                seen.add(pc)
+                threads.append((pc, caps))
+        self._clist = threads
+
+    def _emit(self):
+        """確定した一致を返し、その終わりから探索をやり直す"""
+        regs = self._matched
+        start, end = regs[0], regs[1]
+        lo = start - self._buf_start
+        m = Match(self.pattern, self._buf[lo : end - self._buf_start], regs, start)
+        self._matched = None
+        self._start = self._pos = end
+        self._must_advance = start == end
+        self._clist = []
+        self._add(self._clist, set(), 0, end, _fresh(self._nslots, end))
+        return m
+
+    def _trim(self):
+        """未確定の一致が始まりうる位置より前のテキストを捨てる"""
+        keep = self._pos
+        for _, caps in self._clist:
+            keep = min(keep, caps[0])
+        if keep > self._buf_start:
+            self._buf = self._buf[keep - self._buf_start :]
+            self._buf_start = keep
+
+
+def scan_file(pattern, path, chunk_size=DEFAULT_CHUNK_SIZE, encoding="latin-1"):
+    """ファイル全体を読み込まずに走査し、一致を順に返すジェネレータ
+
+    mmap できればページ単位で、できなければバッファ付きで chunk_size ずつ読む。
+    既定の latin-1 は1バイトを1文字に写すので、一致位置はそのままバイトオフセットになる。
+    bytes パターンならデコードせず、読んだバイト列をそのまま照合する（encoding は使わない）。
+    """
+    scanner = pattern.scanner()
+    if pattern.bytes_mode:
+        decoder = None
+    else:
+        decoder = codecs.getincrementaldecoder(encoding)()
+    with open(path, "rb") as f:
+        for block in _blocks(f, chunk_size):
+            yield from scanner.feed(block if decoder is None else decoder.decode(block))
+    if decoder is not None:
+        yield from scanner.feed(decoder.decode(b"", final=True))
+    yield from scanner.finish()
+
+
+def _blocks(f, chunk_size):
+    try:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):  # 空ファイルやパイプは mmap できない
+        while block := f.read(chunk_size):
+            yield block
+        return
+    with mapped:
+        for i in range(0, len(mapped), chunk_size):
+            yield mapped[i : i + chunk_size]
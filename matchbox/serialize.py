@@ -0,0 +1,217 @@
+# matchbox/serialize.py
+# コンパイル済みパターンのバイナリ形式への書き出し・読み込みと、ディスク上のキャッシュ
+#
+# 書き出すのは最適化済みのAST・NFA命令列・プレフィルタと、必要なら構築済みのDFA状態。
+# 読み込みでは解析も最適化もコンパイルもしないので、起動時の再コンパイルが読み込み1回で済む。
+#
+# 形式: MAGIC (4バイト) + 形式バージョン (2バイト) + CRC32 (4バイト) + 本体
+# 本体は素の値（タプル・文字列・整数・frozenset など）だけを marshal したもの。ASTは子が
+# 親より先に並ぶ表に、命令列は Program の命令コード列・x の並び・y の並びにして、入れ子や
+# 参照を持たない。
+import hashlib
+import marshal
+import os
+import struct
+import tempfile
+import zlib
+
+from matchbox.ast_nodes import (
+    AnchorNode,
+    CharNode,
+    CharSetNode,
+    ConcatNode,
+    GroupNode,
+    LiteralNode,
+    OrNode,
+    RepeatNode,
+)
+from matchbox.evaluator import Pattern
+from matchbox.nfa import Program
+from matchbox.prefilter import Prefilter
+
+MAGIC = b"MBXP"
+# 本体の構造を変えたら上げる（古い形式のデータは FormatError になる）
+# 2: 命令列を (命令コード, x, y) の行から Program の列ごとの並びに変更
+# 3: 空文字列に一致しうる本体を持つループの末尾を印付きの JMP に変更
+# 4: 回数指定の繰り返し {m,n} を追加（命令列は展開した形、ASTは記号のまま持つ）
+FORMAT_VERSION = 4
+
+_HEADER = struct.Struct("<4sHI")
+_NODE_TYPES = (
+    AnchorNode,
+    CharNode,
+    LiteralNode,
+    CharSetNode,
+    RepeatNode,
+    ConcatNode,
+    OrNode,
+    GroupNode,
+)
+_NODE_NUMBERS = {cls: i for i, cls in enumerate(_NODE_TYPES)}
+
+
+class FormatError(ValueError):
+    """データが matchbox の形式でないか、壊れているか、別の形式バージョンのもの"""
+
+
+def dumps(pattern, dfa=False) -> bytes:
+    """コンパイル済みパターンをバイト列にする
+
+    dfa=True なら、それまでの照合で構築済みのDFA状態も含める（読み込んだ側は同じ入力を
+    状態の構築なしで照合できる）。
+    """
+    prefilter = pattern.prefilter
+    program = pattern.program
+    payload = (
+        pattern.pattern,
+        _encode_ast(pattern.ast),
+        (program.ops.tobytes(), program.xs, tuple(program.ys)),
+        None if prefilter is None else (prefilter.prefix, prefilter.required),
+        pattern.dfa.export_states() if dfa else None,
+    )
+    body = marshal.dumps(payload)
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, zlib.crc32(body)) + body
+
+
+def loads(data) -> Pattern:
+    """dumps() のバイト列からパターンを復元する（解析もコンパイルもしない）"""
+    if len(data) < _HEADER.size:
+        raise FormatError("data is too short")
+    magic, version, checksum = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise FormatError("not a serialized matchbox pattern")
+    if version != FORMAT_VERSION:
+        raise FormatError(
+            f"unsupported format version {version} (expected {FORMAT_VERSION})"
+        )
+    body = memoryview(data)[_HEADER.size :]
+    if zlib.crc32(body) != checksum:
+        raise FormatError("checksum mismatch (data is corrupted)")
+    try:
+        source, ast_table, program_table, literals, states = marshal.loads(body)
+        ast = _decode_ast(ast_table)
+        program = Program(*program_table)
+    except (EOFError, ValueError, TypeError, IndexError) as e:
+        raise FormatError(f"malformed pattern data: {e}") from None
+    prefilter = None if literals is None else Prefilter(*literals)
+    pattern = Pattern._restore(source, ast, program, prefilter)
+    if states is not None:
+        pattern.dfa.import_states(*states)
+    return pattern
+
+
+# ----------------------------------------------------------------------
+# ディスク上のキャッシュ
+# ----------------------------------------------------------------------
+class DiskCache:
+    """パターンのハッシュをファイル名にして、dumps() の結果をディレクトリに保存する
+
+    読めないファイル（壊れている・形式が古い）はキャッシュにないものとして扱い、
+    書き込みに失敗しても例外にしない（キャッシュは高速化のためだけに使う）。
+    """
+
+    def __init__(self, directory, dfa=False):
+        self.directory = os.fspath(directory)
+        self.dfa = dfa  # 保存時に構築済みのDFA状態も含めるか
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, pattern) -> str:
+        """パターン（str か bytes）を保存するファイルのパス"""
+        if isinstance(pattern, bytes):
+            key = b"bytes:" + pattern
+        else:
+            key = b"str:" + pattern.encode("utf-8", "surrogatepass")
+        digest = hashlib.sha256(b"%d:" % FORMAT_VERSION + key).hexdigest()
+        return os.path.join(self.directory, f"{digest}.mbx")
+
+    def get(self, pattern):
+        """保存済みならそのパターンを、なければ None を返す"""
+        try:
+            with open(self.path(pattern), "rb") as f:
+                loaded = loads(f.read())
+        except (OSError, FormatError):
+            return None
+        # ハッシュの衝突や書き換えに備え、元のパターンが一致するものだけを使う
+        return loaded if loaded.pattern == pattern else None
+
+    def put(self, pattern):
+        """コンパイル済みパターンを保存する（一時ファイルに書いてから置き換える）"""
+        path = self.path(pattern.pattern)
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(dumps(pattern, self.dfa))
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            pass
+
+    def clear(self):
+        """保存したファイルをすべて削除する"""
+        for name in os.listdir(self.directory):
+            if name.endswith(".mbx"):
+                os.unlink(os.path.join(self.directory, name))
+
+
+# ----------------------------------------------------------------------
+# AST <-> 表
+# ----------------------------------------------------------------------
+def _encode_ast(root):
+    """ASTを、子が親より先に並ぶ表にする。子は表の添字で参照する（最後の要素が根）"""
+    table = []
+    index = {}  # id(ノード) -> 表の添字（共有された部分木は1回だけ書く）
+    stack = [(root, False)]
+    while stack:
+        node, ready = stack.pop()
+        if id(node) in index:
+            continue
+        if not ready:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(_children(node)))
+            continue
+        index[id(node)] = len(table)
+        table.append(_encode_node(node, index))
+    return tuple(table)
+
+
+def _children(node):
+    if isinstance(node, (ConcatNode, OrNode)):
+        return (node.left, node.right)
+    if isinstance(node, (RepeatNode, GroupNode)):
+        return (node.node,)
+    return ()
+
+
+def _encode_node(node, index):
+    number = _NODE_NUMBERS.get(type(node))
+    if number is None:
+        raise TypeError(f"Cannot serialize node: {node!r}")
+    if isinstance(node, AnchorNode):
+        return (number, node.anchor_type)
+    if isinstance(node, CharNode):
+        return (number, node.char)
+    if isinstance(node, LiteralNode):
+        return (number, node.string)
+    if isinstance(node, CharSetNode):
+        return (number, node.chars)
+    if isinstance(node, RepeatNode):
+        return (number, index[id(node.node)], node.op)
+    if isinstance(node, GroupNode):
+        return (number, index[id(node.node)], node.index)
+    return (number, index[id(node.left)], index[id(node.right)])
+
+
+def _decode_ast(table):
+    nodes = []
+    for number, *args in table:
+        cls = _NODE_TYPES[number]
+        if cls in (RepeatNode, GroupNode):
+            nodes.append(cls(nodes[args[0]], args[1]))
+        elif cls in (ConcatNode, OrNode):
+            nodes.append(cls(nodes[args[0]], nodes[args[1]]))
+        else:
+            nodes.append(cls(*args))
+    return nodes[-1]
@@ -0,0 +1,184 @@
+# matchbox/tracer.py
+# --trace 用の計装付き評価器。ASTノードの match() と同じ規則でたどりながら経路を表示する
+#
+# 本番の評価（ast_nodes の match/scan）はトレースを一切知らない。表示のための字下げ・深さ・
+# 分岐はすべてこのモジュールに閉じ込めている。
+from rich.console import Console
+
+from matchbox.ast_nodes import (
+    AnchorNode,
+    CharNode,
+    CharSetNode,
+    ConcatNode,
+    GroupNode,
+    LiteralNode,
+    OrNode,
+    RepeatNode,
+)
+
+console = Console()
+
+
+class Tracer:
+    """ASTを深さ付きでたどり、各ノードの試行と結果を rich で表示する"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def match(self, node, pos, depth=0):
+        """node.match() と同じ結果（終了位置の集合か None）を返す"""
+        method = getattr(self, f"_{type(node).__name__}", None)
+        if method is None:
+            raise TypeError(f"Cannot trace node: {node!r}")
+        return method(node, pos, depth)
+
+    def _AnchorNode(self, node: AnchorNode, pos, depth):
+        pad = "  " * depth
+        console.print(
+            f"{pad}[blue][Anchor('{node.anchor_type}')][/blue] text='[dim]{self.text[pos:]}[/dim]'"
+        )
+        # アンカーは文字を消費しない
+        if node.anchor_type == "^" and pos == 0:
+            console.print(f"{pad}[green]✔️ Anchor start matches[/green]")
+            return {pos}
+        if node.anchor_type == "$" and pos == len(self.text):
+            console.print(f"{pad}[green]✔️ Anchor end matches[/green]")
+            return {pos}
+        console.print(f"{pad}[red]❌ FAIL (Anchor condition not met)[/red]")
+        return None
+
+    def _CharNode(self, node: CharNode, pos, depth):
+        pad = "  " * depth
+        text = self.text
+        console.print(
+            f"{pad}[blue][Char('{node.char}')][/blue] text='[dim]{text[pos:]}[/dim]'"
+        )
+        if not node.char:
+            return {pos}
+        if pos >= len(text):
+            console.print(f"{pad}[red]❌ FAIL (no input)[/red]")
+            return None
+        if node.char == "." or text[pos] == node.char:
+            self._consumed(pad, text[pos], pos + 1)
+            return {pos + 1}
+        console.print(
+            f"{pad}[red]❌ FAIL (expected '{node.char}', got '{text[pos]}')[/red]"
+        )
+        return None
+
+    def _LiteralNode(self, node: LiteralNode, pos, depth):
+        pad = "  " * depth
+        console.print(
+            f"{pad}[blue][Literal('{node.string}')][/blue] text='[dim]{self.text[pos:]}[/dim]'"
+        )
+        if self.text.startswith(node.string, pos):
+            end = pos + len(node.string)
+            self._consumed(pad, node.string, end)
+            return {end}
+        console.print(f"{pad}[red]❌ FAIL (expected '{node.string}')[/red]")
+        return None
+
+    def _CharSetNode(self, node: CharSetNode, pos, depth):
+        pad = "  " * depth
+        text = self.text
+        console.print(f"{pad}[blue][{node}][/blue] text='[dim]{text[pos:]}[/dim]'")
+        if pos < len(text) and text[pos] in node.chars:
+            self._consumed(pad, text[pos], pos + 1)
+            return {pos + 1}
+        console.print(f"{pad}[red]❌ FAIL (not in set)[/red]")
+        return None
+
+    def _RepeatNode(self, node: RepeatNode, pos, depth):
+        pad = "  " * depth
+        console.print(
+            f"{pad}[blue][Repeat {node.op}][/blue] start text='[dim]{self.text[pos:]}[/dim]'"
+        )
+        # 下限の回数に届くまでは一致を集めず、届いてからは新しい位置がなくなるか上限まで進める
+        results = set() if node.low else {pos}
+        current = {pos}
+        level = 0
+        while current and level != node.high:
+            new = set()
+            for p in sorted(current):
+                new |= self.match(node.node, p, depth + 1) or set()
+            level += 1
+            if level < node.low:
+                current = new
+            else:
+                current = new if level == node.low else new - results
+                results |= current
+        self._results(pad, "Repeat", results)
+        return results if results else None
+
+    def _ConcatNode(self, node: ConcatNode, pos, depth):
+        pad = "  " * depth
+        console.print(
+            f"{pad}[blue][Concat][/blue] start text='[dim]{self.text[pos:]}[/dim]'"
+        )
+        results = set()
+        for p in sorted(self.match(node.left, pos, depth + 1) or ()):
+            results |= self.match(node.right, p, depth + 1) or set()
+        self._results(pad, "Concat", results)
+        return results if results else None
+
+    def _OrNode(self, node: OrNode, pos, depth):
+        pad = "  " * depth
+        console.print(
+            f"{pad}[blue][Or][/blue] start text='[dim]{self.text[pos:]}[/dim]'"
+        )
+        results = set()
+        results |= self.match(node.left, pos, depth + 1) or set()
+        results |= self.match(node.right, pos, depth + 1) or set()
+        self._results(pad, "Or", results)
+        return results if results else None
+
+    def _GroupNode(self, node: GroupNode, pos, depth):
+        return self.match(node.node, pos, depth)
+
+    def _consumed(self, pad, consumed, end):
+        console.print(
+            f"{pad}[yellow]→ consumes '{consumed}'[/yellow] -> rest='[dim]{self.text[end:]}[/dim]'"
+        )
+
+    def _results(self, pad, name, results):
+        for r in sorted(results):
+            console.print(
+                f"{pad}[green]✔️ {name} result rest='[dim]{self.text[r:]}[/dim]'[/green]"
+            )
+
+
+# ----------------------------------------------------------------------
+# Pattern の is_* から呼ばれる入口
+# ----------------------------------------------------------------------
+def trace_fullmatch(pattern, text: str) -> bool:
+    console.rule(f"[bold cyan]TRACE for /{pattern.pattern}/ on '{text}' (fullmatch)[/]")
+    result = Tracer(text).match(pattern.ast, 0)
+    success = result is not None and len(text) in result
+    _verdict(success)
+    return success
+
+
+def trace_match(pattern, text: str) -> bool:
+    console.rule(f"[bold cyan]TRACE for /{pattern.pattern}/ on '{text}' (match)[/]")
+    success = Tracer(text).match(pattern.ast, 0) is not None
+    _verdict(success)
+    return success
+
+
+def trace_search(pattern, text: str) -> bool:
+    tracer = Tracer(text)
+    for i in range(len(text) + 1):
+        console.rule(f"[bold cyan]TRY at index {i} — '{text[i:]}'[/]")
+        # ✅ 末尾まで届いていなくても、マッチしていればOKにする
+        if tracer.match(pattern.ast, i) is not None:
+            console.print(f"[green]✅ SUCCESS at index {i}[/green]")
+            return True
+    console.print("[red]❌ No partial match found[/red]")
+    return False
+
+
+def _verdict(success):
+    if success:
+        console.print("[bold green]✅ SUCCESS[/bold green]")
+    else:
+        console.print("[bold red]❌ FAIL[/bold red]")
@@ -0,0 +1,114 @@
+import subprocess
+import sys
+import time
+
+import pytest
+import matchbox
+from matchbox.analyzer import EXPONENTIAL, LINEAR, POLYNOMIAL, analyze
+from matchbox.ast_nodes import CharNode, ConcatNode, GroupNode, RepeatNode
+
+
+@pytest.mark.parametrize(
+    "pattern, complexity",
+    [
+        ("abc", LINEAR),
+        ("a(b|c)*d", LINEAR),
+        ("(a+b)+", LINEAR),
+        ("^(a|b)*$", LINEAR),
+        ("a*b*c*", LINEAR),
+        ("a*ba*", LINEAR),
+        ("(a|a)*", EXPONENTIAL),
+        ("(a|ab)*c", EXPONENTIAL),
+        ("(.|a)+", EXPONENTIAL),
+        ("(a+b?)+", EXPONENTIAL),
+        ("(a*b*)*", EXPONENTIAL),
+        ("(x+x+)+y", EXPONENTIAL),
+        ("a*a*b", POLYNOMIAL),
+        ("a*b?a*", POLYNOMIAL),
+        (".*.*=.*", POLYNOMIAL),
+        ("(a|a){2,}", EXPONENTIAL),
+        ("(ab|c){2,5}", LINEAR),  # 本体に繰り返しがなければ回数指定は線形
+        ("(.*a){3}", POLYNOMIAL),
+        ("(a*b?){2,}", EXPONENTIAL),
+        ("a{2,}a*", POLYNOMIAL),
+    ],
+)
+def test_complexity_class(pattern, complexity):
+    assert analyze(pattern).complexity == complexity
+
+
+def nested(inner_op, outer_op):
+    return RepeatNode(GroupNode(RepeatNode(CharNode("a"), inner_op), 1), outer_op)
+
+
+def test_nested_quantifiers_in_hand_built_trees():
+    # (a*)* と (a+)+b は parse() が構文エラーにするので、ASTを直接組み立てる
+    result = analyze(nested("*", "*"))
+    assert result.complexity == EXPONENTIAL
+    assert result.issues[0].kind == "nested quantifier"
+    assert result.issues[0].fragment == "(a*)*"
+
+    result = analyze(ConcatNode(nested("+", "+"), CharNode("b")))
+    assert result.complexity == EXPONENTIAL
+    assert result.pattern == "(a+)+b"
+
+
+def test_polynomial_degree():
+    assert analyze("a*a*b").bound == "O(n^2)"
+    assert analyze("a*a*a*b").degree == 3
+    assert analyze("abc").bound == "O(n)"
+
+
+def test_counted_repeat_of_a_loop_counts_every_copy():
+    # (.*a){k} は .*a を k 個並べたのと同じく、回ごとに .* の終わりを試し直す
+    for k in (2, 8, 20):
+        result = analyze(f"(.*a){{{k}}}")
+        assert result.complexity == POLYNOMIAL
+        assert result.degree == k
+    assert analyze("(.*a){8}").issues[0].kind == "repeated quantifier"
+    assert analyze("((.*a){2}b?){4}").degree == 8
+
+
+def test_report():
+    result = matchbox.analyze("(a|a)*b")
+    assert not result.safe
+    assert str(result) == (
+        "'(a|a)*b': exponential O(2^n)\n" "  - ambiguous alternation: a|a (exponential)"
+    )
+
+
+def test_long_patterns():
+    assert analyze("(b|c)*" * 5_000).degree == 5_000
+    assert analyze("(x)" * 30_000 + "(a|a)*").complexity == EXPONENTIAL
+    assert analyze("(" * 30_000 + "a*b" + ")" * 30_000).complexity == LINEAR
+
+
+def test_nested_alternation_is_linear():
+    # ノードの性質は木全体で1度だけ求め、指摘の部分式は先頭だけを載せる
+    n = 4000
+    start = time.perf_counter()
+    result = analyze("(" + "(a|" * n + "b" + ")" * n + "c)*")
+    assert time.perf_counter() - start < 5
+    assert result.complexity == EXPONENTIAL
+    assert len(result.issues) == n - 1
+    assert result.issues[0].fragment == ("a|(" * 27)[:80] + "..."
+
+
+def test_rejected_by_parser():
+    with pytest.raises(SyntaxError):
+        analyze("(a*)*")
+
+
+def run_cli(*args):
+    return subprocess.run(
+        [sys.executable, "-m", "matchbox", *args], capture_output=True, text=True
+    )
+
+
+def test_cli_analyze():
+    proc = run_cli("(a+b?)+", "--analyze")
+    assert proc.returncode == 1
+    assert "exponential" in proc.stdout
+    proc = run_cli("a(b|c)d", "--analyze")
+    assert proc.returncode == 0
+    assert "linear O(n)" in proc.stdout
@@ -0,0 +1,53 @@
+import pickle
+
+import pytest
+import matchbox
+from matchbox.batch import MAX_CHUNK_SIZE, tune_chunksize
+
+TEXTS = ["abd", "acd", "a_d", "", "xxabdyy", "abcbcd", "ad"] * 30
+
+
+def test_compiled_pattern_is_picklable():
+    p = matchbox.compile("a(b|c)*d")
+    p.is_search("xxabd")  # DFAの状態を作っておく
+    q = pickle.loads(pickle.dumps(p))
+    assert q.pattern == p.pattern
+    assert q.groups == p.groups
+    assert q.dfa.info().cache_size == 0  # 状態キャッシュは送らない
+    assert q.fullmatch("abcd").span() == (0, 4)
+
+
+def test_deep_pattern_is_picklable():
+    # AST は入れ子のない表にして送るので、pickle の再帰の上限に当たらない
+    p = matchbox.compile("a(b|c)" * 5_000)
+    q = pickle.loads(pickle.dumps(p))
+    assert repr(q.ast) == repr(p.ast)
+    assert q.is_fullmatch("ab" * 5_000)
+
+
+def test_serial_results_in_order():
+    p = matchbox.compile("a(b|c)*d")
+    assert p.fullmatch_many(TEXTS) == [p.is_fullmatch(t) for t in TEXTS]
+    assert p.search_many(iter(TEXTS)) == [p.is_search(t) for t in TEXTS]
+
+
+@pytest.mark.parametrize("chunksize", [None, 1, 7, 1000])
+def test_parallel_results_in_order(chunksize):
+    p = matchbox.compile("a(b|c)*d")
+    got = p.search_many(TEXTS, workers=2, chunksize=chunksize, min_parallel=0)
+    assert got == [p.is_search(t) for t in TEXTS]
+
+
+def test_empty_batch():
+    assert matchbox.compile("a").fullmatch_many([], workers=2, min_parallel=0) == []
+
+
+def test_invalid_workers():
+    with pytest.raises(ValueError):
+        matchbox.compile("a").fullmatch_many(["a"], workers=0)
+
+
+def test_tune_chunksize():
+    assert tune_chunksize(1000, 4) == 63
+    assert tune_chunksize(1, 8) == 1
+    assert tune_chunksize(10**9, 2) == MAX_CHUNK_SIZE
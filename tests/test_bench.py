@@ -0,0 +1,104 @@
+import json
+
+import pytest
+from matchbox import bench
+
+
+def result(name, seconds, peak_bytes=1000, error=None):
+    return {
+        "name": name,
+        "group": name.split("/")[0],
+        "size": 100,
+        "seconds": seconds,
+        "cold_seconds": seconds,
+        "throughput": None,
+        "peak_bytes": peak_bytes,
+        "error": error,
+    }
+
+
+def data(*results):
+    return {"format": bench.RESULT_FORMAT, "meta": {}, "results": list(results)}
+
+
+def test_cases_are_reproducible_and_uniquely_named():
+    names = [c.name for c in bench.build_cases((100, 200), (50,))]
+    assert len(names) == len(set(names))
+    assert names == [c.name for c in bench.build_cases((100, 200), (50,))]
+    groups = {c.group for c in bench.build_cases((100,), (50,))}
+    assert groups == {"parse", "compile", "search", "fullmatch", "worst"}
+
+
+def test_backtracking_engines_skip_large_inputs():
+    names = [c.name for c in bench.build_cases((100_000,), ())]
+    assert "worst/nfa/overlap/100000" in names
+    assert not any("/memo/" in n or "/backtrack/" in n for n in names)
+
+
+def test_measure_records_time_throughput_and_memory():
+    case = next(c for c in bench.build_cases((500,), ()) if c.name.startswith("search"))
+    r = bench.measure(case, repeat=1)
+    assert r.error is None
+    assert r.seconds > 0 and r.cold_seconds > 0
+    assert r.throughput == pytest.approx(500 / r.seconds)
+    assert r.peak_bytes >= 0
+
+
+def test_measure_records_errors():
+    def make():
+        raise RecursionError
+
+    r = bench.measure(bench.Case("parse/x/1", "parse", 1, make), repeat=1)
+    assert r.error == "RecursionError"
+    assert r.seconds is None
+
+
+def test_compare_flags_regressions_and_improvements():
+    base = data(
+        result("search/a", 1.0), result("search/b", 1.0), result("search/c", 1.0)
+    )
+    new = data(
+        result("search/a", 1.5), result("search/b", 0.5), result("search/c", 1.05)
+    )
+    changes = bench.compare(base, new, threshold=0.1)
+    assert [(c.name, c.regression) for c in changes] == [
+        ("search/a", True),
+        ("search/b", False),
+    ]
+
+
+def test_compare_memory_and_errors():
+    base = data(result("a", 1.0, peak_bytes=100), result("b", 1.0))
+    new = data(result("a", 1.0, peak_bytes=300), result("b", None, error="Boom"))
+    changes = bench.compare(base, new, memory_threshold=0.5)
+    assert [(c.name, c.metric, c.regression) for c in changes] == [
+        ("a", "peak_bytes", True),
+        ("b", "error", True),
+    ]
+
+
+def test_compare_rejects_other_formats():
+    with pytest.raises(ValueError):
+        bench.compare({"format": 999, "results": []}, data())
+
+
+def test_cli_run_and_compare(tmp_path, capsys):
+    base = tmp_path / "base.json"
+    args = ["--sizes", "200", "--pattern-sizes", "20", "--repeat", "1"]
+    assert bench.main([*args, "--filter", "dfa/dna", "--json", str(base)]) == 0
+    saved = json.loads(base.read_text())
+    assert saved["meta"]["seed"] == bench.DEFAULT_SEED
+    assert [r["name"] for r in saved["results"]] == [
+        "search/dfa/dna/200",
+        "fullmatch/dfa/dna/200",
+    ]
+    assert "search/dfa/dna/200" in capsys.readouterr().out
+
+    slow = json.loads(base.read_text())
+    for r in slow["results"]:
+        r["seconds"] /= 10  # 基準が10倍速かったことにする
+    fast = tmp_path / "fast.json"
+    fast.write_text(json.dumps(slow))
+    assert bench.main(["compare", str(fast), str(base)]) == 1
+    assert "REGRESSION" in capsys.readouterr().out
+    assert bench.main(["compare", str(base), str(base)]) == 0
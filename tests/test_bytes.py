@@ -0,0 +1,118 @@
+import mmap
+
+import pytest
+import matchbox
+from matchbox.scanner import scan_file
+
+from tests.test_finditer import CASES as FINDITER_CASES
+
+TEXTS = [
+    ("ab*c", "xxabbbc"),
+    ("(a|ab)(c|bcd)", "abcd"),
+    ("^ERROR.*$", "ERROR disk full"),
+    ("a.c", "a\xffc"),
+    ("abc", "ab"),
+    ("x(y)?z", "xz xyz"),
+    ("", ""),
+]
+
+
+def as_bytes(s):
+    return s.encode("latin-1")
+
+
+def inputs(data):
+    """同じ内容のバイト列を、受け付けるすべての型で返す"""
+    return [data, bytearray(data), memoryview(data)]
+
+
+@pytest.mark.parametrize("engine", ["nfa", "dfa"])
+@pytest.mark.parametrize("pattern, text", TEXTS)
+def test_bool_api_matches_str(pattern, text, engine):
+    p = matchbox.compile(pattern)
+    bp = matchbox.compile(as_bytes(pattern))
+    for data in inputs(as_bytes(text)):
+        assert bp.is_fullmatch(data, engine=engine) == p.is_fullmatch(text)
+        assert bp.is_match(data, engine=engine) == p.is_match(text)
+        assert bp.is_search(data, engine=engine) == p.is_search(text)
+
+
+@pytest.mark.parametrize("pattern, text", FINDITER_CASES)
+def test_finditer_matches_str(pattern, text):
+    expected = [
+        (m.span(), as_bytes(m.group()), tuple(g and as_bytes(g) for g in m.groups()))
+        for m in matchbox.compile(pattern).finditer(text)
+    ]
+    bp = matchbox.compile(as_bytes(pattern))
+    for data in inputs(as_bytes(text)):
+        got = [(m.span(), m.group(), m.groups()) for m in bp.finditer(data)]
+        assert got == expected
+
+
+def test_groups_are_bytes_for_memoryview():
+    m = matchbox.compile(b"(a+)(b)?").search(memoryview(b"xxaab"))
+    assert m.group() == b"aab"
+    assert m.groups() == (b"aa", b"b")
+    assert type(m.group(1)) is bytes
+
+
+def test_high_bytes_match_by_value():
+    p = matchbox.compile(b"\xe3\x81\x82+")
+    assert p.is_search("あああ".encode())
+    assert not p.is_search("い".encode())
+    assert p.search(b"x\xe3\x81\x82\x82").span() == (1, 5)
+
+
+def test_mmap(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"x" * 10000 + b"ERROR 42\n" + b"y" * 10000)
+    p = matchbox.compile(b"ERROR (2|4)+")
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        assert p.is_search(m)
+        assert not p.is_fullmatch(m)
+        found = p.search(m)
+        assert found.span() == (10000, 10008)
+        assert found.group() == b"ERROR 42"
+
+
+def test_sub_split_findall():
+    p = matchbox.compile(b"(1|2|,)")
+    text = b"1,2"
+    assert p.sub(b"[\\1]", text) == b"[1][,][2]"
+    assert p.subn(lambda m: b"-", memoryview(text)) == (b"---", 3)
+    assert matchbox.compile(b",").split(memoryview(b"a,b,c")) == [b"a", b"b", b"c"]
+    assert matchbox.compile(b"a(b)?").findall(b"a ab") == [b"", b"b"]
+
+
+def test_scanner_and_scan_file(tmp_path):
+    p = matchbox.compile(b"ERROR(1|2)+")
+    scanner = p.scanner()
+    found = (
+        scanner.feed(b"xxERR") + scanner.feed(memoryview(b"OR12 y")) + scanner.finish()
+    )
+    assert [(m.span(), m.group()) for m in found] == [((2, 9), b"ERROR12")]
+
+    path = tmp_path / "log.bin"
+    path.write_bytes(b"\xffERROR1\n" * 3)
+    assert [m.start() for m in scan_file(p, path, chunk_size=5)] == [1, 9, 17]
+
+
+def test_cache_keeps_str_and_bytes_apart():
+    assert not matchbox.compile("a").bytes_mode
+    assert matchbox.compile(b"a").bytes_mode
+    assert matchbox.search(b"a", b"xa")
+    assert matchbox.search("a", "xa")
+
+
+@pytest.mark.parametrize(
+    "pattern, text", [("a", b"a"), (b"a", "a"), ("a", memoryview(b"a"))]
+)
+def test_mixing_str_and_bytes_raises(pattern, text):
+    with pytest.raises(TypeError):
+        matchbox.search(pattern, text)
+
+
+@pytest.mark.parametrize("kwargs", [{"engine": "backtrack"}, {"max_steps": 10}])
+def test_ast_engines_reject_bytes(kwargs):
+    with pytest.raises(ValueError, match="bytes"):
+        matchbox.fullmatch(b"a", b"a", **kwargs)
@@ -0,0 +1,101 @@
+import pytest
+import matchbox
+from matchbox.cache import LRUCache
+from matchbox.evaluator import Pattern, fullmatch, search
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    matchbox.purge()
+    matchbox.set_cache_size(512)
+    yield
+    matchbox.purge()
+    matchbox.set_cache_size(512)
+
+
+def test_compile_returns_reusable_pattern():
+    p = matchbox.compile("a(b|c)*d")
+    assert isinstance(p, Pattern)
+    assert p.fullmatch("abcbd")
+    assert not p.fullmatch("abx")
+    assert p.search("xxacdyy")
+    assert not p.search("xxyy")
+
+
+@pytest.mark.parametrize(
+    "pattern, text, expected",
+    [
+        ("ab", "abc", True),
+        ("ab", "xab", False),
+        ("a*", "bbb", True),
+        ("^a", "abc", True),
+        ("c$", "abc", False),
+        ("a+b", "aabx", True),
+    ],
+)
+def test_match_is_anchored_at_start(pattern, text, expected):
+    assert bool(matchbox.compile(pattern).match(text)) == expected
+    assert matchbox.match(pattern, text) == expected
+
+
+def test_compile_is_cached():
+    p1 = matchbox.compile("a+b")
+    p2 = matchbox.compile("a+b")
+    assert p1 is p2
+    info = matchbox.cache_info()
+    assert info.misses == 1
+    assert info.hits == 1
+    assert info.currsize == 1
+
+
+def test_compile_accepts_pattern():
+    p = matchbox.compile("abc")
+    assert matchbox.compile(p) is p
+
+
+def test_module_functions_use_cache():
+    fullmatch("a|b", "a")
+    search("a|b", "xxb")
+    assert matchbox.cache_info().hits == 1
+
+
+def test_cache_size_bounds_and_evicts():
+    matchbox.set_cache_size(2)
+    for pat in ("a", "b", "c"):
+        matchbox.compile(pat)
+    info = matchbox.cache_info()
+    assert info.currsize == 2
+    assert info.evictions == 1
+
+
+def test_syntax_error_is_not_cached():
+    with pytest.raises(SyntaxError):
+        matchbox.compile("a|")
+    assert matchbox.cache_info().currsize == 0
+
+
+def test_lru_cache_order():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" を最近使ったことにする
+    cache.put("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.get("b") is None
+    info = cache.info()
+    assert (info.hits, info.misses, info.evictions) == (1, 1, 1)
+
+
+def test_lru_cache_resize_and_disable():
+    cache = LRUCache(3)
+    for i in range(3):
+        cache.put(i, i)
+    cache.resize(1)
+    assert len(cache) == 1
+    assert 2 in cache
+    cache.resize(0)
+    cache.put("x", 1)
+    assert len(cache) == 0
+    with pytest.raises(ValueError):
+        cache.resize(-1)
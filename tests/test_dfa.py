@@ -0,0 +1,54 @@
+import pytest
+from matchbox.dfa import LazyDFA
+from matchbox.evaluator import Pattern, fullmatch, match, search
+from matchbox.nfa import compile_program
+from matchbox.parser import parse
+
+from tests.test_nfa import CASES
+
+
+def make_dfa(pattern, **kwargs):
+    return LazyDFA(compile_program(parse(pattern)), **kwargs)
+
+
+@pytest.mark.parametrize("pattern, text", CASES)
+def test_dfa_agrees_with_nfa(pattern, text):
+    for fn in (fullmatch, match, search):
+        assert fn(pattern, text, engine="dfa") == fn(
+            pattern, text, engine="nfa"
+        ), fn.__name__
+
+
+def test_dfa_is_default_without_trace():
+    p = Pattern("a(b|c)d")
+    assert p.fullmatch("acd")
+    assert p.dfa.info().states_built > 0
+
+
+def test_states_are_reused():
+    dfa = make_dfa("(a|b)*c")
+    assert dfa.fullmatch("ababc")
+    built = dfa.info().states_built
+    assert dfa.fullmatch("babac")
+    assert not dfa.fullmatch("abab")
+    assert dfa.info().states_built == built
+
+
+def test_cache_flushes_when_full():
+    dfa = make_dfa("(a|b)*a(a|b)(a|b)(a|b)(a|b)", max_memory=4000)
+    texts = ["abababba", "bbbbbbbb", "aaaabbbb", "babababa", "abbbbbbb"]
+    expected = [make_dfa("(a|b)*a(a|b)(a|b)(a|b)(a|b)").fullmatch(t) for t in texts]
+    assert [dfa.fullmatch(t) for t in texts] == expected
+    info = dfa.info()
+    assert info.flushes > 0
+    assert info.memory <= info.max_memory
+    assert info.states_built > info.cache_size
+
+
+def test_anchors_in_search():
+    dfa = make_dfa("^ab")
+    assert dfa.search("abx")
+    assert not dfa.search("xab")
+    dfa = make_dfa("ab$")
+    assert dfa.search("xab")
+    assert not dfa.search("abx")
@@ -1,5 +1,5 @@
 import pytest
-from matchbox.evaluator import fullmatch, search
+from matchbox.evaluator import ENGINES, compile, fullmatch, search
 
 
 # --- fullmatch tests ---
@@ -57,6 +57,18 @@ def test_concat():
         ("a?b", "b", True),
         ("a?b", "ab", True),
         ("a?b", "aab", False),
+        # Counted ({m,n})
+        ("a{3}", "aaa", True),
+        ("a{3}", "aa", False),
+        ("a{2,}", "aaaaa", True),
+        ("a{2,}", "a", False),
+        ("a{,2}", "", True),
+        ("a{,2}", "aaa", False),
+        ("(ab){1,2}c", "ababc", True),
+        ("(ab){1,2}c", "abababc", False),
+        ("(a|b){0}c", "c", True),
+        ("(a|b){0}c", "ac", False),
+        ("a{x}", "a{x}", True),  # 回数指定でない { は文字
     ],
 )
 def test_repeaters(pattern, text, expected):
@@ -128,6 +140,31 @@ def test_invalid_backtracking_patterns(pattern):
         parse(pattern)
 
 
+def test_match_context_uses_offsets():
+    from matchbox.ast_nodes import MatchContext
+    from matchbox.parser import parse
+
+    ctx = MatchContext(original_text="abcb", pos=1)
+    assert ctx.text == "bcb"
+    assert ctx.advance(2).pos == 3
+    assert parse("b").match(ctx) == {2}
+    assert parse("(b|c)*").match(ctx) == {1, 2, 3, 4}
+
+
+@pytest.mark.parametrize(
+    "pattern, text, expected",
+    [
+        ("(a|ab)?", "ab", True),  # 1回目の繰り返しの結果をすべて残す
+        ("(a?b?)+", "", True),  # 空文字に一致する本体の +
+        ("", "", True),
+        ("", "a", False),
+    ],
+)
+def test_backtrack_repeat_edge_cases(pattern, text, expected):
+    assert fullmatch(pattern, text, engine="backtrack") == expected
+    assert fullmatch(pattern, text, engine="nfa") == expected
+
+
 # --- search tests ---
 
 
@@ -148,3 +185,95 @@ def test_invalid_backtracking_patterns(pattern):
 )
 def test_search(pattern, text, expected):
     assert search(pattern, text) == expected
+
+
+@pytest.mark.parametrize(
+    "pattern, text, expected",
+    [
+        ("b", "abc", True),
+        ("^a", "ba", False),
+        ("^b", "ba", True),
+        ("c$", "abc", True),
+        ("a$", "abc", False),
+        ("(a|ab)(c|bcd)", "xxabcd", True),
+        ("a*", "", True),
+        ("x+", "a" * 300 + "x", True),
+    ],
+)
+def test_backtrack_search_scans_once(pattern, text, expected):
+    assert search(pattern, text, engine="backtrack") == expected
+    assert search(pattern, text, engine="nfa") == expected
+
+
+def test_scan_evaluates_position_sets():
+    from matchbox.parser import parse
+
+    assert parse("ab").scan("abab", {0, 1, 2}) == {2, 4}
+    assert parse("(ab)*").scan("abab", {0, 1}) == {0, 1, 2, 4}
+    assert parse("a?").scan("ab", {0, 1}) == {0, 1}
+    assert parse("a|b").scan("ab", {0, 1, 2}) == {1, 2}
+    assert parse("^(a|b)").scan("ab", {0, 1, 2}) == {1}
+    assert parse("(a|b)$").scan("ab", {0, 1, 2}) == {2}
+    assert parse("(ab){2}").scan("ababab", {0, 1, 2}) == {4, 6}
+    assert parse("(ab){0}").scan("ab", {0, 1}) == {0, 1}
+    assert parse("a{1,2}").scan("aaab", {0, 3}) == {1, 2}
+
+
+@pytest.mark.parametrize(
+    "pattern, text, ends",
+    [
+        ("a*", "aaab", {0, 1, 2, 3}),
+        (".*", "ab\nc", {0, 1, 2, 3, 4}),
+        ("a{2,3}", "aaaa", {2, 3}),
+        ("(a|b){2,}", "abbac", {2, 3, 4}),
+        ("(a|b){,1}", "ab", {0, 1}),
+        ("a{2}", "a", set()),
+    ],
+)
+def test_single_character_loops_scan_runs(pattern, text, ends):
+    from matchbox.optimizer import optimize
+    from matchbox.parser import parse
+
+    # 本体が1文字の繰り返しは、開始位置からの連続する範囲を一度に数える
+    assert optimize(parse(pattern)).scan(text, {0}) == ends
+    assert parse(pattern).scan(text, {0}) == ends
+
+
+def test_single_character_loop_over_long_run():
+    text = "a" * 300_000 + "b"
+    assert fullmatch("a*b", text, engine="backtrack")
+    assert fullmatch("a{2,}b", text, engine="backtrack")
+    assert not fullmatch("a{2,1000}b", text, engine="backtrack")
+    assert search("x.*b", "x" + text, engine="backtrack")
+
+
+def test_backtrack_search_long_miss():
+    text = "x" * 200_000
+    assert not search("ab(c|d)", text, engine="backtrack")
+    assert search("ab(c|d)", text + "abd", engine="backtrack")
+
+
+@pytest.mark.parametrize("piece, text", [("(a)", "a"), ("a(b|c)", "ac")])
+def test_long_patterns_do_not_hit_recursion_limit(piece, text):
+    # 10万文字のパターン。評価器・パーサとも再帰しないので RecursionError にならない
+    n = 100_000 // len(piece)
+    p = compile(piece * n)
+    for engine in ENGINES:
+        assert p.is_fullmatch(text * n, engine=engine), engine
+        assert not p.is_fullmatch(text * n + "!", engine=engine), engine
+
+
+def test_deeply_nested_pattern():
+    depth = 50_000
+    p = compile("(" * depth + "a|b*" + ")" * depth + "c")
+    for engine in ENGINES:
+        assert p.is_fullmatch("bbbc", engine=engine), engine
+        assert not p.is_fullmatch("abc", engine=engine), engine
+
+
+def test_million_character_input():
+    text = "a" + "bc" * 500_000 + "d"
+    assert fullmatch("a(b|c)*d", text, engine="backtrack")
+    assert fullmatch("a(b|c)*d", text, engine="dfa")
+    assert search(".*(foo|bar)", "q" * 1_000_000 + "bar", engine="backtrack")
+    assert fullmatch("(ab|cd)*e", "ab" * 100_000 + "e", engine="memo")
@@ -0,0 +1,67 @@
+import pytest
+import matchbox
+
+from tests.test_match import to_re
+
+CASES = [
+    ("a", "banana"),
+    ("an", "banana"),
+    ("a*", "baaac"),
+    ("x*", "axbc"),
+    ("(a|b)+", "abxbaxx"),
+    ("(a)(n)?", "banana"),
+    ("^a", "aaa"),
+    ("a$", "aaa"),
+    ("", "abc"),
+    ("ERROR(1|2)+", "ERROR1 ok ERROR3 ERROR212"),
+    (".", ""),
+]
+
+
+@pytest.mark.parametrize("pattern, text", CASES)
+def test_finditer_matches_re(pattern, text):
+    mine = [(m.span(), m.groups()) for m in matchbox.compile(pattern).finditer(text)]
+    ref = [(m.span(), m.groups()) for m in to_re(pattern).finditer(text)]
+    assert mine == ref
+
+
+@pytest.mark.parametrize("pattern, text", CASES)
+def test_findall_matches_re(pattern, text):
+    assert matchbox.compile(pattern).findall(text) == to_re(pattern).findall(text)
+
+
+@pytest.mark.parametrize("pattern, text", CASES)
+def test_split_matches_re(pattern, text):
+    p, r = matchbox.compile(pattern), to_re(pattern)
+    assert p.split(text) == r.split(text)
+    assert p.split(text, maxsplit=1) == r.split(text, maxsplit=1)
+
+
+@pytest.mark.parametrize("pattern, text", CASES)
+def test_sub_matches_re(pattern, text):
+    p, r = matchbox.compile(pattern), to_re(pattern)
+    assert p.sub("<>", text) == r.sub("<>", text)
+    assert p.subn("-", text, count=2) == r.subn("-", text, count=2)
+
+
+def test_sub_templates_and_callables():
+    p = matchbox.compile("(a+)(b)")
+    assert p.sub(r"[\2\1]", "xaabyab") == "x[baa]y[ba]"
+    assert p.sub(r"\g<1>\\", "aab") == "aa\\"
+    assert p.sub(lambda m: str(m.end() - m.start()), "aab ab") == "3 2"
+    with pytest.raises(ValueError):
+        p.sub(r"\3", "ab")
+    with pytest.raises(ValueError):
+        p.sub(r"\q", "ab")
+
+
+def test_finditer_is_lazy():
+    it = matchbox.compile("a").finditer("a" * 1000)
+    assert next(it).span() == (0, 1)
+    assert next(it).span() == (1, 2)
+
+
+def test_finditer_large_input_is_linear():
+    text = ("x" * 99 + "ERROR1") * 2000
+    matches = matchbox.compile("ERROR(1|2)+").finditer(text)
+    assert sum(1 for _ in matches) == 2000
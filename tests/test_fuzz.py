@@ -0,0 +1,63 @@
+import json
+import random
+import re
+
+from matchbox import fuzz
+from matchbox.parser import parse
+
+
+def test_generated_patterns_parse_and_are_reproducible():
+    rng = random.Random(5)
+    patterns = [fuzz.random_pattern(rng) for _ in range(200)]
+    for pattern in patterns:
+        parse(pattern)
+        fuzz.to_re(pattern)
+    rng = random.Random(5)
+    assert patterns == [fuzz.random_pattern(rng) for _ in range(200)]
+
+
+def test_to_re_anchors_apply_to_the_whole_expression():
+    # matchbox の a|b$ は (a|b)$ で、$ は文字列の末尾にだけ一致する
+    assert fuzz.to_re("a|b$").search("ax") is None
+    assert fuzz.to_re("^a|b").search("xb") is None
+    assert fuzz.to_re("a$").search("a\n") is None
+    assert fuzz.to_re(".").fullmatch("\n")
+
+
+def test_engines_agree_with_re():
+    report = fuzz.run(iterations=100, seed=1, texts=4)
+    assert report.cases == 400
+    assert report.failures == 0, report.counterexamples
+    assert set(report.seconds) == {"re", *fuzz.TARGETS}
+
+
+def test_check_reports_every_engine_and_method():
+    mismatches, seconds = fuzz.check("ab", "ab", engines=("nfa", "dfa:bytes"))
+    assert mismatches == []
+    assert set(seconds) == {"re", "nfa", "dfa:bytes"}
+
+
+def test_minimize_keeps_the_failure():
+    def fails(pattern, text):
+        return "c" in pattern and "b" in text
+
+    assert fuzz.minimize("a(b|c)*d", "xxbyy", fails) == ("c", "b")
+
+
+def test_run_shrinks_counterexamples(monkeypatch):
+    # re 側の変換から DOTALL を落とすと、. が改行に一致しない食い違いになる
+    to_re = fuzz.to_re
+    monkeypatch.setattr(fuzz, "to_re", lambda p: re.compile(to_re(p).pattern))
+    report = fuzz.run(iterations=30, seed=2, engines=("nfa",))
+    assert report.failures > 0
+    assert {(m.pattern, m.text) for m in report.counterexamples} == {(".", "\n")}
+    assert {m.method for m in report.counterexamples} == set(fuzz.METHODS)
+
+
+def test_cli_writes_json_report(tmp_path, capsys):
+    out = tmp_path / "fuzz.json"
+    assert fuzz.main(["--iterations", "10", "--seed", "3", "--json", str(out)]) == 0
+    report = json.loads(out.read_text())
+    assert report["seed"] == 3
+    assert report["failures"] == 0
+    assert "0 mismatch(es)" in capsys.readouterr().out
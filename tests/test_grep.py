@@ -0,0 +1,116 @@
+import io
+import subprocess
+import sys
+
+import pytest
+import matchbox
+from matchbox.grep import GrepOptions, _lines, grep_paths, grep_stream
+
+LOG = b"ok line\nERROR1 disk\nfoo ERROR22 bar ERROR1\n\xe3\x81\x82 ERROR2\nnope"
+
+
+def grep(pattern, data=LOG, **options):
+    out = io.BytesIO()
+    count = grep_stream(
+        matchbox.compile(pattern), io.BytesIO(data), GrepOptions(**options), out
+    )
+    return count, out.getvalue()
+
+
+def test_matching_lines():
+    count, out = grep("ERROR(1|2)+")
+    assert count == 3
+    # 元のバイト列のまま出力する（UTF-8 の行もそのまま）
+    assert out == b"ERROR1 disk\nfoo ERROR22 bar ERROR1\n\xe3\x81\x82 ERROR2\n"
+
+
+def test_count():
+    assert grep("ERROR", count=True) == (3, b"3\n")
+    assert grep("zzz", count=True) == (0, b"0\n")
+
+
+def test_line_numbers_and_offsets():
+    _, out = grep("disk|nope", line_number=True, byte_offset=True)
+    assert out == b"2:8:ERROR1 disk\n5:54:nope\n"
+
+
+def test_only_matching_with_offsets():
+    _, out = grep("ERROR(1|2)+", only_matching=True, byte_offset=True)
+    assert out == b"8:ERROR1\n24:ERROR22\n36:ERROR1\n47:ERROR2\n"
+    assert LOG[36:42] == b"ERROR1"
+    assert LOG[47:53] == b"ERROR2"
+
+
+def test_line_regexp():
+    assert grep("ERROR1 disk|nope", line_regexp=True)[0] == 2
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 7, 1 << 20])
+def test_lines_across_blocks(block_size):
+    lines = list(_lines(io.BytesIO(LOG), block_size))
+    assert [raw for _, _, raw in lines] == LOG.split(b"\n")
+    assert [off for _, off, _ in lines] == [0, 8, 20, 43, 54]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_multiple_files(tmp_path, jobs):
+    a = tmp_path / "a.log"
+    b = tmp_path / "b.log"
+    a.write_bytes(LOG)
+    b.write_bytes(b"ERROR2\nok\n")
+    out = io.BytesIO()
+    options = GrepOptions(count=True, with_filename=True)
+    total = grep_paths(matchbox.compile("ERROR"), [str(a), str(b)], options, out, jobs)
+    assert total == 4
+    assert out.getvalue() == f"{a}:3\n{b}:1\n".encode()
+
+
+def run_cli(*args, stdin=b""):
+    return subprocess.run(
+        [sys.executable, "-m", "matchbox", *args], input=stdin, capture_output=True
+    )
+
+
+def test_cli_grep_stdin():
+    proc = run_cli("ERROR(1|2)+", "-f", "-n", stdin=LOG)
+    assert proc.returncode == 0
+    assert proc.stdout.splitlines()[0] == b"2:ERROR1 disk"
+
+
+def test_cli_grep_exit_status(tmp_path):
+    path = tmp_path / "a.log"
+    path.write_bytes(LOG)
+    assert run_cli("zzz", "-f", str(path)).returncode == 1
+    assert run_cli("ERROR", "-c", "-f", str(path)).stdout == b"3\n"
+    # 開けないファイルは「一致なし」と区別できるよう grep と同じく 2
+    missing = run_cli("ERROR", "-f", str(tmp_path / "missing"))
+    assert missing.returncode == 2
+    assert b"No such file" in missing.stderr
+
+
+def test_cli_grep_invalid_pattern():
+    proc = run_cli("(ERROR", "-f", "-", stdin=LOG)
+    assert proc.returncode == 2
+    assert proc.stderr.startswith(b"matchbox: invalid pattern: ")
+    assert b"Traceback" not in proc.stderr
+
+
+@pytest.mark.parametrize(
+    "flag",
+    [["--engine", "nfa"], ["--trace"], ["--profile"], ["--dump-ast"], ["--search"]],
+)
+def test_cli_grep_rejects_match_options(flag):
+    proc = run_cli("ERROR", "-f", "-", *flag, stdin=LOG)
+    assert proc.returncode == 2
+    assert b"cannot be combined with -f" in proc.stderr
+
+
+def test_bytes_pattern_matches_raw_lines():
+    # bytes パターンなら行をデコードせず、UTF-8 の文字もバイト列のまま一致する
+    count, out = grep("あ ERROR".encode(), only_matching=True, byte_offset=True)
+    assert (count, out) == (1, b"43:\xe3\x81\x82 ERROR\n")
+
+
+def test_cli_grep_non_ascii_pattern():
+    proc = run_cli("あ", "-f", "-c", stdin=LOG)
+    assert proc.stdout == b"1\n"
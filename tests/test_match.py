@@ -0,0 +1,131 @@
+import re
+
+import pytest
+import matchbox
+from matchbox.match import Match
+
+
+def to_re(pattern):
+    # matchbox の ^ / $ は文字列の先頭・末尾のみ、. は改行にも一致する
+    return re.compile(pattern.replace("$", r"\Z").replace("^", r"\A"), re.DOTALL)
+
+
+SPAN_CASES = [
+    ("b", "abc"),
+    ("a+", "xaaay"),
+    ("a*", "bbb"),
+    ("(a|ab)(c|bcd)", "xxabcd"),
+    ("(a|ab)(c|bcd)(d*)", "abcd"),
+    ("a(b|c)+d", "xx_acbd_yy"),
+    ("(ab)*c", "ababc"),
+    ("(a(b)?)+", "aba"),
+    ("((a)|b)+", "ab"),
+    ("x(y)?z", "xz"),
+    ("^ab", "xab"),
+    ("ab$", "abab"),
+    (".*c", "ab_c_dc"),
+    ("ERROR(1|2)+", "ok ERROR3 ERROR21"),
+    ("(a|aa)*c", "aaaaaac"),
+    ("(ab){2,3}c", "abababababc"),
+    ("a{2}", "xaaa"),
+    ("x{0,2}y", "xxxy"),
+    ("(a|b){3,}", "cabbab"),
+    ("(a){0}b", "ab"),
+]
+
+
+@pytest.mark.parametrize("engine", ["dfa", "nfa", "backtrack"])
+@pytest.mark.parametrize("pattern, text", SPAN_CASES)
+def test_search_spans_match_re(engine, pattern, text):
+    expected = to_re(pattern).search(text)
+    m = matchbox.compile(pattern).search(text, engine=engine)
+    if expected is None:
+        assert m is None
+        return
+    assert m.span() == expected.span()
+    assert m.group() == expected.group()
+    assert m.groups() == expected.groups()
+    for g in range(len(expected.groups()) + 1):
+        assert m.span(g) == expected.span(g)
+
+
+@pytest.mark.parametrize("pattern, text", SPAN_CASES)
+def test_match_and_fullmatch_spans(pattern, text):
+    p = matchbox.compile(pattern)
+    r = to_re(pattern)
+    for mine, ref in (
+        (p.match(text), r.match(text)),
+        (p.fullmatch(text), r.fullmatch(text)),
+        (p.fullmatch(text[1:]), r.fullmatch(text[1:])),
+    ):
+        assert (mine is None) == (ref is None)
+        if ref is not None:
+            assert mine.span() == ref.span()
+            assert mine.groups() == ref.groups()
+
+
+# 空文字列に一致した回のあとでループを抜ける（re と同じく、その回のキャプチャを残す）
+EMPTY_ITERATION_CASES = [
+    ("(a*|c)+", "c"),
+    ("(a*|c)*", "ca"),
+    ("a(.c|b?)+", "ab"),
+    ("((a*)|((c))?)*", "cc"),
+    ("((b?)(a|c)?)*x", "bcx"),
+    # 回数指定: 下限までの回は空でも繰り返し、その先は * と同じく空の回のあとで抜ける
+    ("(c*|b){,2}a", "ba"),
+    ("(c*|b){2,4}a", "ba"),
+    ("(c*|b){3}a", "ba"),
+    ("(a{,}|.){,4}", "b"),
+]
+
+
+@pytest.mark.parametrize("pattern, text", EMPTY_ITERATION_CASES)
+def test_empty_iteration_groups_match_re(pattern, text):
+    p = matchbox.compile(pattern)
+    r = to_re(pattern)
+    for mine, ref in ((p.search(text), r.search(text)), (p.match(text), r.match(text))):
+        assert [mine.span(g) for g in range(p.groups + 1)] == [
+            ref.span(g) for g in range(p.groups + 1)
+        ]
+
+
+def test_match_object_api():
+    m = matchbox.compile("(a+)(x)?(b)").search("zzaab")
+    assert isinstance(m, Match)
+    assert m.re.pattern == "(a+)(x)?(b)"
+    assert m.string == "zzaab"
+    assert (m.start(), m.end()) == (2, 5)
+    assert m.group(1) == "aa"
+    assert m.group(2) is None
+    assert m.span(2) == (-1, -1)
+    assert m.group(1, 3) == ("aa", "b")
+    assert m[3] == "b"
+    assert m.groups(default="") == ("aa", "", "b")
+    assert repr(m) == "<Match span=(2, 5), match='aab'>"
+    with pytest.raises(IndexError):
+        m.group(4)
+
+
+def test_pattern_groups_count():
+    assert matchbox.compile("abc").groups == 0
+    assert matchbox.compile("((a)b)(c)").groups == 3
+    # {0} の本体は実行しないが、グループは数える（re と同じく一致なし）
+    m = matchbox.compile("x(a){0}").search("xa")
+    assert (m.span(), m.groups()) == ((0, 1), (None,))
+
+
+def test_bool_fast_path():
+    p = matchbox.compile("a(b|c)d")
+    assert p.is_fullmatch("acd") is True
+    assert p.is_match("abdx") is True
+    assert p.is_search("xxabd") is True
+    assert p.is_search("xxad") is False
+    # モジュール関数は bool を返す
+    assert matchbox.search("a(b|c)d", "xxabd") is True
+
+
+def test_no_match_returns_none():
+    p = matchbox.compile("ab")
+    assert p.search("xyz") is None
+    assert p.match("xab") is None
+    assert p.fullmatch("abc") is None
@@ -0,0 +1,90 @@
+import time
+
+import pytest
+import matchbox
+from matchbox import MatchTimeout
+from matchbox.ast_nodes import MatchContext
+from matchbox.evaluator import compile, fullmatch, match, search
+from matchbox.memo import MemoMatcher
+
+from tests.test_nfa import CASES
+
+
+@pytest.mark.parametrize("pattern, text", CASES)
+def test_memo_agrees_with_backtrack(pattern, text):
+    for fn in (fullmatch, match, search):
+        assert fn(pattern, text, engine="memo") == fn(
+            pattern, text, engine="backtrack"
+        ), fn.__name__
+
+
+@pytest.mark.parametrize("pattern, text", CASES)
+def test_memo_returns_node_results(pattern, text):
+    ast = compile(pattern).ast
+    matcher = MemoMatcher(text)
+    for pos in range(len(text) + 1):
+        expected = ast.match(MatchContext(text, pos))
+        assert matcher.match(ast, pos) == expected
+
+
+def count_nodes(node):
+    children = [getattr(node, name, None) for name in ("node", "left", "right")]
+    return 1 + sum(count_nodes(c) for c in children if c is not None)
+
+
+def test_each_subproblem_is_evaluated_once():
+    p = compile("(a|aa)*(a|aa)*b")
+    text = "a" * 200
+    matcher = MemoMatcher(text)
+    for i in range(len(text) + 1):
+        matcher.match(p.ast, i)
+    nodes = count_nodes(p.ast)
+    assert len(matcher._memo) <= nodes * (len(text) + 1)
+
+
+def test_deep_pattern_counts_each_state_once():
+    # 連結の鎖は要素ごとに (ノード, 位置) を1回ずつ評価し、グループは数えない。
+    # 各要素は評価と、終了位置1つを連結にまとめる分の2ステップ
+    n = 20_000
+    matcher = MemoMatcher("a" * n)
+    assert matcher.match(compile("(a)" * n).ast, 0) == {n}
+    assert len(matcher._memo) == n + 1
+    assert matcher.steps == 2 * n + 1
+
+
+def test_step_budget_raises():
+    with pytest.raises(MatchTimeout) as info:
+        fullmatch("(a|aa)*(a|aa)*b", "a" * 500 + "ba", max_steps=1000)
+    assert info.value.steps == 1001
+    assert isinstance(info.value, RuntimeError)
+
+
+def test_step_budget_bounds_long_search():
+    # 開始位置ごとに (a|b)* の長い終了位置の集合をメモから引いてまとめる手間も数える
+    p = compile("(a|b)*(c|d)e")
+    text = "ab" * 2000 + "cxe"
+    start = time.perf_counter()
+    with pytest.raises(MatchTimeout):
+        p.is_search(text, max_steps=60_000)
+    assert time.perf_counter() - start < 1
+
+
+def test_timeout_raises():
+    start = time.perf_counter()
+    with pytest.raises(MatchTimeout, match="timeout"):
+        search("(a|aa)*(a|aa)*b", "a" * 3000 + "ba", timeout=0.05)
+    assert time.perf_counter() - start < 5
+
+
+def test_limits_within_budget():
+    assert fullmatch("a(b|c)*d", "abcbd", max_steps=10_000, timeout=5)
+    p = matchbox.compile("(a+)(b)")
+    assert p.search("xxaab", max_steps=10_000).span() == (2, 5)
+
+
+def test_limits_select_memo_engine():
+    assert fullmatch("ab", "ab", engine="memo", max_steps=100)
+    with pytest.raises(ValueError):
+        fullmatch("ab", "ab", engine="dfa", max_steps=100)
+    with pytest.raises(ValueError):
+        fullmatch("ab", "ab", trace=True, timeout=1)
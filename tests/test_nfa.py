@@ -0,0 +1,151 @@
+import pickle
+import time
+from array import array
+
+import pytest
+from matchbox.ast_nodes import CharNode
+from matchbox.evaluator import compile, fullmatch, match, search
+from matchbox.nfa import (
+    ANY,
+    CHAR,
+    JMP,
+    MATCH,
+    SPLIT,
+    _add_capture_thread,
+    _fresh,
+    compile_program,
+    pike_captures,
+    pike_match,
+)
+from matchbox.parser import parse
+
+CASES = [
+    ("a", "a"),
+    ("abc", "abd"),
+    ("a.c", "abc"),
+    ("a|b", "b"),
+    ("ab|cd", "cd"),
+    ("a*b", "aaab"),
+    ("a+", ""),
+    ("a?b", "ab"),
+    ("(ab)*", "ababab"),
+    ("(ab)*", "abababa"),
+    ("a(b|c)+d", "abccbd"),
+    ("(a|aa)*c", "aaaaaac"),
+    ("(a|aa)*c", "aaaaaab"),
+    ("^abc$", "abc"),
+    ("^$", ""),
+    ("^a", "ba"),
+    ("c$", "abc"),
+    (".*c", "ab_c_de"),
+    ("a{3}", "aaa"),
+    ("a{3}", "aaaa"),
+    ("(ab){2,}", "ababab"),
+    ("(a|b){1,3}c", "abac"),
+    ("x{,2}y", "xxxy"),
+    ("(a){0}b", "b"),
+]
+
+
+def test_program_shape():
+    program = compile_program(parse("a*."))
+    assert [inst.op for inst in program] == [SPLIT, CHAR, JMP, ANY, MATCH]
+    assert (program[0].x, program[0].y) == (1, 3)
+    assert program[2].x == 0
+
+
+def test_counted_repeat_is_unrolled_only_in_the_program():
+    ast = parse("a{2,4}")
+    program = compile_program(ast)
+    assert [inst.op for inst in program].count(CHAR) == 4
+    assert ast.op == "{2,4}"  # ASTは展開しない
+    assert pike_match(program, "aaaa") and not pike_match(program, "aaaaa")
+    assert not pike_match(program, "a")
+
+
+def test_program_is_flat():
+    program = compile_program(parse("(a|b)c"))
+    assert isinstance(program.ops, array)
+    assert isinstance(program.xs, tuple)
+    assert program.groups == 1
+    assert repr(program[1]) == "SPLIT 2, 4"
+    assert pickle.loads(pickle.dumps(program)) == program
+
+
+def test_alternation_chain_keeps_priority():
+    program = compile_program(parse("a|ab|abc"))
+    assert pike_captures(program, "abc", "match")[:2] == [0, 1]
+    assert pike_captures(program, "abc", "fullmatch")[:2] == [0, 3]
+
+
+def test_long_concat_chain_compiles_without_recursion():
+    ast = parse("(ab|cd)" * 2000)
+    program = compile_program(ast)
+    assert pike_match(program, "ab" * 1999 + "cd")
+
+
+def test_nodes_have_no_instance_dict():
+    assert not hasattr(CharNode("a"), "__dict__")
+    assert not hasattr(parse("a(b|c)*"), "__dict__")
+
+
+@pytest.mark.parametrize("pattern, text", CASES)
+def test_engines_agree(pattern, text):
+    for fn in (fullmatch, match, search):
+        assert fn(pattern, text, engine="nfa") == fn(
+            pattern, text, engine="backtrack"
+        ), fn.__name__
+
+
+def test_pike_match_directly():
+    assert pike_match(compile_program(parse("a(b|c)d")), "acd")
+
+
+def test_deep_pattern_compiles():
+    depth = 50_000
+    program = compile_program(parse("(" * depth + "a*" + ")" * depth))
+    assert pike_match(program, "aaa", "fullmatch")
+    assert not pike_match(program, "aab", "fullmatch")
+
+
+def test_empty_loop_terminates():
+    assert fullmatch("(a?b?)*c", "abbac", engine="nfa")
+    assert not fullmatch("(a?b?)*c", "abbad", engine="nfa")
+
+
+def test_pathological_pattern_is_linear():
+    text = "a" * 5000
+    start = time.perf_counter()
+    assert not fullmatch("(a|a)*(a|a)*b", text, engine="nfa")
+    assert not search("(a|a)*(a|a)*b", text, engine="nfa")
+    assert time.perf_counter() - start < 5
+
+
+def test_nullable_loop_chain_closure_is_linear():
+    # 空文字列に一致しうるループを並べても、1つの位置でたどる状態は命令数に比例する
+    for k in (4, 16, 64):
+        program = compile_program(parse("(a?b?)*" * k + "x"))
+        seen = set()
+        caps = _fresh(2 * (program.groups + 1), 0)
+        _add_capture_thread(program, [], seen, 0, 0, 4, caps)
+        assert len(seen) <= 3 * len(program)
+    start = time.perf_counter()
+    assert compile("(a?b?)*" * 16 + "x").search("yyyx").span() == (3, 4)
+    assert time.perf_counter() - start < 1
+
+
+def test_nested_nullable_loop_closure_is_linear():
+    program = compile_program(parse("(b?" * 40 + "a?" + ")*" * 40 + "x"))
+    seen = set()
+    _add_capture_thread(program, [], seen, 0, 2, 4, _fresh(2 * (program.groups + 1), 2))
+    assert len(seen) <= 3 * len(program)
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        fullmatch("a", "a", engine="jit")
+
+
+def test_trace_requires_backtrack_engine():
+    with pytest.raises(ValueError):
+        fullmatch("a", "a", trace=True, engine="nfa")
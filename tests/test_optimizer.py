@@ -0,0 +1,138 @@
+import random
+import time
+
+import pytest
+import matchbox
+from matchbox.ast_nodes import (
+    CharNode,
+    CharSetNode,
+    ConcatNode,
+    GroupNode,
+    LiteralNode,
+    MatchContext,
+    OrNode,
+    RepeatNode,
+)
+from matchbox.nfa import compile_program, pike_captures
+from matchbox.optimizer import dump, optimize
+from matchbox.parser import parse
+
+from tests.test_match import to_re
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        ("abcdef", "Literal('abcdef')"),
+        ("a", "Char('a')"),
+        ("a.bc", "Concat(Concat(Char('a'), Char('.')), Literal('bc'))"),
+        ("a|b|c", "CharSet('abc')"),
+        ("a|a", "Char('a')"),
+        ("a*|a*", "Repeat(Char('a'), '*')"),
+        ("(a)|(a)", "Or(Group(Char('a'), 1), Group(Char('a'), 2))"),
+        ("abc|abd", "Concat(Literal('ab'), CharSet('cd'))"),
+        ("ab|x|ac", "Or(Or(Literal('ab'), Char('x')), Literal('ac'))"),
+        ("(ab|ac)*", "Repeat(Group(Concat(Char('a'), CharSet('bc')), 1), '*')"),
+        ("^ab$", "Concat(Concat(Anchor('^'), Literal('ab')), Anchor('$'))"),
+    ],
+)
+def test_rewrites(pattern, expected):
+    assert repr(optimize(parse(pattern))) == expected
+
+
+def test_prefix_branch_keeps_priority():
+    # ab|abc -> ab(|c): 空の枝が先のまま
+    assert repr(optimize(parse("ab|abc"))) == (
+        "Concat(Literal('ab'), Or(Char(''), Char('c')))"
+    )
+
+
+@pytest.mark.parametrize(
+    "outer, inner, expected",
+    [("*", "*", "*"), ("+", "+", "+"), ("?", "?", "?"), ("+", "?", "*")],
+)
+def test_nested_repeats_collapse(outer, inner, expected):
+    ast = RepeatNode(RepeatNode(CharNode("a"), inner), outer)
+    node = optimize(ast)
+    assert isinstance(node, RepeatNode) and node.op == expected
+    assert isinstance(node.node, CharNode)
+
+
+def test_original_tree_is_untouched():
+    ast = parse("abc|abd")
+    optimize(ast)
+    assert isinstance(ast, OrNode)
+    assert isinstance(ast.left, ConcatNode)
+
+
+def test_new_nodes_in_backtracker():
+    assert LiteralNode("ab").match(MatchContext("xaby", 1)) == {3}
+    assert LiteralNode("ab").match(MatchContext("xa", 1)) is None
+    assert CharSetNode("ab").scan("xbz", {0, 1, 2, 3}) == {2}
+
+
+def test_dump():
+    assert dump(optimize(parse("x(ab|ac)*"))) == "\n".join(
+        [
+            "Concat",
+            "  Char('x')",
+            "  Repeat *",
+            "    Group 1",
+            "      Concat",
+            "        Char('a')",
+            "        CharSet('bc')",
+        ]
+    )
+
+
+def test_deep_tree_is_optimized_and_dumped():
+    depth = 30_000
+    ast = optimize(parse("(" * depth + "a|b" + ")" * depth))
+    for _ in range(depth):
+        ast = ast.node
+    assert isinstance(ast, CharSetNode)
+    assert isinstance(optimize(parse("ab" * 50_000)), LiteralNode)
+    lines = dump(optimize(parse("(" * 2000 + "a|b" + ")" * 2000))).splitlines()
+    assert lines[-1] == "  " * 2000 + "CharSet('ab')"
+
+
+def test_long_alternation_chain_is_linear():
+    # 隣り合う枝の比較は最初の違いで打ち切るので、入れ子の OR でも全体を見直さない
+    n = 8000
+    start = time.perf_counter()
+    ast = optimize(parse("(a|" * n + "b" + ")" * n))
+    assert time.perf_counter() - start < 5
+    assert isinstance(ast, GroupNode)
+
+
+def test_compiled_pattern_is_optimized():
+    assert isinstance(matchbox.compile("hello").ast, LiteralNode)
+
+
+def _random_pattern(rng, depth=0):
+    kind = rng.random()
+    if depth > 2 or kind < 0.35:
+        return rng.choice("aabbc.")
+    if kind < 0.6:
+        return _random_pattern(rng, depth + 1) + _random_pattern(rng, depth + 1)
+    if kind < 0.8:
+        return f"{_random_pattern(rng, depth + 1)}|{_random_pattern(rng, depth + 1)}"
+    return f"({_random_pattern(rng, depth + 1)}){rng.choice('*+?')}"
+
+
+def test_random_patterns_keep_spans_and_groups():
+    rng = random.Random(11)
+    for _ in range(300):
+        pattern = _random_pattern(rng)
+        try:
+            parse(pattern)
+        except SyntaxError:
+            continue  # (a*)* のような繰り返しの重ねは構文エラー
+        raw = compile_program(parse(pattern))
+        opt = compile_program(optimize(parse(pattern)))
+        for _ in range(5):
+            text = "".join(rng.choice("abc") for _ in range(rng.randint(0, 6)))
+            assert pike_captures(opt, text) == pike_captures(raw, text), pattern
+            m = matchbox.compile(pattern).search(text, engine="backtrack")
+            expected = to_re(pattern).search(text)
+            assert (m and m.span()) == (expected and expected.span()), pattern
@@ -1,6 +1,13 @@
 import pytest
 from matchbox.parser import parse
-from matchbox.ast_nodes import CharNode, RepeatNode, ConcatNode, OrNode, AnchorNode
+from matchbox.ast_nodes import (
+    AnchorNode,
+    CharNode,
+    ConcatNode,
+    GroupNode,
+    OrNode,
+    RepeatNode,
+)
 
 
 def test_simple_char():
@@ -26,12 +33,46 @@ def test_repeat_and_or():
     assert ast.right.node.char == "b"
 
 
+def test_counted_repeat():
+    ast = parse("(ab){2,5}")
+    assert isinstance(ast, RepeatNode)
+    assert isinstance(ast.node, GroupNode)
+    assert (ast.op, ast.low, ast.high) == ("{2,5}", 2, 5)
+    assert (parse("a{3}").low, parse("a{3}").high) == (3, 3)
+    assert (parse("a{3,}").low, parse("a{3,}").high) == (3, None)
+    # {,n} と {,} は下限 0 にそろえる
+    assert parse("a{,2}").op == "{0,2}"
+    assert parse("a{,}").op == "{0,}"
+
+
+@pytest.mark.parametrize("pattern", ["a{", "a{}", "a{x}", "a{1,2", "{a}", "a{-1}"])
+def test_braces_that_are_not_counts_are_literals(pattern):
+    nodes = list(_nodes(parse(pattern)))
+    assert not any(isinstance(node, RepeatNode) for node in nodes)
+    chars = [node.char for node in nodes if isinstance(node, CharNode)]
+    assert sorted(chars) == sorted(pattern)
+
+
+def _nodes(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(
+            getattr(node, name)
+            for name in ("node", "left", "right")
+            if getattr(node, name, None) is not None
+        )
+
+
 def test_concat_group():
     ast = parse("(ab)+c")
     assert isinstance(ast, ConcatNode)
     assert isinstance(ast.left, RepeatNode)
     assert ast.left.op == "+"
-    assert isinstance(ast.left.node, ConcatNode)
+    assert isinstance(ast.left.node, GroupNode)
+    assert ast.left.node.index == 1
+    assert isinstance(ast.left.node.node, ConcatNode)
     assert isinstance(ast.right, CharNode)
     assert ast.right.char == "c"
 
@@ -47,6 +88,28 @@ def test_deeply_nested_groups():
         pytest.fail(f"Parsing deeply nested group failed: {e}")
 
 
+def test_parser_does_not_recurse():
+    # 10万文字の入れ子・連結でも再帰の上限に当たらない
+    depth = 50_000
+    ast = parse("(" * depth + "a" + ")" * depth)
+    for index in range(1, depth + 1):
+        assert isinstance(ast, GroupNode) and ast.index == index
+        ast = ast.node
+    assert isinstance(ast, CharNode)
+    ast = parse("a|b(c)" * 20_000)
+    assert isinstance(ast, OrNode) and isinstance(ast.right, ConcatNode)
+
+
+def test_group_numbering():
+    # 開き括弧の出現順に番号を振る
+    ast = parse("((a)b)(c)")
+    assert isinstance(ast, ConcatNode)
+    outer = ast.left
+    assert isinstance(outer, GroupNode) and outer.index == 1
+    assert isinstance(outer.node.left, GroupNode) and outer.node.left.index == 2
+    assert isinstance(ast.right, GroupNode) and ast.right.index == 3
+
+
 def test_anchors_parsing():
     # Start anchor
     ast_start = parse("^a")
@@ -91,6 +154,11 @@ def test_anchors_parsing():
         "a**",
         "^a^",  # Invalid anchor position
         "a$b",  # Invalid anchor position
+        "{2}a",
+        "a{2}*",
+        "a*{2}",
+        "a{3,2}",  # Min greater than max
+        "a{1001}",  # Over MAX_REPEAT
     ],
 )
 def test_invalid_syntax(pattern):
@@ -0,0 +1,47 @@
+import pytest
+import matchbox
+from matchbox import PatternSet
+from matchbox.evaluator import fullmatch, match, search
+
+PATTERNS = ["a+", "ab", "(a|b)*c", "^b", "c$", ".*x.*", "a?"]
+
+TEXTS = ["", "a", "ab", "aab", "abc", "bac", "xyz", "bbbc", "cab", "aaxa"]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_agrees_with_single_patterns(text):
+    ps = PatternSet(PATTERNS)
+    for method, fn in (
+        (ps.fullmatch, fullmatch),
+        (ps.match, match),
+        (ps.search, search),
+    ):
+        expected = [i for i, p in enumerate(PATTERNS) if fn(p, text)]
+        assert method(text) == expected, fn.__name__
+
+
+def test_search_reports_every_index():
+    ps = PatternSet(["ERROR", "WARN", "INFO"])
+    assert ps.search("12:00 WARN disk; 12:01 ERROR io") == [0, 1]
+    assert ps.search("nothing here") == []
+
+
+def test_single_pattern():
+    ps = PatternSet(["a(b|c)d"])
+    assert ps.fullmatch("acd") == [0]
+    assert ps.fullmatch("acx") == []
+
+
+def test_empty_set_is_rejected():
+    with pytest.raises(ValueError):
+        PatternSet([])
+
+
+def test_syntax_error():
+    with pytest.raises(SyntaxError):
+        PatternSet(["a", "b|"])
+
+
+def test_exported():
+    assert matchbox.PatternSet is PatternSet
+    assert len(PatternSet(["a", "b"])) == 2
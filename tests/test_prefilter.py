@@ -0,0 +1,75 @@
+import pytest
+from matchbox.evaluator import Pattern
+from matchbox.parser import parse
+from matchbox.prefilter import Prefilter, extract
+
+
+@pytest.mark.parametrize(
+    "pattern, prefix, required",
+    [
+        ("ERROR(1|2)+", "ERROR", "ERROR"),
+        ("abc", "abc", "abc"),
+        ("^abc$", "abc", "abc"),
+        ("a.c", "a", "a"),
+        ("x(ab)+y", "xab", "xab"),
+        (".*ERROR", "", "ERROR"),
+        ("(a|b)*TIMEOUT(c|d)", "", "TIMEOUT"),
+        ("abx|aby", "ab", "ab"),
+        ("(foo|foo)bar", "foobar", "foobar"),
+        ("x*done", "", "done"),
+        ("(ab){3}x", "abababx", "abababx"),
+        ("x(ab){2,5}y", "xabab", "xabab"),
+        ("(a|b){2}c", "", "c"),
+    ],
+)
+def test_extract(pattern, prefix, required):
+    assert extract(parse(pattern)) == Prefilter(prefix=prefix, required=required)
+
+
+@pytest.mark.parametrize("pattern", ["a*", "(a|b)+", ".", "a?b?", "a{0,3}", "(ab){0}"])
+def test_no_prefilter(pattern):
+    assert extract(parse(pattern)) is None
+    assert Pattern(pattern).prefilter is None
+
+
+def test_long_concatenation():
+    # 連結の鎖を1回で畳み込むので、長いリテラルでも2乗の時間にならない
+    assert extract(parse("(a)" * 20_000 + "b*")) == Prefilter(
+        "a" * 20_000, "a" * 20_000
+    )
+    assert extract(parse("a(b|c)" * 10_000)).required == "a"
+
+
+def test_candidates():
+    pf = Prefilter(prefix="ab", required="ab")
+    assert list(pf.candidates("xxabyabab")) == [2, 5, 7]
+    assert pf.rejects("aaa")
+
+
+@pytest.mark.parametrize("engine", ["dfa", "nfa", "backtrack"])
+@pytest.mark.parametrize(
+    "pattern, text, expected",
+    [
+        ("ERROR(1|2)+", "ok ok ERROR3 ERROR21", True),
+        ("ERROR(1|2)+", "ok ok ERROR3", False),
+        ("ERROR(1|2)+", "no errors here", False),
+        ("aab", "aaab", True),  # 候補位置の直後に次の候補が重なる
+        ("^ab", "xab", False),
+        ("ab$", "abab", True),
+        (".*ERROR", "xxERRORx", True),
+    ],
+)
+def test_search_with_prefilter(engine, pattern, text, expected):
+    p = Pattern(pattern)
+    assert p.prefilter is not None
+    assert p.is_search(text, engine=engine) == expected
+    assert bool(p.search(text, engine=engine)) == expected
+
+
+@pytest.mark.parametrize("engine", ["dfa", "nfa", "backtrack"])
+def test_fullmatch_and_match_with_prefilter(engine):
+    p = Pattern("ERROR(1|2)+")
+    assert p.fullmatch("ERROR121", engine=engine)
+    assert not p.fullmatch("xERROR1", engine=engine)
+    assert p.match("ERROR1 trailing", engine=engine)
+    assert not p.match(" ERROR1", engine=engine)
@@ -0,0 +1,141 @@
+import json
+import pickle
+import subprocess
+import sys
+
+import pytest
+import matchbox
+from matchbox.evaluator import ENGINES
+from matchbox.memo import MatchTimeout
+
+from tests.test_nfa import CASES
+
+
+@pytest.fixture(autouse=True)
+def no_global_hook():
+    yield
+    matchbox.set_profile_hook(None)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("pattern, text", CASES)
+def test_profile_agrees_with_fast_path(pattern, text, engine):
+    p = matchbox.Pattern(pattern)
+    for method in ("fullmatch", "match", "search"):
+        profile = p.profile(text, method, engine)
+        expected = getattr(p, f"is_{method}")(text, engine=engine)
+        assert profile.matched == expected, method
+        assert (profile.method, profile.engine) == (method, engine)
+        assert profile.text_length == len(text)
+        assert profile.seconds > 0
+
+
+def test_backtracking_counts_repeated_work():
+    p = matchbox.Pattern("(a|a)*(a|a)*b")
+    text = "a" * 12 + "ba"
+    backtrack = p.profile(text, "fullmatch", "backtrack")
+    memo = p.profile(text, "fullmatch", "memo")
+    assert backtrack.backtracks > 0
+    assert backtrack.states == memo.states  # 異なる (ノード, 位置) の組は同じ
+    assert backtrack.steps == backtrack.states + backtrack.backtracks
+    assert memo.cache_misses == memo.states
+    assert memo.cache_hits == memo.backtracks > 0
+    assert memo.steps > memo.cache_misses + memo.cache_hits  # まとめた終了位置も数える
+    assert memo.cache_misses < backtrack.steps
+
+
+def test_deep_pattern_profile():
+    p = matchbox.Pattern("(a|b)" * 5_000)
+    text = "ab" * 2_500
+    backtrack = p.profile(text, "fullmatch", "backtrack")
+    memo = p.profile(text, "fullmatch", "memo")
+    assert backtrack.matched and memo.matched
+    assert backtrack.states == memo.states == 5_001
+
+
+def test_node_visits_are_labelled():
+    profile = matchbox.Pattern("x(a|b)*").profile("xab", "fullmatch", "memo")
+    assert profile.node_visits["0 Concat"] == 1
+    assert profile.node_visits["1 Char('x')"] == 1
+    assert profile.node_visits["4 CharSet('ab')"] == 3
+    assert "3 Group 1" not in profile.node_visits  # グループは中身に数える
+    nfa = matchbox.Pattern("x(a|b)*").profile("xab", "fullmatch", "nfa")
+    assert nfa.node_visits["0 CHAR 'x'"] == 1
+    assert nfa.steps == sum(nfa.node_visits.values())
+
+
+def test_dfa_counts_cache_hits():
+    p = matchbox.Pattern("(a|b)*c")
+    cold = p.profile("ababc", "fullmatch", "dfa")
+    warm = p.profile("ababc", "fullmatch", "dfa")
+    assert cold.cache_misses > 0
+    assert (warm.cache_hits, warm.cache_misses) == (5, 0)
+    assert warm.steps == 5
+    assert warm.states == cold.states
+
+
+def test_prefilter_rejection_is_reported():
+    profile = matchbox.Pattern("abc(d|e)").profile("xyz", "search", "nfa")
+    assert profile.prefiltered and not profile.matched
+    assert profile.steps == 0
+
+
+def test_pattern_hook_sees_every_call():
+    seen = []
+    p = matchbox.Pattern("(a|b)+c")
+    p.profile_hook = seen.append
+    assert p.is_fullmatch("abc")
+    assert p.search("xxabcx", engine="nfa").span() == (2, 5)
+    assert p.match("c") is None
+    assert [(s.method, s.engine, s.matched) for s in seen] == [
+        ("fullmatch", "dfa", True),
+        ("search", "nfa", True),
+        ("match", "dfa", False),
+    ]
+
+
+def test_global_hook_and_module_functions():
+    seen = []
+    matchbox.set_profile_hook(seen.append)
+    assert matchbox.search("b+", "abbb")
+    matchbox.set_profile_hook(None)
+    assert matchbox.search("b+", "abbb")
+    assert [(s.pattern, s.method) for s in seen] == [("b+", "search")]
+
+
+def test_hook_receives_errors():
+    seen = []
+    p = matchbox.Pattern("(a|a)*b")
+    p.profile_hook = seen.append
+    with pytest.raises(MatchTimeout):
+        p.is_fullmatch("a" * 50 + "ba", max_steps=10)
+    assert seen[0].error == "MatchTimeout"
+    assert seen[0].steps > 10
+
+
+def test_bytes_profile_is_json_ready():
+    profile = matchbox.Pattern(b"\xe3+").profile(b"\xe3\xe3", "fullmatch", "nfa")
+    assert profile.matched
+    assert json.loads(json.dumps(profile.to_dict()))["pattern"] == "\xe3+"
+
+
+def test_pattern_with_hook_pickles_without_it():
+    p = matchbox.Pattern("ab")
+    p.profile_hook = print
+    restored = pickle.loads(pickle.dumps(p))
+    assert restored.profile_hook is None
+    assert restored.is_search("xab")
+
+
+def test_cli_profile_emits_json():
+    proc = subprocess.run(
+        [sys.executable, "-m", "matchbox", "(a|b)*c", "xxabc", "--search"]
+        + ["--profile", "--engine", "nfa"],
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 0
+    data = json.loads(proc.stdout)
+    assert data["matched"] is True
+    assert (data["method"], data["engine"]) == ("search", "nfa")
+    assert data["steps"] > 0
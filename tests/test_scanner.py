@@ -0,0 +1,71 @@
+import pytest
+import matchbox
+from matchbox.scanner import scan_file
+
+from tests.test_finditer import CASES as FINDITER_CASES
+
+CASES = FINDITER_CASES + [
+    ("ERROR(1|2)+", "xxERR" + "OR1212 ERROR2 yERROR"),
+    ("a.*b", "aaxxbxxb"),
+    ("(a|ab)(c|bcd)", "abcd abc"),
+    ("abc$", "abcabc"),
+    ("^ab", "abab"),
+    ("x(y)?z", "xz xyz xyyz"),
+]
+
+
+def stream(pattern, text, size):
+    scanner = matchbox.compile(pattern).scanner()
+    found = []
+    for i in range(0, len(text), size):
+        found += scanner.feed(text[i : i + size])
+    found += scanner.finish()
+    return found
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+@pytest.mark.parametrize("pattern, text", CASES)
+def test_stream_matches_finditer(pattern, text, size):
+    expected = [
+        (m.span(), m.group(), m.groups())
+        for m in matchbox.compile(pattern).finditer(text)
+    ]
+    got = [(m.span(), m.group(), m.groups()) for m in stream(pattern, text, size)]
+    assert got == expected
+
+
+def test_buffer_only_keeps_pending_text():
+    scanner = matchbox.compile("ERROR(1|2)+").scanner()
+    for _ in range(100):
+        assert scanner.feed("x" * 1000) == []
+    assert len(scanner._buf) < len("ERROR")
+    assert [m.span() for m in scanner.feed("ERR")] == []
+    assert [m.span() for m in scanner.feed("OR12 ")] == [(100000, 100007)]
+    assert scanner.position == 100008
+    assert scanner.finish() == []
+
+
+def test_feed_after_finish():
+    scanner = matchbox.compile("a").scanner()
+    scanner.finish()
+    with pytest.raises(ValueError):
+        scanner.feed("a")
+
+
+@pytest.mark.parametrize("chunk_size", [3, 1 << 20])
+def test_scan_file_reports_byte_offsets(tmp_path, chunk_size):
+    path = tmp_path / "log.txt"
+    data = b"ok\nERROR1 \xff\xfe ERROR22\n" * 50
+    path.write_bytes(data)
+    p = matchbox.compile("ERROR(1|2)+")
+    spans = [m.span() for m in scan_file(p, path, chunk_size=chunk_size)]
+    text = data.decode("latin-1")
+    assert spans == [m.span() for m in p.finditer(text)]
+    start, end = spans[1]
+    assert data[start:end] == b"ERROR22"
+
+
+def test_scan_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert [m.span() for m in scan_file(matchbox.compile("a*"), path)] == [(0, 0)]
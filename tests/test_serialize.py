@@ -0,0 +1,143 @@
+import os
+
+import pytest
+import matchbox
+import matchbox.evaluator
+from matchbox.optimizer import dump
+from matchbox.serialize import FORMAT_VERSION, DiskCache, FormatError, dumps, loads
+
+from tests.test_scanner import CASES
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    matchbox.purge()
+    yield
+    matchbox.set_cache_dir(None)
+    matchbox.purge()
+
+
+def matches(p, text):
+    return [(m.span(), m.groups()) for m in p.finditer(text)]
+
+
+@pytest.mark.parametrize("pattern, text", CASES)
+def test_round_trip(pattern, text):
+    p = matchbox.Pattern(pattern)
+    q = loads(dumps(p))
+    assert q.pattern == pattern
+    assert dump(q.ast) == dump(p.ast)
+    assert q.program == p.program
+    assert q.prefilter == p.prefilter
+    assert q.groups == p.groups
+    assert matches(q, text) == matches(p, text)
+    assert q.is_search(text) == p.is_search(text)
+
+
+def test_round_trip_counted_repeat():
+    p = matchbox.Pattern("x(ab){2,4}(c){0}y")
+    q = loads(dumps(p))
+    assert "Repeat {2,4}" in dump(q.ast)
+    assert q.program == p.program
+    assert matches(q, "xababy xabababababy") == [((0, 6), ("ab", None))]
+
+
+def test_round_trip_bytes_pattern():
+    p = matchbox.Pattern(b"\xff(a|b)+c")
+    q = loads(dumps(p))
+    assert q.bytes_mode
+    assert q.search(b"x\xffabc").group(1) == b"b"
+
+
+def test_shared_subtrees_are_written_once():
+    p = matchbox.Pattern("(ab|cd)*x")
+    concat = matchbox.ast_nodes.ConcatNode(p.ast, p.ast)
+    p.ast = concat
+    q = loads(dumps(p))
+    assert q.ast.left is q.ast.right
+
+
+def test_prebuilt_dfa_needs_no_new_states():
+    p = matchbox.Pattern("(ERROR|WARN)(1|2)+ .*disk$")
+    texts = ["xx WARN12 the disk", "ERROR1 disk", "nothing here"]
+    expected = [p.is_search(t) for t in texts]
+
+    q = loads(dumps(p, dfa=True))
+    assert q.dfa.info().cache_size == p.dfa.info().cache_size
+    assert [q.is_search(t) for t in texts] == expected
+    assert q.dfa.info().states_built == 0
+
+    # DFA を含めなければ状態は読み込んだ側で構築し直す
+    r = loads(dumps(p))
+    assert [r.is_search(t) for t in texts] == expected
+    assert r.dfa.info().states_built > 0
+
+
+def test_prebuilt_dfa_over_memory_budget_is_skipped():
+    p = matchbox.Pattern("a(b|c)*d")
+    p.is_search("abcbcbd")
+    table, starts = p.dfa.export_states()
+    q = matchbox.Pattern("a(b|c)*d")
+    q.dfa.max_memory = 1
+    assert not q.dfa.import_states(table, starts)
+    assert q.dfa.info().cache_size == 0
+    assert q.is_search("abcbcbd")
+
+
+@pytest.mark.parametrize(
+    "corrupt",
+    [
+        lambda data: b"XXXX" + data[4:],
+        lambda data: data[:4] + (FORMAT_VERSION + 1).to_bytes(2, "little") + data[6:],
+        lambda data: data[:-1] + bytes([data[-1] ^ 1]),
+        lambda data: data[:20],
+        lambda data: data[:5],
+    ],
+)
+def test_bad_data_raises_format_error(corrupt):
+    data = dumps(matchbox.Pattern("a(b|c)*d"))
+    with pytest.raises(FormatError):
+        loads(corrupt(data))
+
+
+def test_disk_cache_skips_parsing(tmp_path, monkeypatch):
+    matchbox.set_cache_dir(tmp_path)
+    p = matchbox.compile("a(b|c)*d")
+    assert len(os.listdir(tmp_path)) == 1
+
+    matchbox.purge()
+
+    def fail(pattern):
+        raise AssertionError("pattern was parsed again")
+
+    monkeypatch.setattr(matchbox.evaluator, "parse", fail)
+    q = matchbox.compile("a(b|c)*d")
+    assert q is not p
+    assert q.fullmatch("abcbd")
+
+
+def test_disk_cache_keys_str_and_bytes_apart(tmp_path):
+    cache = DiskCache(tmp_path)
+    assert cache.path("a") != cache.path(b"a")
+    cache.put(matchbox.Pattern("a"))
+    assert cache.get("a").pattern == "a"
+    assert cache.get(b"a") is None
+
+
+def test_corrupted_cache_file_is_recompiled(tmp_path):
+    cache = DiskCache(tmp_path)
+    with open(cache.path("ab+"), "wb") as f:
+        f.write(b"garbage")
+    assert cache.get("ab+") is None
+
+    matchbox.set_cache_dir(tmp_path)
+    assert matchbox.compile("ab+").fullmatch("abbb")
+    assert cache.get("ab+") is not None
+
+
+def test_disk_cache_clear(tmp_path):
+    cache = DiskCache(tmp_path)
+    cache.put(matchbox.Pattern("a"))
+    cache.put(matchbox.Pattern("b"))
+    cache.clear()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,78 @@
+import subprocess
+import sys
+
+# python -X importtime で計測した累積時間の上限（マイクロ秒）。インタプリタの起動は
+# 含めない（ばらつきが大きい）ので、マシンの速さの差を見込んで余裕を持たせてある。
+# rich を読み込まないことは test_*_does_not_load_rich で直接確かめる
+IMPORT_BUDGET_US = 100_000  # import matchbox
+CLI_BUDGET_US = 150_000  # python -m matchbox が起動後に読み込むモジュール
+
+
+def importtime(*args):
+    """python -X importtime を実行し、(モジュール名, 累積マイクロ秒, 入れ子の深さ) を返す"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            modules.append((name.strip(), int(cumulative), depth))
+    return modules
+
+
+def best_total(*args, module=None):
+    """module（省略時は、インタプリタの起動時に読み込むもの以外の最上位のモジュール
+    すべて）の累積時間の合計
+
+    計測のばらつきを避けるため、3回のうち最短のものを使う。
+    """
+    startup = {name for name, _, _ in importtime("-c", "pass")}
+    return min(
+        sum(
+            us
+            for name, us, depth in importtime(*args)
+            if (name == module if module else depth == 0 and name not in startup)
+        )
+        for _ in range(3)
+    )
+
+
+def loads_rich(modules):
+    return any(name == "rich" or name.startswith("rich.") for name, _, _ in modules)
+
+
+def test_import_does_not_load_rich():
+    modules = importtime("-c", "import matchbox")
+    names = {name for name, _, _ in modules}
+    assert "matchbox" in names
+    assert "matchbox.tracer" not in names
+    assert "matchbox.profiler" not in names
+    assert not loads_rich(modules)
+
+
+def test_cli_does_not_load_rich():
+    assert not loads_rich(importtime("-m", "matchbox", "a(b|c)d", "acd"))
+
+
+def test_import_time_budget():
+    best = best_total("-c", "import matchbox", module="matchbox")
+    assert best < IMPORT_BUDGET_US, f"import matchbox took {best / 1000:.1f}ms"
+
+
+def test_cli_startup_budget():
+    best = best_total("-m", "matchbox", "a(b|c)d", "acd")
+    assert best < CLI_BUDGET_US, f"CLI imports took {best / 1000:.1f}ms"
+
+
+def test_trace_loads_rich_on_demand(capsys):
+    import matchbox
+
+    assert matchbox.fullmatch("ab", "ab", trace=True)
+    assert "rich.console" in sys.modules
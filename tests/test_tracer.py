@@ -0,0 +1,37 @@
+import dataclasses
+
+import pytest
+from matchbox.ast_nodes import MatchContext
+from matchbox.evaluator import compile, fullmatch, match, search
+from matchbox.tracer import Tracer
+
+from tests.test_nfa import CASES
+
+
+@pytest.mark.parametrize("pattern, text", CASES)
+def test_trace_agrees_with_fast_path(pattern, text, capsys):
+    for fn in (fullmatch, match, search):
+        assert fn(pattern, text, trace=True) == fn(
+            pattern, text, engine="backtrack"
+        ), fn.__name__
+    assert capsys.readouterr().out
+
+
+@pytest.mark.parametrize("pattern, text", CASES)
+def test_tracer_returns_node_results(pattern, text, capsys):
+    ast = compile(pattern).ast
+    for pos in range(len(text) + 1):
+        assert Tracer(text).match(ast, pos) == ast.match(MatchContext(text, pos))
+
+
+def test_trace_output_is_indented(capsys):
+    fullmatch("a(b|c)d", "acd", trace=True)
+    out = capsys.readouterr().out
+    assert "TRACE for /a(b|c)d/" in out
+    assert "\n    [CharSet('bc')] text='cd'" in out
+    assert "SUCCESS" in out
+
+
+def test_context_has_no_trace_state():
+    fields = {f.name for f in dataclasses.fields(MatchContext)}
+    assert fields == {"original_text", "pos"}